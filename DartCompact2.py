@@ -1,8 +1,23 @@
-import matplotlib
-matplotlib.use("Agg")  # Use non-interactive backend for Streamlit
-import matplotlib.pyplot as plt
 import streamlit as st
-import pandas as pd
+import uuid
+from ml_features import FEATURES, SampleBuffer, ThrowStats
+from ml_training import TrainingService
+from pro_stats import ProStatsCache
+from avatars import get_avatar, prerender
+
+
+@st.cache_resource
+def load_strategy(out_rule):
+    # Aiming policy for a club-level player, solved once and cached on disk (strategy.py)
+    from simulator import SKILL_LEVELS
+    from strategy import load_or_solve
+    return load_or_solve(SKILL_LEVELS["club"], out_rule)
+
+
+@st.cache_resource
+def load_pro_stats():
+    # One cache per server process, persisted to disk and refreshed in the background
+    return ProStatsCache()
 
 # main.py start
 
@@ -14,45 +29,31 @@ if __name__ == "__main__":
 
 # game_logic.py start
 
+# The rules live in the shared engine (engine.GameState), saving in game_logic
+from engine import GameState, BUST, WIN, STRAIGHT_OUT, DOUBLE_OUT, DARTS_PER_VISIT
+from checkout import suggest, format_route, dart_name
+from throws import from_board
+from leaderboard import get_leaderboard
+from game_logic import handle_win, recover_games
+from journal import journal_path, journal_game_id, open_journal, claim, darts_played
 
-
-# === Logic of the game ===
-def create_players(players_names):
-    return [{"name": name, "score": 301, "history": [], "victories": 0} for name in players_names]
-
-def process_turn(player, throws):
-    total_score = sum(throws)
-    new_score = player['score'] - total_score
-
-    # ML process (Initialising ML data)
-    if 'ml_data' not in st.session_state:
-        st.session_state.ml_data = pd.DataFrame(columns=['player', 'avg_throw', 'total_throws', 'current_score', 'max_throw', 'won'])
-    
-    # ✅ Add throws in historic 
-    player['history'].append(throws)
-
-    if new_score < 0:
-        message = "Bust! You overpassed your score."
-        new_score = player['score']  #Score stays the same if Bust
-        game_over = False
-    else:
-        message = f"Remaining score: {new_score} points"
-        game_over = new_score == 0  #Player wins if score == 0
-
-    player['score'] = new_score
-    return game_over, new_score, message
-
-
-def handle_win(players, winner_name):
-    save_results(players, winner_name)
-
-def start_game(players_names):
-    return create_players(players_names)
+JOURNAL_APP = "DartCompact2"  # Throws of every game in progress, one journal per game, to resume it after a restart
 
 # game_logic.py end
 
 #dart_compact.py start
 
+def record_throw(player, points):
+    # Confirmed throw: update the running stats and capture one ML snapshot for this event.
+    # The (game id, turn, throw index) key makes reruns of the same event a no-op.
+    st.session_state.throws[player].append(points)
+    stats = st.session_state.throw_stats[player]
+    stats.add(points)
+    game = st.session_state.game
+    score = game.player(player).score
+    key = (st.session_state.game_id, game.visits, game.darts_thrown)
+    st.session_state.ml_samples.record(key, player, stats, score, won=1 if score == 0 else 0)
+
 
 # Multi-player dart game using Streamlit for name input, avatars, and score tracking.
 
@@ -64,19 +65,49 @@ st.write("Welcome to the compact dart game for multiple players!!!")
 # Initialize players and game state
 if "players" not in st.session_state:
     st.session_state.players = []  # Player names
-    st.session_state.scores = {}  # Player scores
+    st.session_state.game = None  # engine.GameState: scores, turn order, rules
     st.session_state.winner = None  # Game winner
     st.session_state.game_started = False  # Game status
 
 # Game setup UI
 if not st.session_state.game_started:
+    # Games cut off by a server restart or a closed tab are still in their journals (a won game whose
+    # save was cut off is saved here); the games played in other tabs aren't offered
+    for path, unfinished in recover_games(JOURNAL_APP):
+        scores = ", ".join(f"{p.name} {p.score}" for p in unfinished.players)
+        if st.button(f"Resume the unfinished game ({scores})", key=f"resume_{path}"):
+            journal = claim(path)  # This session's journal from now on
+            if journal is None:
+                st.warning("This game has been resumed in another session.")
+                continue
+            unfinished = journal.game
+            names = [p.name for p in unfinished.players]
+            st.session_state.players = names
+            st.session_state.game = unfinished
+            st.session_state.journal = journal
+            st.session_state.throws = {name: [] for name in names}
+            st.session_state.throw_stats = {name: ThrowStats() for name in names}
+            for name, points, result in darts_played(unfinished):  # Same as record_throw, without the ML rows
+                if result != BUST:
+                    st.session_state.throws[name].append(points)
+                    st.session_state.throw_stats[name].add(points)
+            st.session_state.avatars = {name: name for name in names}  # Avatar seeds; the choices aren't journaled
+            prerender(names)
+            if 'ml_samples' not in st.session_state:
+                st.session_state.ml_samples = SampleBuffer()
+                st.session_state.ml_trainer = TrainingService(min_samples=0, min_wins=2)
+            st.session_state.game_id = journal_game_id(JOURNAL_APP, path)  # Same game, same id
+            st.session_state.game_started = True
+            st.rerun()
+
     num_players = st.number_input("Number of players", min_value=1, max_value=8, step=1)  # Player count
     require_double_out = st.checkbox("Require double to win", value=True)  # Double Out Rule
     starting_score = st.selectbox("Select starting score", [101, 301, 501], index=1)  # Starting score
 
     player_names = []  # Player names list
-    avatars = {}  # Player avatars dictionary
+    avatars = {}  # Player name -> avatar seed
     options = ["Kim", "Alexis", "Robyn", "Billie", "Lou", "Charlie"]  # Avatar options
+    prerender([f"{option}_default" for option in options])  # Load every choice once, in the background
 
     # Input for player names and avatars
     for i in range(num_players):
@@ -85,74 +116,64 @@ if not st.session_state.game_started:
 
     for i, name in enumerate(player_names):
         avatar_choice = st.radio(f"Choose avatar for Player {i+1}", options=options, horizontal=True, key=f"avatar_choice_{i}")
-        avatar_url = f"https://api.dicebear.com/7.x/adventurer/svg?seed={avatar_choice}_default"
-        st.image(avatar_url, width=100)  # Display avatar
-        avatars[name] = avatar_url  # Map name to avatar URL
+        seed = f"{avatar_choice}_default"
+        # Local PNG bytes, cached in memory and on disk; a placeholder until prerender has fetched it
+        st.image(get_avatar(seed, remote=False), width=100)  # Display avatar
+        avatars[name] = seed  # Map name to avatar seed
     st.session_state.avatars = avatars  # Store avatars
 
     # Start game logic
     if st.button("Start Game"):
         if all(name.strip() != "" for name in player_names):  # Check names
             st.session_state.players = player_names  # Store names
-            st.session_state.scores = {name: starting_score for name in player_names}  # Initialize scores
+            st.session_state.game = GameState(player_names, starting_score, DOUBLE_OUT if require_double_out else STRAIGHT_OUT)
+            st.session_state.game_id = uuid.uuid4().hex  # Key of this game's ML snapshots and of its journal
+            st.session_state.journal = open_journal(st.session_state.game, journal_path(JOURNAL_APP, st.session_state.game_id))  # Every throw is journaled
             st.session_state.throws = {name: [] for name in player_names}  # Track throws
-            st.session_state.turn = 0  # Initialize turn
+            st.session_state.throw_stats = {name: ThrowStats() for name in player_names}  # Running count/sum/max
+            if 'ml_samples' not in st.session_state:
+                st.session_state.ml_samples = SampleBuffer()  # ML rows, kept across games
+                st.session_state.ml_trainer = TrainingService(min_samples=0, min_wins=2)  # Background partial_fit
             st.session_state.game_started = True  # Mark game started
-            st.session_state.require_double_out = require_double_out  # Store rule preference
             st.rerun()  # ChatGPT fix: replaces deprecated experimental_rerun()
         else:
             st.warning("Please fill in all player names.")  # Warning for missing names
 
 else:
-    # Initialize throw tracking
-    if "has_thrown" not in st.session_state:
-        st.session_state.has_thrown = False
-
-    #ML process (Data added after each run)
-    player = st.session_state.players[st.session_state.current_player]
-    # Just after updating player[‘score’] and player[‘history’].
-    player_data = {
-        'player': player['name'],
-        'avg_throw': sum(player['history']) / len(player['history']) if player['history'] else 0,
-        'total_throws': len(player['history']),
-        'current_score': player['score'],
-        'max_throw': max(player['history']) if player['history'] else 0,
-        'won': 1 if player['score'] == 0 else 0
-    }
-    st.session_state.ml_data = pd.concat([st.session_state.ml_data, pd.DataFrame([player_data])], ignore_index=True)
-
-    #ML process (Prediction display)
+    game = st.session_state.game
+
+    #ML process (Prediction display, ML data is captured once per throw in record_throw)
+    if st.session_state.ml_trainer.model is not None:
+        st.session_state.ml_model = st.session_state.ml_trainer.model  # Latest model swapped in by the trainer
     if 'ml_model' in st.session_state:
-        player = st.session_state.players[st.session_state.current_player]
-        x_pred = pd.DataFrame([{
-            'avg_throw': sum(player['history']) / len(player['history']) if player['history'] else 0,
-            'total_throws': len(player['history']),
-            'current_score': player['score'],
-            'max_throw': max(player['history']) if player['history'] else 0,
-        }])
+        player = game.current_player.name
+        player_stats = st.session_state.throw_stats[player]  # Running count/sum/max, no rescan of the throws
+        player_score = game.current_player.score
+        import pandas as pd  # Only loaded once there is a model to ask
+        x_pred = pd.DataFrame([[player_stats.average, player_stats.count, player_score, player_stats.max]], columns=FEATURES)
         proba = st.session_state.ml_model.predict_proba(x_pred)[0][1]
         st.markdown(f"### 🤖 Chance estimée de victoire : **{proba*100:.1f}%**")
 
     # Game over logic
     if st.session_state.winner:
+        import pandas as pd  # Only needed for the statistics of the game-over screen
         st.success(f"🏆 {st.session_state.winner} has won the game!")
 
         #ML Process (Training the model at the end of the game)
-        from sklearn.linear_model import LogisticRegression
-
-        df = st.session_state.ml_data
-        if df['won'].sum() >= 2:  # We train the model only if we have to completed games 
-            X = df[['avg_throw', 'total_throws', 'current_score', 'max_throw']]
-            y = df['won']
-            model = LogisticRegression()
-            model.fit(X, y)
-            st.session_state.ml_model = model
+        # Only the new rows are fitted, in a background thread, once we have two completed games
+        st.session_state.ml_trainer.submit(st.session_state.ml_samples)
+
+        if "winner_processed" not in st.session_state:
+            st.session_state.winner_processed = True
+            handle_win(game, st.session_state.journal)  # Save the game to the results history once
         
-        # Create final ranking sorted by remaining score
-        winner = st.session_state.winner
-        others = [p for p in st.session_state.players if p != winner]
-        others_sorted = sorted(others, key=lambda p: st.session_state.scores[p])
-        ranking = [winner] + others_sorted
+        # Create final ranking sorted by remaining score, once per game
+        if "ranking" not in st.session_state:
+            winner = st.session_state.winner
+            others = [p for p in st.session_state.players if p != winner]
+            others_sorted = sorted(others, key=lambda p: game.player(p).score)
+            st.session_state.ranking = [winner] + others_sorted
+        ranking = st.session_state.ranking
 
         st.markdown("## 🏅 Final Standings")
         # Podium-style layout
@@ -169,50 +190,49 @@ else:
                         st.markdown("🥈 **2nd Place**")
                     elif pos == 2:
                         st.markdown("🥉 **3rd Place**")
-                    st.image(st.session_state.avatars[player], width=100)
+                    st.image(get_avatar(st.session_state.avatars[player], remote=False), width=100)
                     st.markdown(f"### {player}")
 
         # Statistics below podium
         st.write("## 📊 Game Statistics")
         stats_data = {"Players": [], "Average Points": [], "Max Points": []}
 
-        for player, throws in st.session_state.throws.items():
+        for player, stats in st.session_state.throw_stats.items():
             stats_data["Players"].append(player)
-            stats_data["Average Points"].append(sum(throws)/len(throws) if throws else 0)
-            stats_data["Max Points"].append(max(throws) if throws else 0)
+            stats_data["Average Points"].append(stats.average)
+            stats_data["Max Points"].append(stats.max)
 
         stats_df = pd.DataFrame(stats_data).set_index("Players")
         st.write("### Average Points per Throw")
         st.bar_chart(stats_df["Average Points"])
         st.write("### Max Points in a Single Throw")
         st.bar_chart(stats_df["Max Points"])
+        # All-time leaderboard (leaderboard.py), kept sorted as games are saved
+        board = get_leaderboard()
+        if len(board):
+            st.write("## 🏆 Leaderboard")
+            st.dataframe(pd.DataFrame(board.top(10)).set_index("player"))
+            st.write(" · ".join(f"{p}: #{board.rank(p)} of {len(board)}" for p in ranking if p in board))
+
         # Comparison to professional players
         st.write("## 🧠 Compare Yourself to a Pro")
  
-        import requests
-        
-        # Real pro player data via Sportradar API (trial plan uses competitor endpoint)
+        # Real pro player data via Sportradar API (trial plan uses competitor endpoint), served from the cache
         pro_player = "Michael van Gerwen"
         pro_competitor_id = "sr:competitor:26280"  # MvG's competitor ID
-        API_KEY = "0j9Nj7DIbdznIAKdz6LPFnHWmYChwGUQgboXO76n"
-        
-        try:
-            url = f"https://api.sportradar.com/darts/trial/v2/en/competitors/{pro_competitor_id}/profile.json?api_key={API_KEY}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                # Attempt to extract actual stats if available in response
-                stats = data.get("statistics", {})
-                pro_avg = stats.get("average_3_dart_score", 98.5)
-                pro_max = stats.get("best_3_dart_score", 180)
-            else:
-                st.warning("Couldn't fetch pro data, using defaults.")
-        except Exception as e:
-            st.error("API call failed.")
+        pro_stats = load_pro_stats()
+
+        pro_avg, pro_max = 98.5, 180  # Defaults until the pro data has been fetched
+        pro_data = pro_stats.get(pro_competitor_id)  # Never blocks, a refresh runs in the background
+        if pro_data is not None:
+            pro_avg = pro_data.get("average_3_dart_score", pro_avg)
+            pro_max = pro_data.get("best_3_dart_score", pro_max)
+        elif pro_stats.last_error is not None:
+            st.warning("Couldn't fetch pro data, using defaults.")
  
-        for player, throws in st.session_state.throws.items():
-            user_avg = sum(throws)/len(throws) if throws else 0
-            user_max = max(throws) if throws else 0
+        for player, stats in st.session_state.throw_stats.items():
+            user_avg = stats.average
+            user_max = stats.max
  
             st.markdown(f"### {player} vs {pro_player}")
             col1, col2 = st.columns(2)
@@ -227,88 +247,60 @@ else:
             percent_of_pro = min(user_avg / pro_avg, 1.0)
             st.progress(percent_of_pro)
     else:
-        current_player = st.session_state.players[st.session_state.turn]  # Current player
-        st.image(st.session_state.avatars[current_player], width=100, caption=f"{current_player}'s Avatar")
-        st.subheader(f"{current_player}'s turn – Current Score: {st.session_state.scores[current_player]}")
-
-        # Track last turn
-        if "last_turn" not in st.session_state:
-            st.session_state.last_turn = -1
-
-        # Reset state if turn changed
-        if st.session_state.turn != st.session_state.last_turn:
-            st.session_state.pop(f"base_score_{current_player}", None)
-            st.session_state.pop(f"multiplier_{current_player}", None)
-            st.session_state.last_turn = st.session_state.turn
-            st.session_state.has_thrown = False
-            if "throw_count" not in st.session_state:
-                st.session_state.throw_count = 0
-
-        # Throw confirmation logic
-        with st.form(key=f"{current_player}_throw_form_{st.session_state.throw_count}", clear_on_submit=True):
+        current_player = game.current_player.name  # Current player
+        st.image(get_avatar(st.session_state.avatars[current_player], remote=False), width=100, caption=f"{current_player}'s Avatar")
+        st.subheader(f"{current_player}'s turn – Current Score: {game.current_player.score}")
+        route = suggest(game.current_player.score, DARTS_PER_VISIT - game.darts_thrown, game.out_rule)
+        if route and not game.visit_over:
+            st.info(f"🎯 Checkout: {format_route(route)}")  # Precomputed finish for the darts left
+        if not game.visit_over:
+            target = load_strategy(game.out_rule).aim(game.current_player.score, DARTS_PER_VISIT - game.darts_thrown, game.visit_start)
+            st.caption(f"🧠 Best target for this dart: {dart_name(target)}")
+
+        # Throw confirmation logic (one form per dart)
+        with st.form(key=f"throw_form_{game.visits}_{game.darts_thrown}", clear_on_submit=True):
             base_score = st.selectbox(
                 "Base Score",
                 [i for i in range(1, 21)] + [25, 50],
-                key=f"base_score_{current_player}_{st.session_state.throw_count}"
+                key=f"base_score_{game.visits}_{game.darts_thrown}"
             )
             multiplier = st.radio(
                 "Multiplier",
                 ["Single", "Double", "Triple"],
                 horizontal=True,
-                key=f"multiplier_{current_player}_{st.session_state.throw_count}"
+                key=f"multiplier_{game.visits}_{game.darts_thrown}"
             )
             submitted = st.form_submit_button("Confirm Throw")
 
-        if submitted and not st.session_state.has_thrown:
+        if submitted and not game.visit_over:
             # Validate score rules
             if base_score in [25, 50] and multiplier in ["Double", "Triple"]:
                 st.info("Double or Triple is not allowed on 25 or 50. Defaulting to Single.")
                 multiplier = "Single"
 
-            # Calculate points
-            points = base_score
-            if multiplier == "Double":
-                points *= 2
-            elif multiplier == "Triple":
-                points *= 3
-
-            # Update score and handle overshoot or win
-            current_score = st.session_state.scores[current_player]
-            new_score = current_score - points
-
-            if new_score < 0:
-                st.info("Overshoot! Score remains the same.")
-            elif new_score == 0:
-                if st.session_state.require_double_out and multiplier != "Double":
-                    st.info("You need to finish on a Double to win!")
-                else:
-                    st.session_state.scores[current_player] = 0
-                    st.session_state.winner = current_player
-                    st.session_state.throws[current_player].append(points)
-                    st.session_state.has_thrown = True
-                    st.stop()
+            # Bullseye (50) counts as a double bull for double-out (throws.py, same as the Tkinter screen)
+            segment, factor = from_board(base_score, multiplier)
+            result = st.session_state.journal.apply_throw(segment, factor)  # Score, bust and double-out rules, journaled
+
+            if result == BUST:
+                st.info(f"Bust! Score goes back to {game.current_player.score}.")
             else:
-                st.session_state.scores[current_player] = new_score
-                st.session_state.throws[current_player].append(points)
-                st.session_state.throw_count += 1
-                if st.session_state.throw_count >= 3:
-                    st.session_state.has_thrown = True
-                    st.stop()
-            st.rerun()  # ChatGPT fix to update score display immediately after confirming a throw
+                record_throw(current_player, segment * factor)
+                if result == WIN:
+                    st.session_state.winner = current_player
+                if not game.visit_over or result == WIN:
+                    st.rerun()  # Update the score display immediately after confirming a throw
 
         # Turn switching logic
-        if st.session_state.has_thrown:
+        if game.visit_over:
             if st.button("Next Turn"):
-                st.session_state.turn = (st.session_state.turn + 1) % len(st.session_state.players)  # Next player
-                st.session_state.has_thrown = False  # Reset throw status
-                st.session_state.throw_count = 0
-                current_player = st.session_state.players[st.session_state.turn]
-                st.session_state.pop(f"base_score_{current_player}", None)  # Clear selections
-                st.session_state.pop(f"multiplier_{current_player}", None)
+                st.session_state.journal.end_visit()  # Next player
                 st.rerun()  # Refresh UI
 
 # Restart behavior
 if st.button("Restart"):
+    if st.session_state.get("journal") is not None:
+        st.session_state.journal.discard()  # Abandoned game: nothing to resume
     for key in list(st.session_state.keys()):
         del st.session_state[key]  # Clear session state to restart the game
     st.rerun()  # ChatGPT fix: immediately refresh UI after restart
@@ -1,12 +1,22 @@
 # Import required libraries
-import matplotlib  # Library for creating data visualizations and charts
-matplotlib.use('Agg')  # Force matplotlib to use non-interactive 'Agg' backend - necessary for Streamlit to avoid conflicts with its rendering system
-import matplotlib.pyplot as plt  # Import the pyplot module specifically, which provides MATLAB-like plotting interface for creating charts
+# Heavy libraries are imported where they are used, so a script run only pays for what it shows:
+# pandas on the game-over screen, sklearn when a model is trained or loaded (ml_training, model_registry),
+# requests when pro data or avatars are fetched (pro_stats, avatars). Charts use st.bar_chart, no matplotlib.
 import streamlit as st  # Import Streamlit, the web app framework that turns data scripts into shareable web apps
-import pandas as pd  # Import pandas for data manipulation - provides DataFrame objects that make data analysis easier
-import numpy as np  # Import numpy for numerical operations - needed for array manipulations and mathematical functions
-from sklearn.linear_model import LogisticRegression  # Import LogisticRegression for win/loss prediction - chosen because it works well for binary classification
-import requests  # Import requests library to make HTTP calls to external APIs (used for fetching pro player data)
+from ml_training import TrainingService  # Incremental win/loss model (SGD logistic regression) trained in a background thread
+import model_registry  # Saved model artifacts, keyed by feature schema version and training data hash
+import uuid  # Unique id for each game, part of the key of every ML snapshot
+from pro_stats import ProStatsCache  # Cached pro player stats, refreshed from the API in the background
+from avatars import get_avatar, prerender  # Avatar PNGs cached in memory and on disk (works offline)
+from engine import GameState, BUST, WIN, STRAIGHT_OUT, DOUBLE_OUT, DARTS_PER_VISIT  # Shared game rules (scores, busts, double-out)
+from checkout import suggest, format_route, dart_name  # Best finish for the remaining score and darts
+from throws import from_board, from_history, heatmap  # Two-byte darts, scored and counted in bulk
+from game_logic import handle_win, recover_games  # Saves a finished game to the results history
+from journal import journal_path, journal_game_id, open_journal, claim, darts_played  # Every throw on disk, to resume after a restart
+from results import get_all_player_stats  # Stats of the saved game history, for every player at once
+from leaderboard import get_leaderboard  # All-time ranking, updated with each saved game
+from ratings import get_ratings, DEFAULT_RATING  # Multi-player Elo of every saved player
+from ml_features import FEATURES, SampleBuffer, ThrowStats  # Running throw stats and columnar ML sample buffer
 
 # Configure the Streamlit page settings - must be called before any other Streamlit function
 st.set_page_config(
@@ -14,65 +24,24 @@ st.set_page_config(
     layout='centered'  # Use centered layout (vs 'wide') for better readability on various devices
 )
 
-# Game logic functions - These functions handle the core dart game mechanics
-
-def create_players(players_names):
-    """Create a list of player dictionaries with initial values"""
-    # Using list comprehension for efficiency - creates a dictionary for each player in a single line
-    # Dictionary structure with multiple properties enables easy tracking of various player attributes
-    # - name: Player's display name (string)
-    # - score: Starting score (301 is standard for casual darts)
-    # - history: Empty list that will store throw history for analysis
-    # - victories: Counter for total wins (for potential future feature)
-    return [{'name': name, 'score': 301, 'history': [], 'victories': 0} for name in players_names]
-
-def process_turn(player, throws):
-    """Process a player's turn and update their score based on throws"""
-    # Calculate total points for this turn by summing all throw values
-    total_score = sum(throws)  # Using sum() is more concise than manual addition in a loop
-    
-    # Calculate new score by subtracting current turn's points from player's current score
-    # Dart scoring is subtractive - players start with a score and decrease to zero
-    new_score = player['score'] - total_score
-    
-    # Make sure ML data structure exists in session state
-    # This check prevents errors if the function is called before ML structure initialization
-    if 'ml_data' not in st.session_state:
-        # Create empty DataFrame with specific columns for ML training data
-        # Column structure designed to capture relevant features for win prediction
-        st.session_state.ml_data = pd.DataFrame(columns=[
-            'player',        # Player name (string) - for grouping and identification
-            'avg_throw',     # Average throw score (float) - key predictor of skill
-            'total_throws',  # Total number of throws (int) - measures experience in this game
-            'current_score', # Remaining score (int) - proximity to winning
-            'max_throw',     # Best throw (int) - indicator of peak performance
-            'won'            # Whether player won (binary) - target variable for ML
-        ])
-    
-    # Record this turn's throws in player history for later analysis
-    # Append to the list rather than overwriting to maintain complete game history
-    player['history'].append(throws)
-    
-    # Handle different scoring scenarios according to dart rules
-    if new_score < 0:
-        # BUST case: Player went below zero (overshoot scenario)
-        message = 'Bust! You overpassed your score.'  # Informative message for player
-        new_score = player['score']  # Score stays the same if the player busts - standard dart rule
-        game_over = False  # Game continues after a bust
-    else:
-        # Normal scoring case or potential win
-        message = f'Remaining score: {new_score} points'  # Feedback on remaining points
-        game_over = new_score == 0  # Game is over only when score is exactly zero - standard dart rule
-    
-    # Update player's score in the player object
-    # Must be done after all checks to avoid premature score updates
-    player['score'] = new_score
-    
-    # Return multiple values as a tuple for flexibility in the calling code
-    # - game_over: Boolean flag to indicate if player has won
-    # - new_score: Updated score for display and further game logic
-    # - message: Feedback text to show the player
-    return game_over, new_score, message
+# Journals of the games in progress (journal.py), journals/Try-File3-<game id>.journal: one line per throw,
+# removed by handle_win once the game is saved
+JOURNAL_APP = 'Try-File3'
+
+# Game logic - the dart rules (scores, busts, double-out, turn order) are in engine.GameState,
+# the same engine the Tkinter version uses; this app only turns form input into engine calls
+
+def record_throw(player_name, points):
+    """Record a confirmed throw and capture exactly one ML snapshot for it"""
+    st.session_state.throws[player_name].append(points)
+    stats = st.session_state.throw_stats[player_name]
+    stats.add(points)
+    # Stable key (game id, turn, throw index) for this throw event
+    # Reruns caused by widgets, 'Next turn' or the game-over screen can't add the same snapshot twice
+    game = st.session_state.game
+    key = (st.session_state.game_id, game.visits, game.darts_thrown)
+    # 'won' starts at 0 and is set to 1 on the player's latest row if they win
+    st.session_state.ml_samples.record(key, player_name, stats, game.player(player_name).score)
 
 # Multi-player dart game using Streamlit for name input, avatars, and score tracking
 # Each section of the app is clearly separated for maintenance and readability
@@ -89,22 +58,66 @@ st.write('Welcome to the compact dart game for multiple players!')  # Brief welc
 if 'players' not in st.session_state:
     # All key game state variables are initialized here to avoid "key not found" errors later
     st.session_state.players = []  # List to store player names - empty until game setup
-    st.session_state.scores = {}   # Dictionary mapping player names to scores - empty until game setup
+    st.session_state.game = None  # engine.GameState (scores, turns, rules) - None until game setup
     st.session_state.winner = None  # Will store winner's name when someone wins - None indicates no winner yet
     st.session_state.game_started = False  # Flag to control UI flow - False shows setup screen, True shows game UI
-    st.session_state.game_count = 0  # Counter for total completed games - used for statistics and ML training
-    
-    # DataFrame to store player performance data for ML training
-    # Using pandas DataFrame for ML data offers flexible data manipulation capabilities
-    # Empty DataFrame with predefined columns ensures consistent data structure
-    st.session_state.ml_data = pd.DataFrame(columns=[
-        'player',        # Player identification 
-        'avg_throw',     # Average points per throw - measures consistency
-        'total_throws',  # Number of throws made - measures game progress
-        'current_score', # Remaining score - measures proximity to winning
-        'max_throw',     # Maximum points scored in a single throw - measures skill ceiling
-        'won'            # Binary outcome (0/1) - target variable for ML model
-    ])
+
+@st.cache_resource
+def load_ml_state():
+    """ML state shared by every session of this server process, restored once from the latest saved model"""
+    # Columnar buffer to store player performance rows for ML training
+    # Rows are appended to compact arrays; a DataFrame is only built when a model is trained
+    # Columns: player, avg_throw, total_throws, current_score, max_throw, won (target variable)
+    ml_state = {'samples': SampleBuffer(), 'game_count': 0}
+
+    def save_model(trainer, samples):
+        # Runs in the training thread after every fit, so a server restart or a new tab starts from here
+        model_registry.save_artifact(trainer.data_hash, {
+            'model': trainer.model,
+            'trainer': trainer.state(),
+            'samples': samples,
+            'game_count': ml_state['game_count'],
+        })
+
+    # Background trainer: refits the model on new rows only and swaps it in when ready
+    trainer = TrainingService(min_samples=10, on_fit=save_model)
+    artifact = model_registry.load_latest()  # None on the very first start
+    if artifact is not None:
+        trainer.restore(artifact['model'], artifact['trainer'])
+        ml_state['samples'] = artifact['samples']
+        ml_state['game_count'] = artifact['game_count']
+    ml_state['trainer'] = trainer
+    return ml_state
+
+ml_state = load_ml_state()
+
+@st.cache_resource
+def load_pro_stats():
+    """Pro stats cache shared by every session, backed by a JSON file so a restart doesn't refetch"""
+    # Live Sportradar API with the local pro_players.json fixture as fallback
+    # (set DARTCOMPACT_PRO_PROVIDER=fixture to stay offline)
+    return ProStatsCache()
+
+pro_stats = load_pro_stats()
+
+@st.cache_resource
+def load_strategy(out_rule):
+    """Aiming policy solved for a club-level player, computed once and then read from disk"""
+    # numpy is only loaded once a game is being played
+    from simulator import SKILL_LEVELS
+    from strategy import load_or_solve
+    return load_or_solve(SKILL_LEVELS['club'], out_rule)
+
+# ML state is initialized separately: 'Restart Game' keeps these keys, so they must not be reset here
+if 'ml_trainer' not in st.session_state:
+    st.session_state.game_count = ml_state['game_count']  # Counter for total completed games - used for statistics and ML training
+    st.session_state.ml_samples = ml_state['samples']  # Shared by all sessions
+    st.session_state.ml_trainer = ml_state['trainer']  # One model for everybody instead of one fit per user
+
+# Pick up the latest model finished by the background trainer
+# This is a plain attribute read, the page never waits for a fit in progress
+if st.session_state.ml_trainer.model is not None:
+    st.session_state.ml_model = st.session_state.ml_trainer.model
 
 # Game setup UI
 # This section is only shown when no game is in progress (game_started = False)
@@ -112,6 +125,35 @@ if 'players' not in st.session_state:
     
 # Show setup UI when no game is in progress
 if not st.session_state.game_started:
+    # Resume option
+    # Games cut off by a server restart or a closed tab are still in their journals, offer to go on with one
+    # of them; a won game whose save was cut off is saved here. Games played in other tabs aren't listed
+    for path, unfinished in recover_games(JOURNAL_APP):
+        scores = ', '.join(f'{p.name} {p.score}' for p in unfinished.players)
+        if st.button(f'Resume the unfinished game ({scores})', key=f'resume_{path}'):
+            journal = claim(path)  # Keep journaling from here, in this session only
+            if journal is None:
+                st.warning('This game has been resumed in another session.')
+                continue
+            unfinished = journal.game
+            names = [p.name for p in unfinished.players]
+            st.session_state.players = names
+            st.session_state.game = unfinished  # Scores, turn and rules as journaled
+            st.session_state.journal = journal
+            st.session_state.throws = {name: [] for name in names}
+            st.session_state.throw_stats = {name: ThrowStats() for name in names}
+            # Throw history rebuilt dart by dart, as record_throw kept it (busts count 0); the ML rows
+            # of these throws aren't recorded again
+            for name, points, result in darts_played(unfinished):
+                points = 0 if result == BUST else points
+                st.session_state.throws[name].append(points)
+                st.session_state.throw_stats[name].add(points)
+            st.session_state.avatars = {name: name for name in names}  # Avatar seeds; the choices aren't journaled
+            prerender(names)
+            st.session_state.game_id = journal_game_id(JOURNAL_APP, path)  # Same game, same id
+            st.session_state.game_started = True
+            st.rerun()
+
     # Input for selecting number of players (1-8)
     # number_input provides integer selection with increment buttons
     # min_value=1 ensures at least one player, max_value=8 prevents overcrowding
@@ -129,11 +171,13 @@ if not st.session_state.game_started:
 
     # Initialize arrays for player data collection
     player_names = []  # Will hold the names entered by user - separate from session state until game starts
-    avatars = {}  # Will map player names to their avatar URLs - for visual player identification
+    avatars = {}  # Will map player names to their avatar seeds - for visual player identification
     
-    # Available avatar options (using Dicebear API)
+    # Available avatar options (Dicebear seeds)
     # Limited options make selection simpler and ensure consistency
     options = ['Kim', 'Alexis', 'Robyn', 'Billie', 'Lou', 'Charlie']
+    # Load every option once in a background thread, so switching the radio choice shows the image instantly
+    prerender([f'{option}_default' for option in options])
 
     # Create text inputs for each player's name
     # Loop generates the right number of input fields based on num_players selection
@@ -150,18 +194,19 @@ if not st.session_state.game_started:
         # Each player gets their own set of options with a unique key
         avatar_choice = st.radio(f'Choose avatar for Player {i+1}', options=options, horizontal=True, key=f'avatar_choice_{i}')
         
-        # Generate avatar URL using dicebear API
-        # This free API generates consistent avatars based on the seed value
+        # Get the avatar image for the chosen seed
+        # Dicebear's PNG is fetched only once, by prerender in the background, and then served from the
+        # local caches; until then (or offline) a generated identicon is shown, the page never waits on the network
         # Using _default suffix ensures consistent style across avatars
-        avatar_url = f'https://api.dicebear.com/7.x/adventurer/svg?seed={avatar_choice}_default'
+        seed = f'{avatar_choice}_default'
         
         # Display avatar preview so players can see their selection
         # width=100 keeps the avatar reasonably sized on the page
-        st.image(avatar_url, width=100)
+        st.image(get_avatar(seed, remote=False), width=100)
         
-        # Store avatar URL in dictionary, mapped to player name
-        # This creates {name: url} pairs for easy retrieval during gameplay
-        avatars[name] = avatar_url
+        # Store avatar seed in dictionary, mapped to player name
+        # This creates {name: seed} pairs; the podium and turn view read the cached PNG without any request
+        avatars[name] = seed
         
     # Save all avatars to session state for use throughout the game
     # Doing this here ensures all avatars are set before the game starts
@@ -175,53 +220,26 @@ if not st.session_state.game_started:
         if all(name.strip() != '' for name in player_names):
             # Store finalized player data in session state
             st.session_state.players = player_names  # List of player names in turn order
-            st.session_state.scores = {name: starting_score for name in player_names}  # Initial scores dictionary
+            # Game engine: scores, whose turn it is and the rules (start score, double-out)
+            st.session_state.game = GameState(player_names, starting_score, DOUBLE_OUT if require_double_out else STRAIGHT_OUT)
+            st.session_state.game_id = uuid.uuid4().hex  # Identifies this game in the ML snapshots and its journal
+            # Every throw is written to the game's journal as it's played
+            st.session_state.journal = open_journal(st.session_state.game, journal_path(JOURNAL_APP, st.session_state.game_id))
             st.session_state.throws = {name: [] for name in player_names}  # Empty throw history for each player
-            st.session_state.turn = 0  # First player's turn (index 0)
+            # Running count/sum/max per player, updated once per confirmed throw
+            st.session_state.throw_stats = {name: ThrowStats() for name in player_names}
             st.session_state.game_started = True  # Flag game as started to switch to game UI
-            st.session_state.require_double_out = require_double_out  # Store double-out rule setting
             
             # Update game counter for statistics tracking
-            # Increment rather than set to ensure accurate count across multiple games
-            st.session_state.game_count += 1
+            # Increment rather than set to ensure accurate count across multiple games (and sessions)
+            ml_state['game_count'] += 1
+            st.session_state.game_count = ml_state['game_count']
             st.success(f'Starting game #{st.session_state.game_count}')  # Success message with game number
             
             # ML model training
-            # Only train model if we have at least 2 games of data
-            # This ensures enough data points for meaningful patterns
-            if st.session_state.game_count >= 2:
-                try:
-                    # Get all collected ML data from previous games
-                    df = st.session_state.ml_data
-                    
-                    # Only train if we have enough data and examples of both outcomes
-                    # Need at least 10 data points for minimal statistical significance
-                    # Need both positive and negative cases (won=0, won=1) for classification
-                    if len(df) >= 10 and len(set(df['won'])) > 1:
-                        # Prepare features (X) and target (y)
-                        # Apply pd.to_numeric to ensure all features are properly converted to numbers
-                        # errors='coerce' handles any non-numeric values by converting them to NaN
-                        X = df[['avg_throw', 'total_throws', 'current_score', 'max_throw']].apply(pd.to_numeric, errors='coerce')
-                        
-                        # Convert target to integer type (0 or 1) for binary classification
-                        y = df['won'].astype(int)
-                        
-                        # Create and train logistic regression model
-                        # LogisticRegression is used because:
-                        # 1. It works well for binary classification (win/lose)
-                        # 2. It can provide probability estimates
-                        # 3. It's relatively simple and interpretable
-                        # solver='liblinear' is good for small datasets
-                        model = LogisticRegression(solver='liblinear')
-                        model.fit(X, y)  # Train model with features and target
-                        
-                        # Store trained model in session state for later use
-                        st.session_state.ml_model = model
-                        st.success('ML model trained successfully!')  # Success message
-                except Exception as e:
-                    # Catch and display any errors during training
-                    # This prevents crashes if something goes wrong with the ML process
-                    st.error(f'Error training ML model: {e}')
+            # Rows not given to the model yet (e.g. from a game that was restarted before its end)
+            # are trained in the background; the trainer waits for at least 10 rows and both outcomes
+            st.session_state.ml_trainer.submit(st.session_state.ml_samples)
                 
             # Refresh UI to show game interface
             # rerun() is more reliable than update() for complete UI refresh
@@ -234,70 +252,39 @@ if not st.session_state.game_started:
 else:
     # Game play ui
     
-    # Initialize throw tracking variables if needed
-    if 'has_thrown' not in st.session_state:
-        st.session_state.has_thrown = False  # Tracks if current player completed their throws
-    if 'throw_count' not in st.session_state:
-        st.session_state.throw_count = 0  # Counts how many throws current player has made (max 3)
-
-    # Get current player's data for this turn
-    player_name = st.session_state.players[st.session_state.turn]  # Get name of current player
-    player_throws = st.session_state.throws[player_name]  # Get throw history for this player
-    current_score = st.session_state.scores[player_name]  # Get current score for this player
-    
-    # ML data collection
-    
-    # Only track ML data after player has made at least one throw (to avoid empty data)
-    if player_throws:
-        # Create data point with player's current performance metrics
-        player_data = {
-            'player': player_name,  # Player name
-            'avg_throw': sum(player_throws) / len(player_throws),  # Average points per throw
-            'total_throws': len(player_throws),  # Total number of throws made
-            'current_score': current_score,  # Current remaining score
-            'max_throw': max(player_throws),  # Highest scoring throw
-            'won': 0  # Initially marked as not won (will be updated to 1 if they win)
-        }
-        # Add to ML dataset for training
-        st.session_state.ml_data = pd.concat([st.session_state.ml_data, pd.DataFrame([player_data])], ignore_index=True)
-
     # Game over screen
     
     # Check if we have a winner and display end-game UI
     if st.session_state.winner:
+        # pandas is only needed for the tables and charts of this screen
+        import pandas as pd  # DataFrame objects make data analysis easier
+
         # Show winner announcement
         st.success(f'🏆 {st.session_state.winner} has won the game!')
         
         # Process winner data only once to avoid duplicating entries
         if 'winner_processed' not in st.session_state:
             st.session_state.winner_processed = True  # Flag to prevent re-processing
+
+            # Save the game to the results history (all-time statistics), then drop its journal
+            handle_win(st.session_state.game, st.session_state.journal)
             
-            # ML model update with winner data
-            try:
-                df = st.session_state.ml_data
-                # Need sufficient data and both win/loss examples to train
-                if len(df) >= 10 and len(set(df['won'])) > 1:
-                    # Prepare features and target
-                    X = df[['avg_throw', 'total_throws', 'current_score', 'max_throw']].apply(pd.to_numeric, errors='coerce')
-                    y = df['won'].astype(int)
-                    # Create and train model
-                    model = LogisticRegression(solver='liblinear')
-                    model.fit(X, y)
-                    # Store model in session state
-                    st.session_state.ml_model = model
-                    st.success('ML model trained successfully!')
-            except Exception as e:
-                st.error(f'Error training ML model: {e}')
+            # ML model update with this game's rows
+            # partial_fit on the new rows only, in a background thread - the page doesn't wait
+            if st.session_state.ml_trainer.submit(st.session_state.ml_samples) is not None:
+                st.info('Updating the ML model in the background...')
 
         # Final standings 
         
-        # Create player ranking for final standings
-        winner = st.session_state.winner  # Get winner's name
-        others = [p for p in st.session_state.players if p != winner]  # All other players
-        # Sort other players by score (lower score is better)
-        others_sorted = sorted(others, key=lambda p: st.session_state.scores[p])
-        # Final ranking with winner first, then others sorted by score
-        ranking = [winner] + others_sorted
+        # Create player ranking for final standings, once per game (the scores don't change any more)
+        if 'ranking' not in st.session_state:
+            winner = st.session_state.winner  # Get winner's name
+            others = [p for p in st.session_state.players if p != winner]  # All other players
+            # Sort other players by score (lower score is better)
+            others_sorted = sorted(others, key=lambda p: st.session_state.game.player(p).score)
+            # Final ranking with winner first, then others sorted by score
+            st.session_state.ranking = [winner] + others_sorted
+        ranking = st.session_state.ranking
 
         # Display podium with medals
         st.markdown('## 🏅 Final Standings')
@@ -313,7 +300,7 @@ else:
                     medal = '🥇 **1st Place**' if pos == 0 else '🥈 **2nd Place**' if pos == 1 else '🥉 **3rd Place**'
                     st.markdown(medal)
                     # Display player avatar and name
-                    st.image(st.session_state.avatars[player], width=100)
+                    st.image(get_avatar(st.session_state.avatars[player], remote=False), width=100)
                     st.markdown(f'### {player}')
         
         # Game statistics
@@ -322,12 +309,12 @@ else:
         st.write('## 📊 Game Statistics')
         stats_data = {'Players': [], 'Average Points': [], 'Max Points': []}
 
-        # Collect statistics from each player's throws
-        for player, throws in st.session_state.throws.items():
-            if throws:  # Only include players who made throws
+        # Collect statistics from each player's running throw stats
+        for player, stats in st.session_state.throw_stats.items():
+            if stats.count:  # Only include players who made throws
                 stats_data['Players'].append(player)
-                stats_data['Average Points'].append(sum(throws)/len(throws))
-                stats_data['Max Points'].append(max(throws))
+                stats_data['Average Points'].append(stats.average)
+                stats_data['Max Points'].append(stats.max)
 
         # Create visualizations if we have data
         if stats_data['Players']:
@@ -339,18 +326,26 @@ else:
             # Show max points chart
             st.write('### Max Points in a Single Throw')
             st.bar_chart(stats_df['Max Points'])
+
+        # Segments hit by each player, counted from the game's darts in one pass per player
+        hits = {p.name: heatmap(from_history(p.history)).sum(axis=1) for p in st.session_state.game.players}
+        if any(h.sum() for h in hits.values()):
+            st.write('### Segments hit')
+            segment_df = pd.DataFrame(hits, index=range(len(next(iter(hits.values())))))
+            st.bar_chart(segment_df[segment_df.sum(axis=1) > 0])
         
         # ML model insights
         
         # Display ML insights if model exists and we have enough data
-        if 'ml_model' in st.session_state and len(st.session_state.ml_data) > 5:
+        if 'ml_model' in st.session_state and len(st.session_state.ml_samples) > 5:
             st.markdown("## 🧠 ML Model Insights")
+            ml_data = st.session_state.ml_samples.to_frame()  # Built once for this section
             
             # Get list of all unique players from ML data
-            all_players = list(set(st.session_state.ml_data['player'].values))
+            all_players = list(set(ml_data['player'].values))
             
             # Aggregate player statistics by grouping ML data
-            player_stats = st.session_state.ml_data.groupby('player').agg({
+            player_stats = ml_data.groupby('player').agg({
                 'won': 'sum',  # Count total wins
                 'avg_throw': 'mean',  # Average score per throw
                 'total_throws': 'sum',  # Total throws made
@@ -374,12 +369,13 @@ else:
             
             # Create data for player statistics table
             display_data = []
+            stats_by_player = player_stats.set_index('player')  # One lookup per player instead of a scan
             for player in all_players:
                 # Only include players with statistics
-                if player in player_stats['player'].values:
+                if player in stats_by_player.index:
                     # Get player's average score, max score, and win count
-                    avg_score = player_stats[player_stats['player'] == player]['avg_throw'].values[0]
-                    max_score = player_stats[player_stats['player'] == player]['max_throw'].values[0]
+                    avg_score = stats_by_player.at[player, 'avg_throw']
+                    max_score = stats_by_player.at[player, 'max_throw']
                     wins = win_counts.get(player, 0)
                     
                     # Calculate win percentage 
@@ -404,43 +400,60 @@ else:
                 st.dataframe(display_df)
             else:
                 st.write('No player statistics available yet.')
+
+        # Leaderboard
+
+        # All-time ranking kept sorted game by game (leaderboard.py), so top 10 and ranks are lookups
+        board = get_leaderboard()
+        if len(board):
+            st.write('## 🏆 Leaderboard')
+            st.dataframe(pd.DataFrame(board.top(10)).set_index('player'))
+            # Where this game's players stand among everyone who played here
+            st.write(' · '.join(f'{p}: #{board.rank(p)} of {len(board)}' for p in ranking if p in board))
         
+        # All-time statistics
+
+        # Stats of every player of the saved history, read from the results index in one go
+        # The index is kept up to date by each saved game, so this costs no file scan
+        history_stats = get_all_player_stats()
+        if history_stats:
+            st.write('## 📜 All-time statistics')
+            history_df = pd.DataFrame.from_dict(history_stats, orient='index')
+            # Elo rating of each player (ratings.py), updated with every saved game
+            elo = get_ratings()
+            history_df['elo'] = [round(elo.get(name, DEFAULT_RATING)) for name in history_df.index]
+            st.dataframe(history_df)
+
         # Pro player comparison
         
         st.write('## Compare yourself to a Pro')
         # Pro player details
         pro_player = 'Michael van Gerwen'  # Famous professional dart player
         pro_competitor_id = 'sr:competitor:26280'  # API ID for this player
-        API_KEY = "0j9Nj7DIbdznIAKdz6LPFnHWmYChwGUQgboXO76n"  # Sportradar API key
         
         # Default pro player statistics (used if API fails)
         pro_avg = 33  # Pro average score per throw
         pro_max = 60   # Pro maximum score (perfect throw)
         
-        # Try to fetch real pro data from API
-        try:
-            # Build API request URL
-            url = f'https://api.sportradar.com/darts/trial/v2/en/competitors/{pro_competitor_id}/profile.json?api_key={API_KEY}'
-            # Make API request with timeout
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                # Parse JSON response
-                data = response.json()
-                # Extract statistics
-                stats = data.get('statistics', {})
-                # Get average and max scores (use defaults if not found)
-                pro_avg = stats.get('average_3_dart_score', pro_avg)
-                pro_max = stats.get('best_3_dart_score', pro_max)
-        except Exception as e:
-            # Log error but continue with default values
-            st.warning(f'Could not fetch pro data: {str(e)}. Using default values.')
+        # Read the pro data from the cache - this never waits for the network
+        # A missing or outdated entry is refreshed in a background thread and shows up on a later rerun
+        stats = pro_stats.get(pro_competitor_id)
+        if stats is not None:
+            # Get average and max scores (use defaults if not found)
+            pro_avg = stats.get('average_3_dart_score', pro_avg)
+            pro_max = stats.get('best_3_dart_score', pro_max)
+        elif pro_stats.last_error is not None:
+            # Refresh failed and nothing cached yet - continue with default values
+            st.warning(f'Could not fetch pro data: {pro_stats.last_error}. Using default values.')
+        else:
+            st.info('Loading pro data in the background, using default values for now.')
  
         # Compare each player to the pro
-        for player, throws in st.session_state.throws.items():
-            if throws:  # Only show for players who made throws
-                # Calculate player's average and max scores
-                user_avg = sum(throws)/len(throws)
-                user_max = max(throws)
+        for player, stats in st.session_state.throw_stats.items():
+            if stats.count:  # Only show for players who made throws
+                # Player's average and max scores from the running stats
+                user_avg = stats.average
+                user_max = stats.max
  
                 # Display comparison UI
                 st.markdown(f'### {player} vs {pro_player}')
@@ -467,127 +480,86 @@ else:
     
     # Show game interface for current player when game is in progress (no winner yet)
     else:
-        # Get current player information
-        current_player = st.session_state.players[st.session_state.turn]
+        # Get current player information from the game engine
+        game = st.session_state.game
+        current_player = game.current_player.name
         # Display player avatar and current score
-        st.image(st.session_state.avatars[current_player], width=100, caption=f"{current_player}'s Avatar")
-        st.subheader(f"{current_player}'s turn – Current Score: {st.session_state.scores[current_player]}")
-
-        # Track player turns to reset state when player changes
-        if 'last_turn' not in st.session_state:
-            st.session_state.last_turn = -1  # Initialize to invalid turn number
-
-        # Reset player state when turn changes to a new player
-        if st.session_state.turn != st.session_state.last_turn:
-            # Clear previous throw selection values
-            st.session_state.pop(f'base_score_{current_player}', None)
-            st.session_state.pop(f'multiplier_{current_player}', None)
-            # Update turn tracker
-            st.session_state.last_turn = st.session_state.turn
-            # Reset throw state for new player
-            st.session_state.has_thrown = False
-            st.session_state.throw_count = 0
+        st.image(get_avatar(st.session_state.avatars[current_player], remote=False), width=100, caption=f"{current_player}'s Avatar")
+        st.subheader(f"{current_player}'s turn – Current Score: {game.current_player.score}")
+        # Finish suggestion from the precomputed checkout table (O(1) lookup)
+        route = suggest(game.current_player.score, DARTS_PER_VISIT - game.darts_thrown, game.out_rule)
+        if route and not game.visit_over:
+            st.info(f'🎯 Checkout: {format_route(route)}')
+        # Target that minimises the expected darts to finish (dynamic programming over all scores)
+        if not game.visit_over:
+            target = load_strategy(game.out_rule).aim(game.current_player.score, DARTS_PER_VISIT - game.darts_thrown, game.visit_start)
+            st.caption(f'🧠 Best target for this dart: {dart_name(target)}')
 
         # Throw input form
         
         # Form for player to input their throw details
-        with st.form(key=f'{current_player}_throw_form_{st.session_state.throw_count}', clear_on_submit=True):
+        # The key changes with every dart (visit number, darts thrown), so each dart gets a fresh form
+        with st.form(key=f'throw_form_{game.visits}_{game.darts_thrown}', clear_on_submit=True):
             # Base score selection (dart board numbers)
             base_score = st.selectbox(
                 'Base Score',
                 [0] + [i for i in range(1, 21)] + [25, 50],  # 0-20, plus 25 (outer bull) and 50 (bullseye)
-                key=f'base_score_{current_player}_{st.session_state.throw_count}'
+                key=f'base_score_{game.visits}_{game.darts_thrown}'
             )
             # Multiplier selection (single, double, triple)
             multiplier = st.radio(
                 'Multiplier',
                 ['Single', 'Double', 'Triple'],
                 horizontal=True,
-                key=f'multiplier_{current_player}_{st.session_state.throw_count}'
+                key=f'multiplier_{game.visits}_{game.darts_thrown}'
             )
             # Submit button
             submitted = st.form_submit_button('Confirm Throw')
 
         # Throw processing 
 
-        # Process the throw if form was submitted and turn is not complete
-        if submitted and not st.session_state.has_thrown:
+        # Process the throw if form was submitted and the visit is not over (3 darts, bust or win)
+        if submitted and not game.visit_over:
             # Validate dart rules: 25 and 50 can only be hit as singles (no double/triple bulls)
             if base_score in [25, 50] and multiplier in ['Double', 'Triple']:
                 st.info('Double or Triple is not allowed on 25 or 50. Using Single.')
                 multiplier = 'Single'
 
-            # Calculate points based on base score and multiplier
-            points = base_score * (1 if multiplier == 'Single' else 2 if multiplier == 'Double' else 3)
-
-            # Update score and handle game logic
-            current_score = st.session_state.scores[current_player]
-            new_score = current_score - points  # Subtract points from current score
+            # Same dart encoding as the Tkinter screen (throws.py): the bullseye (50) is a double bull,
+            # which matters for double-out
+            segment, factor = from_board(base_score, multiplier)
+            # The engine updates the score and applies the bust / double-out rules, the journal keeps the throw
+            result = st.session_state.journal.apply_throw(segment, factor)
 
             # Score scenarios 
 
-            # Handle bust (score below 0)
-            if new_score < 0:
-                st.info('Overshoot! Your score remains the same')
-                st.session_state.throws[current_player].append(0)  # Record zero for overshoot
-                st.session_state.throw_count += 1
-                if st.session_state.throw_count >= 3:  # Check if turn is complete (3 throws)
-                    st.session_state.has_thrown = True
-            # Handle exact zero (potential win)
-            elif new_score == 0:
-                # Check double-out rule if enabled
-                if st.session_state.require_double_out and multiplier != 'Double':
-                    st.info('You need to finish on a Double to win!')
-                    st.session_state.throws[current_player].append(0)  # Record zero for invalid finish
-                    st.session_state.throw_count += 1
-                    if st.session_state.throw_count >= 3:  # Check if turn is complete
-                        st.session_state.has_thrown = True
-                else:
-                    # Player wins!
-                    st.session_state.scores[current_player] = 0
-                    st.session_state.winner = current_player  # Set winner
-                    st.session_state.throws[current_player].append(points)  # Record winning throw
-                    
-                    # Update ML data to mark this player as the winner
-                    winner_entries = st.session_state.ml_data[st.session_state.ml_data['player'] == current_player]
-                    if not winner_entries.empty:
-                        # Find most recent entry for this player and mark as win
-                        last_entry_idx = winner_entries.index[-1]
-                        st.session_state.ml_data.at[last_entry_idx, 'won'] = 1
-                    
-                    st.session_state.has_thrown = True
-                    st.rerun()  # Refresh UI to show win screen
-            # Handle normal score update
+            if result == BUST:
+                # Below zero, or no valid finish: the score goes back to where the visit started
+                st.info(f'Bust! Your score goes back to {game.current_player.score}')
+                record_throw(current_player, 0)  # Record zero for a bust
+            elif result == WIN:
+                # Player wins!
+                st.session_state.winner = current_player  # Set winner
+                record_throw(current_player, segment * factor)  # Record winning throw
+                
+                # Update ML data to mark this player's most recent entry as the winner
+                st.session_state.ml_samples.mark_won(st.session_state.game_id, current_player)
+                st.rerun()  # Refresh UI to show win screen
             else:
-                # Update player's score with new value
-                st.session_state.scores[current_player] = new_score
                 # Record this throw in player's history
-                st.session_state.throws[current_player].append(points)
-                # Increment throw counter
-                st.session_state.throw_count += 1
-                # Check if player has completed their 3 throws
-                if st.session_state.throw_count >= 3:
-                    st.session_state.has_thrown = True
+                record_throw(current_player, segment * factor)
             
             # Refresh UI if needed (for showing next throw input)
-            if not st.session_state.has_thrown:
+            if not game.visit_over:
                 st.rerun()
 
         # Next turn button 
         
         # Show next turn button when current player has completed their throws
-        if st.session_state.has_thrown:
+        if game.visit_over:
             if st.button('Next turn'):
-                # Move to next player (cycle back to first player after last)
-                st.session_state.turn = (st.session_state.turn + 1) % len(st.session_state.players)
-                # Reset throw state for next player
-                st.session_state.has_thrown = False
-                st.session_state.throw_count = 0
-                # Get the next player
-                current_player = st.session_state.players[st.session_state.turn]
-                # Clear previous throw selections
-                st.session_state.pop(f'base_score_{current_player}', None)
-                st.session_state.pop(f'multiplier_{current_player}', None)
+                # Move to next player (cycle back to first player after last), journaled too
+                st.session_state.journal.end_visit()
                 # Refresh UI for next player
                 st.rerun()
 
@@ -595,14 +567,17 @@ else:
 
 # Button to restart the game while preserving ML data
 if st.button('Restart Game'):
+    # The abandoned game won't be offered for resuming
+    if st.session_state.get('journal') is not None:
+        st.session_state.journal.discard()
+
     # Save important data before clearing session state
-    saved_ml_data = st.session_state.ml_data.copy() if 'ml_data' in st.session_state else pd.DataFrame(
-        columns=['player', 'avg_throw', 'total_throws', 'current_score', 'max_throw', 'won'])
+    saved_ml_samples = st.session_state.ml_samples if 'ml_samples' in st.session_state else SampleBuffer()
     saved_game_count = st.session_state.game_count if 'game_count' in st.session_state else 0
     saved_ml_model = st.session_state.ml_model if 'ml_model' in st.session_state else None
     
     # Identify keys to preserve (related to ML)
-    keys_to_keep = ['ml_data', 'game_count', 'ml_model']
+    keys_to_keep = ['ml_samples', 'game_count', 'ml_model', 'ml_trainer']
     # Identify keys to clear (everything else)
     keys_to_clear = [k for k in st.session_state.keys() if k not in keys_to_keep]
     
@@ -611,7 +586,7 @@ if st.button('Restart Game'):
         del st.session_state[key]
     
     # Restore saved ML data
-    st.session_state.ml_data = saved_ml_data
+    st.session_state.ml_samples = saved_ml_samples
     st.session_state.game_count = saved_game_count
     if saved_ml_model is not None:
         st.session_state.ml_model = saved_ml_model
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# === Player avatars as local PNG bytes ===
+# get_avatar(seed) returns the rasterised avatar for a seed: from a small in-memory LRU, else from
+# the disk cache, else fetched once as PNG from dicebear and written to disk. Offline (or when
+# dicebear is down) a deterministic identicon is drawn locally instead, so the screens never wait
+# on the network twice and never show a broken image.
+# Screens call get_avatar(seed, remote=False) and let prerender() fetch in the background: an avatar
+# that isn't cached yet is then an identicon placeholder, not remembered, so the next call after the
+# fetch returns the real one.
+
+AVATAR_DIR = "avatars"
+AVATAR_SIZE = 100
+MEMORY_ENTRIES = 64  # Avatars kept in memory
+DISK_ENTRIES = 256  # Files kept in AVATAR_DIR, the least recently used are removed
+DICEBEAR_URL = "https://api.dicebear.com/7.x/adventurer/png?seed={seed}&size={size}"
+RETRY_REMOTE_AFTER = 300  # Seconds without remote fetches after a failed one
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_remote_failed_at = None
+
+
+def _disk_path(seed, size, directory):
+    key = hashlib.sha256(f"{seed}|{size}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(directory, f"{key}.png")
+
+
+def _remember(key, png):
+    with _lock:
+        _memory[key] = png
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _prune_disk(directory):
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".png")]
+    if len(files) > DISK_ENTRIES:
+        files.sort(key=os.path.getmtime)
+        for path in files[:-DISK_ENTRIES]:
+            os.remove(path)
+
+
+def fetch_remote(seed, size=AVATAR_SIZE, timeout=3):
+    import requests  # Only needed the first time a seed is seen
+    response = requests.get(DICEBEAR_URL.format(seed=seed, size=size), timeout=timeout)
+    response.raise_for_status()
+    if not response.content.startswith(b"\x89PNG"):
+        raise ValueError("dicebear did not return a PNG")
+    return response.content
+
+
+def get_avatar(seed, size=AVATAR_SIZE, directory=AVATAR_DIR, remote=True):
+    global _remote_failed_at
+    key = (seed, size)
+    with _lock:
+        png = _memory.get(key)
+        if png is not None:
+            _memory.move_to_end(key)
+            return png
+
+    path = _disk_path(seed, size, directory)
+    try:
+        with open(path, "rb") as f:
+            png = f.read()
+        os.utime(path)  # Mark as recently used for _prune_disk
+    except OSError:
+        png = None
+
+    if png is None and remote and (_remote_failed_at is None or time.time() - _remote_failed_at > RETRY_REMOTE_AFTER):
+        try:
+            png = fetch_remote(seed, size)
+        except Exception:
+            _remote_failed_at = time.time()  # Don't make every new seed wait for the timeout
+        else:
+            os.makedirs(directory, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(png)
+            os.replace(path + ".tmp", path)
+            _prune_disk(directory)
+
+    if png is None:
+        png = identicon(seed, size)  # Not written to disk, the real avatar is tried again later
+        if not remote:
+            return png  # Placeholder while prerender() fetches it
+    _remember(key, png)
+    return png
+
+
+def prerender(seeds, size=AVATAR_SIZE):
+    # Warms the caches in a background thread, e.g. for the avatar choices of the setup screen
+    with _lock:
+        missing = [s for s in seeds if (s, size) not in _memory]
+    if not missing:
+        return None
+    thread = threading.Thread(target=lambda: [get_avatar(s, size) for s in missing], daemon=True)
+    thread.start()
+    return thread
+
+
+# === Offline fallback ===
+def identicon(seed, size=AVATAR_SIZE):
+    # 5x5 symmetric pattern coloured from the seed hash, like GitHub's default avatars
+    digest = hashlib.sha256(str(seed).encode("utf-8")).digest()
+    colour = bytes((digest[0] // 2 + 64, digest[1] // 2 + 64, digest[2] // 2 + 64))
+    background = b"\xf0\xf0\xf0"
+    cells = [[digest[3 + row * 3 + min(col, 4 - col)] & 1 for col in range(5)] for row in range(5)]
+
+    cell = size // 6
+    margin = (size - 5 * cell) // 2
+    rows = []
+    for y in range(size):
+        row = (y - margin) // cell if margin <= y < margin + 5 * cell else None
+        line = bytearray(b"\x00")  # PNG filter type: none
+        for x in range(size):
+            col = (x - margin) // cell if margin <= x < margin + 5 * cell else None
+            line += colour if row is not None and col is not None and cells[row][col] else background
+        rows.append(bytes(line))
+    return encode_png(size, size, b"".join(rows))
+
+
+def encode_png(width, height, raw_rgb):
+    # raw_rgb: filtered scanlines (filter byte + RGB pixels per row)
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw_rgb, 9)) + chunk(b"IEND", b"")
@@ -0,0 +1,546 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# === Benchmarks ===
+# python benchmarks.py                 run every benchmark
+# python benchmarks.py engine          run the named ones
+# python benchmarks.py --json out.json also write the numbers, to compare runs over time
+# Each benchmark returns a dict of measurements and prints a short report.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+# === Startup time ===
+ENTRY_POINTS = ["main.py", "DartCompact.py", "DartCompact2.py", "Try-File3.py"]
+
+# Runs an entry point without starting it: main.py is not run as __main__ (no Tk window) and the
+# Streamlit scripts run in bare mode (no server). Started from an empty directory so nothing is saved.
+RUNNER = "import runpy, sys; sys.path.insert(0, sys.argv[1]); runpy.run_path(sys.argv[2], run_name='__bench__')"
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self [us] |  cumulative | imported package"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    total = sum(m[1] for m in modules)
+    top_level = sorted(((n.strip(), c) for n, s, c in modules if not n.startswith("  ")), key=lambda m: -m[1])
+    return total, top_level
+
+
+def measure_startup(path, cwd):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", RUNNER, ROOT, path],
+                          cwd=cwd, capture_output=True, text=True, timeout=300)
+    wall = time.perf_counter() - start
+    total, top_level = parse_importtime(proc.stderr)
+    return {"wall_s": round(wall, 3), "import_ms": round(total / 1000, 1),
+            "heaviest": [(name, round(us / 1000, 1)) for name, us in top_level[:5]], "ok": proc.returncode == 0}
+
+
+@benchmark
+def startup(repeat=3):
+    results = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        for entry in ENTRY_POINTS:
+            path = os.path.join(ROOT, entry)
+            runs = [measure_startup(path, cwd) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["import_ms"])  # Least disturbed run
+            results[entry] = best
+            heaviest = ", ".join(f"{name} {ms}ms" for name, ms in best["heaviest"])
+            status = "" if best["ok"] else "  (script failed)"
+            print(f"{entry:<18} imports {best['import_ms']:>8.1f} ms  wall {best['wall_s']:.2f} s{status}")
+            print(f"{'':<18} heaviest: {heaviest}")
+    return results
+
+
+# === Game engine ===
+@benchmark
+def engine(darts=300_000):
+    # apply_throw / end_visit / undo throughput on the shared engine (the hot path of every front end)
+    from engine import GameState
+
+    pattern = [(20, 3), (19, 1), (5, 1), (20, 1), (1, 1), (18, 2)]
+    game = GameState(["A", "B", "C", "D"], 501)
+    start = time.perf_counter()
+    for i in range(darts):
+        if game.visit_over:
+            if game.winner is not None:
+                game = GameState(["A", "B", "C", "D"], 501)
+            else:
+                game.end_visit()
+        game.apply_throw(*pattern[i % len(pattern)])
+    throw_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    undone = 0
+    while game.undo():
+        undone += 1
+    undo_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        GameState.deserialize(game.serialize())
+    serialize_s = time.perf_counter() - start
+
+    results = {"apply_throw_ns": round(throw_s / darts * 1e9), "undo_ns": round(undo_s / max(undone, 1) * 1e9),
+               "serialize_roundtrip_us": round(serialize_s / 1000 * 1e6, 1)}
+    print(f"apply_throw {results['apply_throw_ns']} ns/dart, undo {results['undo_ns']} ns, "
+          f"serialize+deserialize {results['serialize_roundtrip_us']} us")
+    return results
+
+
+# === Simulator ===
+@benchmark
+def simulator(legs=200_000):
+    # Legs per second of the batch simulation, single process and on every core
+    from simulator import SKILL_LEVELS, simulate_legs
+
+    model = SKILL_LEVELS["club"]
+    results = {}
+    for processes in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        simulate_legs(model, legs, 501, seed=1, processes=processes)
+        elapsed = time.perf_counter() - start
+        results[f"legs_per_s_{processes}p"] = round(legs / elapsed)
+        print(f"{processes} process(es): {legs / elapsed:,.0f} legs/s (501 double-out)")
+    return results
+
+
+# === Throw encoding ===
+@benchmark
+def throws(darts=1_000_000):
+    # Scoring, validation and heatmap of a throws array against a loop over (segment, multiplier) tuples
+    import throws as codec
+    from engine import throw_points
+
+    pattern = [(20, 3), (19, 1), (5, 1), (25, 2), (0, 0), (18, 2)]
+    pairs = [pattern[i % len(pattern)] for i in range(darts)]
+    buf = codec.encode(pairs)
+
+    start = time.perf_counter()
+    total = sum(throw_points(s, m) for s, m in pairs)
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    codec.validate(buf)
+    assert codec.total(buf) == total
+    codec.heatmap(buf)
+    batch_s = time.perf_counter() - start
+
+    results = {"bytes_per_dart": len(buf) * buf.itemsize / darts, "loop_ms": round(loop_s * 1000, 1),
+               "batch_ms": round(batch_s * 1000, 1)}
+    print(f"{darts:,} darts in {len(buf) * buf.itemsize:,} bytes: python loop {results['loop_ms']} ms, "
+          f"validate + score + heatmap {results['batch_ms']} ms")
+    return results
+
+
+# === Tkinter game window ===
+def _count_widgets(widget):
+    return 1 + sum(_count_widgets(child) for child in widget.winfo_children())
+
+
+@benchmark
+def gui_turns(turns=1000, block=100):
+    # Time per turn, live widgets and Python memory over a long session of the Tkinter game window:
+    # with the widgets reused every block should cost the same (needs a display)
+    import tkinter as tk
+    import tracemalloc
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"skipped, no display: {e}")
+        return {"skipped": True}
+    root.withdraw()
+    import gui
+    from game_logic import start_game
+
+    game = start_game(["A", "B"], start_score=501)
+    gui.ask_for_throws(game)
+    window = gui.game_window
+    tracemalloc.start()
+    blocks = []
+    for _ in range(turns // block):
+        start = time.perf_counter()
+        for _ in range(block):
+            for entry, _ in window.entries:
+                entry.insert(0, "0")  # Misses: nobody checks out
+            window.submit_throws()
+            root.update()
+        blocks.append({"ms_per_turn": round((time.perf_counter() - start) / block * 1000, 3),
+                       "widgets": _count_widgets(root), "python_kb": tracemalloc.get_traced_memory()[0] // 1024})
+    tracemalloc.stop()
+    window.close()
+    root.destroy()
+    for i, b in enumerate(blocks):
+        print(f"turns {i * block + 1:>5}-{(i + 1) * block:<5} {b['ms_per_turn']:.3f} ms/turn, "
+              f"{b['widgets']} widgets, {b['python_kb']} KB")
+    return {"blocks": blocks}
+
+
+# === Game server ===
+async def _server_load(games, visits):
+    # Every game is one client connection; a tenth of the games also have a scoreboard on the event stream
+    import asyncio
+    from server import GameServer
+
+    server = GameServer(save=False)  # Nothing is written to the results
+    port = await server.start("127.0.0.1", 0)
+    latencies = []
+
+    async def call(reader, writer, method, path, body=b""):
+        start = time.perf_counter()
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await reader.readline()  # Status line
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        data = json.loads(await reader.readexactly(length))
+        latencies.append(time.perf_counter() - start)
+        return data
+
+    async def scoreboard(game_id, seen):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /games/{game_id}/events HTTP/1.1\r\n\r\n".encode())
+        while await reader.readline():
+            seen[0] += 1
+        writer.close()
+
+    seen = [0]
+    watchers = []
+
+    async def board(i):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        game = await call(reader, writer, "POST", "/games", json.dumps({"names": ["A", "B"], "start_score": 501}).encode())
+        if i % 10 == 0:
+            watchers.append(asyncio.ensure_future(scoreboard(game["id"], seen)))
+        for _ in range(visits):
+            for _ in range(3):
+                await call(reader, writer, "POST", f"/games/{game['id']}/throw", b'{"segment": 5, "multiplier": 1}')
+            await call(reader, writer, "POST", f"/games/{game['id']}/next")
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(board(i) for i in range(games)))
+    elapsed = time.perf_counter() - start
+    for task in watchers:
+        task.cancel()
+    await server.close()
+    return elapsed, sorted(latencies), seen[0]
+
+
+@benchmark
+def server(games=2000, visits=5):
+    import asyncio
+
+    elapsed, latencies, events = asyncio.run(_server_load(games, visits))
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    results = {"games": games, "requests_per_s": round(len(latencies) / elapsed), "p50_ms": round(p50 * 1000, 2),
+               "p99_ms": round(p99 * 1000, 2), "event_lines": events}
+    print(f"{games} concurrent games, {len(latencies):,} requests in {elapsed:.2f} s: "
+          f"{results['requests_per_s']:,} req/s, p50 {results['p50_ms']} ms, p99 {results['p99_ms']} ms")
+    return results
+
+
+# === Tournament scheduling ===
+DECISION_BUDGET_US = 1000  # A board must be given out within 1 ms
+
+
+def _timed(call):
+    # Wall and CPU time of one call. This thread's CPU time leaves out the time the OS ran something
+    # else: on a small (1 CPU) box a decision can be preempted for milliseconds with no work of its own
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = call()
+    return result, time.perf_counter() - wall, time.thread_time() - cpu
+
+
+def _decision_stats(wall, cpu, digits=1):
+    # Per-decision wall and CPU times (seconds) -> mean/p99/max in us and the decisions over budget
+    stats = {}
+    for name, times in (("wall", sorted(wall)), ("cpu", sorted(cpu))):
+        stats[f"{name}_mean_us"] = round(sum(times) / len(times) * 1e6, digits)
+        stats[f"{name}_p99_us"] = round(times[int(len(times) * 0.99)] * 1e6, digits)
+        stats[f"{name}_max_us"] = round(times[-1] * 1e6, 1)
+        stats[f"{name}_over_budget"] = sum(t * 1e6 > DECISION_BUDGET_US for t in times)
+    return stats
+
+
+def _format_decisions(stats):
+    return (f"decision wall p99 {stats['wall_p99_us']} us, max {stats['wall_max_us']} us "
+            f"({stats['wall_over_budget']} over {DECISION_BUDGET_US} us); cpu p99 {stats['cpu_p99_us']} us, "
+            f"max {stats['cpu_max_us']} us ({stats['cpu_over_budget']} over)")
+
+
+def _run_tournament(tournament):
+    # Plays a tournament on a simulated clock (random match lengths, random winners). A decision is one
+    # board given out; a report that starts several matches (new Swiss round) is shared between them
+    import heapq
+    import random
+
+    rng = random.Random(1)
+    clock, busy_time, wall, cpu, batches = 0.0, 0.0, [], [], []
+    running = []  # (end time, match id, match)
+    for match in tournament.assign():
+        length = rng.uniform(10, 30)
+        busy_time += length
+        heapq.heappush(running, (length, match.id, match))
+    while running:
+        clock, _, match = heapq.heappop(running)
+        started, elapsed, used = _timed(lambda: tournament.report(match, rng.choice(match.players)))
+        wall.append(elapsed / max(len(started), 1))
+        cpu.append(used / max(len(started), 1))
+        batches.append(elapsed)
+        for new in started:
+            length = rng.uniform(10, 30)
+            busy_time += length
+            heapq.heappush(running, (clock + length, new.id, new))
+    return wall, cpu, max(batches), busy_time / (clock * tournament.scheduler.boards)
+
+
+def _run_scheduler(scheduler):
+    # Same simulated clock on the BoardScheduler alone: only release() + assign() are timed, no game is
+    # started and nothing is recorded, so the decisions of a big round-robin are measured on their own
+    import heapq
+    import random
+
+    def decide():
+        scheduler.release(match)
+        return scheduler.assign()
+
+    rng = random.Random(1)
+    clock, busy_time, wall, cpu = 0.0, 0.0, [], []
+    running = []
+    for match in scheduler.assign():
+        length = rng.uniform(10, 30)
+        busy_time += length
+        heapq.heappush(running, (length, match.id, match))
+    while running:
+        clock, _, match = heapq.heappop(running)
+        started, elapsed, used = _timed(decide)
+        wall.append(elapsed / max(len(started), 1))
+        cpu.append(used / max(len(started), 1))
+        for new in started:
+            length = rng.uniform(10, 30)
+            busy_time += length
+            heapq.heappush(running, (clock + length, new.id, new))
+    return wall, cpu, busy_time / (clock * scheduler.boards)
+
+
+@benchmark
+def tournament(boards=64, round_robin_players=1000):
+    # The matches of a tournament live until it ends, so they are frozen out of the collector once built
+    # (gc.freeze) and full collections do not walk them again while it runs
+    import gc
+
+    from tournament import KNOCKOUT, ROUND_ROBIN, SWISS, Tournament
+
+    results = {}
+    try:
+        for fmt, players in ((KNOCKOUT, 1024), (SWISS, 1024), (ROUND_ROBIN, 200)):
+            start = time.perf_counter()
+            t = Tournament([f"P{i}" for i in range(players)], boards, fmt, persist=False)
+            build_ms = (time.perf_counter() - start) * 1000
+            gc.freeze()
+            wall, cpu, batch, utilisation = _run_tournament(t)
+            assert t.finished
+            result = {"players": players, "matches": len(wall), "build_ms": round(build_ms, 1),
+                      **_decision_stats(wall, cpu), "report_max_us": round(batch * 1e6, 1),
+                      "board_utilisation": round(utilisation, 3)}
+            results[fmt] = result
+            print(f"{fmt:<12} {players} players, {len(wall):,} matches on {boards} boards: "
+                  f"{_format_decisions(result)}; slowest report {result['report_max_us']} us; "
+                  f"boards busy {utilisation:.0%}; build {result['build_ms']} ms")
+            gc.unfreeze()
+
+        # Round-robin of a big field: n(n-1)/2 matches, scheduler decisions only
+        start = time.perf_counter()
+        t = Tournament([f"P{i}" for i in range(round_robin_players)], boards, ROUND_ROBIN, persist=False)
+        build_ms = (time.perf_counter() - start) * 1000
+        gc.freeze()
+        wall, cpu, utilisation = _run_scheduler(t.scheduler)
+        assert len(wall) == len(t.matches) and not t.scheduler.ready and not t.scheduler.waiting
+        result = {"players": round_robin_players, "matches": len(wall), "build_ms": round(build_ms, 1),
+                  **_decision_stats(wall, cpu, digits=2), "board_utilisation": round(utilisation, 3)}
+        results["round_robin_scheduler"] = result
+        print(f"{'round_robin':<12} {round_robin_players} players, {len(wall):,} matches on {boards} boards, "
+              f"scheduler only: {_format_decisions(result)}; boards busy {utilisation:.0%}; "
+              f"build {result['build_ms']} ms")
+    finally:
+        gc.unfreeze()
+    return results
+
+
+# === Leaderboard ===
+@benchmark
+def leaderboard(players=100_000, games=20_000):
+    # Cost of one finished game and of the queries, with every player of a big venue ranked
+    import random
+    import leaderboard as lb
+
+    rng = random.Random(1)
+    totals = {f"P{i}": (g, rng.randint(0, g), g * 30 * 8, g * 8) for i in range(players) for g in [rng.randint(1, 50)]}
+    start = time.perf_counter()
+    board = lb.Leaderboard(totals)
+    load_s = time.perf_counter() - start
+
+    history = [[(20, 1, 20), (20, 3, 60), (1, 1, 1)]] * 8
+    start = time.perf_counter()
+    for _ in range(games):
+        a, b = rng.sample(range(players), 2)
+        board.record_game([{"name": f"P{a}", "history": history}, {"name": f"P{b}", "history": history}], f"P{a}")
+    update_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(games):
+        board.rank(f"P{i % players}")
+        board.top(10)
+    query_s = time.perf_counter() - start
+
+    backend = "sortedcontainers" if lb.SortedList is not None else "bisect list"
+    results = {"backend": backend, "load_ms": round(load_s * 1000, 1), "game_us": round(update_s / games * 1e6, 1),
+               "rank_top10_us": round(query_s / games * 1e6, 1)}
+    print(f"{players:,} players ({backend}): load {results['load_ms']} ms, one game {results['game_us']} us, "
+          f"rank + top 10 {results['rank_top10_us']} us")
+    return results
+
+
+# === Ratings ===
+@benchmark
+def ratings(games=200_000, players=5000):
+    # Elo replay speed (what a full recompute costs per game, without reading the results)
+    import random
+    from ratings import apply_game
+
+    rng = random.Random(1)
+    lineups = [rng.sample(range(players), rng.choice((2, 2, 3, 4))) for _ in range(1000)]
+    ratings_by_name, games_by_name = {}, {}
+    start = time.perf_counter()
+    for i in range(games):
+        names = [f"P{p}" for p in lineups[i % len(lineups)]]
+        apply_game(ratings_by_name, games_by_name, names, names[i % len(names)])
+    elapsed = time.perf_counter() - start
+    results = {"games_per_s": round(games / elapsed), "game_us": round(elapsed / games * 1e6, 2)}
+    print(f"{results['games_per_s']:,} games/s replayed ({results['game_us']} us per game, 2-4 players)")
+    return results
+
+
+# === Saving results ===
+@benchmark
+def results_writer(games=20_000):
+    # Games saved per second through save_results, batched by the results writer and written one
+    # game at a time (flush after each save, what every game cost before), stats read at the end
+    import results
+    from utils import save_results
+
+    history = [[(20, 1, 20), (20, 3, 60), (1, 1, 1)]] * 8
+    players = [{"name": "P1", "score": 0, "history": history}, {"name": "P2", "score": 40, "history": history}]
+    measured = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        for mode in ("batched", "per_game"):
+            path = os.path.join(cwd, f"{mode}.dclog")
+            count = games if mode == "batched" else games // 10
+            start = time.perf_counter()
+            for i in range(count):
+                save_results(players, "P1", path)
+                if mode == "per_game":
+                    results.flush_results(path)
+            stats = results.get_player_stats("P1", path)
+            measured[mode] = count / (time.perf_counter() - start)
+            assert stats["total"] == count
+            results._writers.pop(path)
+    out = {"batched_games_per_s": round(measured["batched"]), "per_game_games_per_s": round(measured["per_game"]),
+           "speedup": round(measured["batched"] / measured["per_game"], 1)}
+    print(f"save_results: {out['batched_games_per_s']:,} games/s batched, {out['per_game_games_per_s']:,} games/s "
+          f"one write per game ({out['speedup']}x)")
+    return out
+
+
+# === Game journal ===
+@benchmark
+def journal(turns=1000):
+    # Cost of journaling a dart, and time to resume a game of `turns` visits from its journal:
+    # with the default compaction, and from one snapshot plus every move (no compaction)
+    import journal as jr
+    from engine import GameState
+
+    results = {}
+    with tempfile.TemporaryDirectory() as cwd:
+        path = os.path.join(cwd, "game.journal")
+        for mode, compact_every in (("compacted", jr.COMPACT_EVERY), ("uncompacted", 10 ** 9)):
+            saved, jr.COMPACT_EVERY = jr.COMPACT_EVERY, compact_every
+            try:
+                game = GameState(["A", "B", "C"], 501)
+                log = jr.open_journal(game, path)
+                start = time.perf_counter()
+                for i in range(turns):
+                    for segment, multiplier in ((0, 3), (0, 1), (0, i % 3 + 1)):  # Misses: never finishes
+                        log.apply_throw(segment, multiplier)
+                    log.end_visit()
+                elapsed = time.perf_counter() - start
+                log.close()
+            finally:
+                jr.COMPACT_EVERY = saved
+            start = time.perf_counter()
+            resumed = jr.load(path)
+            resume_s = time.perf_counter() - start
+            assert resumed.serialize() == game.serialize()
+            results[f"{mode}_move_us"] = round(elapsed / (turns * 4) * 1e6, 2)
+            results[f"{mode}_resume_ms"] = round(resume_s * 1000, 2)
+    print(f"{turns} turns: {results['compacted_move_us']} us per journaled move, resume in "
+          f"{results['compacted_resume_ms']} ms ({results['uncompacted_resume_ms']} ms replaying every move)")
+    return results
+
+
+# === Optimal strategy ===
+@benchmark
+def strategy(legs=100_000):
+    # Time to solve the aiming policy, and darts per leg with it against the fixed aim table
+    from simulator import SKILL_LEVELS, TablePolicy, simulate_legs
+    from strategy import solve
+
+    model = SKILL_LEVELS["club"]
+    start = time.perf_counter()
+    optimal = solve(model)
+    solve_s = time.perf_counter() - start
+    table = simulate_legs(model, legs, 501, policy=TablePolicy(501, True), seed=1).darts_per_leg()["mean"]
+    solved = simulate_legs(model, legs, 501, policy=optimal, seed=1).darts_per_leg()["mean"]
+    results = {"solve_s": round(solve_s, 2), "darts_table": table, "darts_optimal": solved}
+    print(f"solve {solve_s:.2f} s, darts per leg (club, 501 double-out): table {table:.2f}, optimal {solved:.2f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DartCompact benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        print(f"== {name} ==")
+        results[name] = BENCHMARKS[name]()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import json
+import os
+
+from engine import BULL, DOUBLE_OUT, SEGMENTS, STRAIGHT_OUT
+
+# === Checkout suggestions ===
+# Best finish for every score from 1 to 170 with 1, 2 or 3 darts left, for straight-out and
+# double-out. The table is built once (all dart combinations, well under a second) and saved as
+# JSON next to the results, so later starts only read it; suggest() is then a list lookup.
+# "Best" means fewest darts, then the easiest targets (singles before trebles, bull last) and the
+# usual finishing doubles (D20, D16, D8 first: a single in them still leaves a double).
+
+MAX_CHECKOUT = 170
+CHECKOUT_FILE = "checkout_table.json"
+TABLE_VERSION = 1
+
+_TARGETS = [(s, m) for s in SEGMENTS for m in (1, 2, 3)] + [(BULL, 1), (BULL, 2)]
+_DIFFICULTY = {1: 1, 2: 4, 3: 3}  # Setup dart difficulty by multiplier
+PREFERRED_DOUBLES = (20, 16, 8, 18, 12, 10, 4, 14, 6)  # In groups of three, the rest after them
+_tables = None  # {out rule: [None, routes for 1 dart, 2 darts, 3 darts]}, each indexed by score
+
+
+def _finish_cost(dart, double_out):
+    segment, multiplier = dart
+    if not double_out:
+        return _dart_cost(dart)
+    if segment == BULL:
+        return 6  # Bullseye finish only when nothing else works
+    if segment in PREFERRED_DOUBLES:
+        return PREFERRED_DOUBLES.index(segment) // 3
+    return 3
+
+
+def _dart_cost(dart):
+    segment, multiplier = dart
+    if segment == BULL:
+        return 4 + multiplier
+    return _DIFFICULTY[multiplier]
+
+
+def _route_key(route, double_out):
+    # Lower is better; higher setup segments first on ties (T20 before T17)
+    return (len(route), sum(_dart_cost(d) for d in route[:-1]) + _finish_cost(route[-1], double_out),
+            [-d[0] * d[1] for d in route])
+
+
+def build_table(double_out):
+    finishers = [(s, 2) for s in SEGMENTS] + [(BULL, 2)] if double_out else _TARGETS
+    best = {}  # (score, darts) -> route
+    routes = [(f,) for f in finishers]
+    routes += [(a, f) for a in _TARGETS for f in finishers]
+    # The order of the setup darts doesn't matter, only the higher one first is tried
+    routes += [(a, b, f) for a in _TARGETS for b in _TARGETS for f in finishers if a[0] * a[1] >= b[0] * b[1]]
+    for route in routes:
+        score = sum(s * m for s, m in route)
+        if score > MAX_CHECKOUT:
+            continue
+        key = (score, len(route))
+        if key not in best or _route_key(route, double_out) < _route_key(best[key], double_out):
+            best[key] = route
+
+    table = [None]
+    for darts in (1, 2, 3):
+        column = [None] * (MAX_CHECKOUT + 1)
+        for score in range(1, MAX_CHECKOUT + 1):
+            candidates = [best[(score, n)] for n in range(1, darts + 1) if (score, n) in best]
+            if candidates:
+                column[score] = min(candidates, key=lambda r: _route_key(r, double_out))
+        table.append(column)
+    return table
+
+
+def load_tables(path=CHECKOUT_FILE):
+    # Cached artifact if present and current, otherwise built and saved
+    global _tables
+    if _tables is not None:
+        return _tables
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["version"] != TABLE_VERSION:
+            raise ValueError("old checkout table")
+        tables = {rule: [None] + [[tuple(map(tuple, r)) if r else None for r in column] for column in columns]
+                  for rule, columns in data["tables"].items()}
+    except (OSError, ValueError, KeyError):
+        tables = {STRAIGHT_OUT: build_table(False), DOUBLE_OUT: build_table(True)}
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"version": TABLE_VERSION, "tables": {rule: t[1:] for rule, t in tables.items()}}, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # Read-only directory: keep the table in memory only
+    _tables = tables
+    return tables
+
+
+def suggest(score, darts_left=3, out_rule=DOUBLE_OUT):
+    # Route as a tuple of (segment, multiplier), or None when no finish is possible
+    if not 1 <= score <= MAX_CHECKOUT or not 1 <= darts_left <= 3:
+        return None
+    return load_tables()[out_rule][darts_left][score]
+
+
+def dart_name(dart):
+    segment, multiplier = dart
+    if segment == BULL:
+        return "Bull" if multiplier == 2 else "25"
+    return {1: "", 2: "D", 3: "T"}[multiplier] + str(segment)
+
+
+def format_route(route):
+    return " – ".join(dart_name(d) for d in route) if route else ""
+
+
+if __name__ == "__main__":
+    # python checkout.py: print the double-out chart
+    for score in range(MAX_CHECKOUT, 1, -1):
+        route = suggest(score)
+        if route:
+            print(f"{score:>3}  {format_route(route)}")
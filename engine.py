@@ -0,0 +1,206 @@
+# === Headless game engine ===
+# One implementation of the x01 rules for every front end (gui.py, the Streamlit apps, simulations).
+# GameState holds the whole game in a few slots; apply_throw, end_visit and undo are O(1).
+# A visit is up to 3 darts. A bust (below zero, or 1 / a non-double finish with double-out) puts the
+# score back to where the visit started and ends the visit; the darts stay in the history.
+
+# === Board ===
+BOARD_ORDER = (20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5)  # Clockwise from the top
+SEGMENTS = tuple(range(1, 21))
+BULL = 25  # Outer bull; the bullseye is a double bull (25 x 2 = 50)
+MISS = 0
+MULTIPLIERS = {"Single": 1, "Double": 2, "Triple": 3}
+DARTS_PER_VISIT = 3
+
+START_SCORES = (101, 301, 501)
+STRAIGHT_OUT = "straight"
+DOUBLE_OUT = "double"
+OUT_RULES = (STRAIGHT_OUT, DOUBLE_OUT)
+
+# apply_throw results
+SCORED = "scored"
+BUST = "bust"
+WIN = "win"
+
+
+def is_bust(remaining, is_double, out_rule=STRAIGHT_OUT):
+    # Score left after a dart that busts: below zero, or with double-out 1 left or a finish off a non-double.
+    # Saved visits are replayed with it too: only the last dart of a visit can bust or finish, so the
+    # visit total and whether its last dart was a double are enough
+    return remaining < 0 or (out_rule == DOUBLE_OUT and (remaining == 1 or (remaining == 0 and not is_double)))
+
+
+def throw_points(segment, multiplier=1):
+    # Validates a dart and returns its points
+    if segment == MISS:
+        return 0
+    if not (segment in SEGMENTS or segment == BULL) or multiplier not in (1, 2, 3) or (segment == BULL and multiplier == 3):
+        raise ValueError(f"invalid throw: {segment} x {multiplier}")
+    return segment * multiplier
+
+
+class PlayerState:
+    __slots__ = ("name", "score", "history")
+
+    def __init__(self, name, score):
+        self.name = name
+        self.score = score
+        self.history = []  # One list per visit; a dart is (segment, multiplier, points), or its points only
+
+    def as_dict(self):
+        # Same shape as the players saved by utils.save_results
+        return {"name": self.name, "score": self.score, "history": self.history}
+
+
+class GameState:
+    __slots__ = ("players", "start_score", "out_rule", "current", "visit", "visit_start", "busted",
+                 "winner", "visits", "_index", "_undo")
+
+    def __init__(self, names, start_score=301, out_rule=STRAIGHT_OUT):
+        if out_rule not in OUT_RULES:
+            raise ValueError(f"unknown out rule: {out_rule}")
+        if not names:
+            raise ValueError("a game needs at least one player")
+        if len(set(names)) != len(names):
+            raise ValueError("every player needs a different name")
+        if start_score not in START_SCORES:
+            raise ValueError(f"start score must be one of {START_SCORES}, not {start_score!r}")
+        self.players = [PlayerState(name, start_score) for name in names]
+        self._index = {p.name: p for p in self.players}
+        self.start_score = start_score
+        self.out_rule = out_rule
+        self.current = 0  # Index of the player at the board
+        self.visit = []  # Darts of the current visit, also the last entry of that player's history
+        self.visit_start = start_score
+        self.busted = False
+        self.winner = None  # PlayerState once someone checked out
+        self.visits = 0  # Visits ended in this game, all players together
+        self._undo = []
+        self.players[0].history.append(self.visit)
+
+    # === Queries ===
+    @property
+    def current_player(self):
+        return self.players[self.current]
+
+    @property
+    def darts_thrown(self):
+        return len(self.visit)
+
+    @property
+    def visit_over(self):
+        return self.busted or self.winner is not None or len(self.visit) >= DARTS_PER_VISIT
+
+    @property
+    def undo_depth(self):
+        # Moves undo() can still take back
+        return len(self._undo)
+
+    def player(self, name):
+        return self._index[name]
+
+    def scores(self):
+        return {p.name: p.score for p in self.players}
+
+    # === Moves ===
+    def apply_throw(self, segment, multiplier=1):
+        points = throw_points(segment, multiplier)
+        return self._apply((segment, multiplier, points), points, multiplier == 2)
+
+    def apply_points(self, points):
+        # Darts entered as points only (Tkinter); without the multiplier a double can't be checked
+        if self.out_rule == DOUBLE_OUT:
+            raise ValueError("double-out needs the segment and multiplier of each dart")
+        if not 0 <= points <= 60:
+            raise ValueError(f"invalid throw: {points} points")
+        return self._apply(points, points, False)
+
+    def _apply(self, throw, points, is_double):
+        if self.visit_over:
+            raise ValueError("the visit is over")
+        player = self.players[self.current]
+        self._undo.append((player.score,))
+        self.visit.append(throw)
+
+        remaining = player.score - points
+        if is_bust(remaining, is_double, self.out_rule):
+            player.score = self.visit_start
+            self.busted = True
+            return BUST
+        player.score = remaining
+        if remaining == 0:
+            self.winner = player
+            return WIN
+        return SCORED
+
+    def end_visit(self):
+        # Next player to the board (also before 3 darts, e.g. when darts fell out)
+        if self.winner is not None:
+            raise ValueError("the game is over")
+        self._undo.append((self.current, self.visit, self.visit_start, self.busted))
+        self.current = (self.current + 1) % len(self.players)
+        player = self.players[self.current]
+        self.visit = []
+        player.history.append(self.visit)
+        self.visit_start = player.score
+        self.busted = False
+        self.visits += 1
+
+    def play_visit(self, darts):
+        # Whole visit as (segment, multiplier) darts (the Tkinter screen); ends the visit unless it won
+        result = SCORED
+        for segment, multiplier in darts:
+            result = self.apply_throw(segment, multiplier)
+            if result != SCORED:
+                break
+        if result != WIN:
+            self.end_visit()
+        return result
+
+    def undo(self):
+        # Reverts the last dart or the last end_visit; returns False when there is nothing to undo
+        if not self._undo:
+            return False
+        entry = self._undo.pop()
+        if len(entry) == 1:
+            self.visit.pop()
+            self.players[self.current].score = entry[0]
+            self.busted = False
+            self.winner = None
+        else:
+            self.players[self.current].history.pop()  # The visit end_visit opened, still empty
+            self.current, self.visit, self.visit_start, self.busted = entry
+            self.visits -= 1
+        return True
+
+    # === Serialization ===
+    def as_dicts(self):
+        return [p.as_dict() for p in self.players]
+
+    def serialize(self):
+        # Plain lists/dicts (JSON friendly); the undo stack is not kept
+        return {
+            "start_score": self.start_score,
+            "out_rule": self.out_rule,
+            "current": self.current,
+            "visit_start": self.visit_start,
+            "busted": self.busted,
+            "winner": self.winner.name if self.winner is not None else None,
+            "visits": self.visits,
+            "players": [[p.name, p.score, [[list(t) if isinstance(t, tuple) else t for t in v] for v in p.history]]
+                        for p in self.players],
+        }
+
+    @classmethod
+    def deserialize(cls, data):
+        game = cls([p[0] for p in data["players"]], data["start_score"], data["out_rule"])
+        for player, (_, score, history) in zip(game.players, data["players"]):
+            player.score = score
+            player.history = [[tuple(t) if isinstance(t, list) else t for t in v] for v in history]
+        game.current = data["current"]
+        game.visit = game.players[game.current].history[-1]
+        game.visit_start = data["visit_start"]
+        game.busted = data["busted"]
+        game.winner = game.player(data["winner"]) if data["winner"] is not None else None
+        game.visits = data["visits"]
+        return game
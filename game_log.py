@@ -0,0 +1,342 @@
+import ast
+import atexit
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from engine import OUT_RULES, STRAIGHT_OUT
+
+# === Binary game log ===
+# Layout (little endian, no padding, so the file can be read straight from an mmap):
+#
+#   file header : magic "DCLG", u16 version, u16 reserved
+#   record      : u32 payload length, then payload
+#   payload     : u8 record type, then the record body
+#
+#   GAME body   : u32 played_at, u16 start score, u8 player count, u8 winner index (255 = none),
+#                 u8 out rule (index in engine.OUT_RULES)
+#                 then for every player:
+#                   u8 name length, name (utf-8), u16 final score, u16 turn count, u16 throw count,
+#                   turn count x u8 (throws in each turn),
+#                   throw count x (u8 segment, u8 multiplier, u8 points)
+#
+# Segment/multiplier are 0 when only the points of a throw are known (3 x 0-180 entry in the
+# Tkinter app). Unknown record types are skipped, so newer writers stay readable.
+# Version 1 logs hold GAME_V1 records, the same without the out rule: they are read as straight-out.
+# The first write to a version 1 log bumps its header, so an older reader refuses the file instead
+# of skipping the new records.
+
+MAGIC = b"DCLG"
+VERSION = 2
+RECORD_GAME_V1 = 1
+RECORD_GAME = 2
+NO_WINNER = 255
+
+RESULTS_LOG = "resultat.dclog"
+LEGACY_RESULTS = "resultat.txt"
+
+_HEADER = struct.Struct("<4sHH")
+_LENGTH = struct.Struct("<I")
+_GAME_V1 = struct.Struct("<BIHBB")
+_GAME = struct.Struct("<BIHBBB")
+_PLAYER = struct.Struct("<HHH")
+
+GameRecord = namedtuple("GameRecord", "played_at start_score winner players out_rule", defaults=(STRAIGHT_OUT,))
+PlayerRecord = namedtuple("PlayerRecord", "name score history doubles", defaults=(None,))  # doubles: last dart of each turn
+GameSummary = namedtuple("GameSummary", "players winner")
+
+
+class GameLogError(ValueError):
+    pass
+
+
+# === Writing ===
+def _throw_bytes(throw):
+    # A throw is either its points (int) or a (segment, multiplier, points) triple
+    if isinstance(throw, int):
+        return bytes((0, 0, throw))
+    return bytes(throw)
+
+
+def _name_bytes(name):
+    # At most 255 bytes of utf-8, cut on a character boundary
+    return name.encode("utf-8")[:255].decode("utf-8", errors="ignore").encode("utf-8")
+
+
+def _check_u16(value, what):
+    if not 0 <= value <= 0xFFFF:
+        raise GameLogError(f"{what} {value} doesn't fit in the game log (0-65535)")
+
+
+def encode_game(players, winner, start_score=301, played_at=None, out_rule=STRAIGHT_OUT):
+    # Raises GameLogError for a game the format can't hold, before anything is written
+    names = [p['name'] for p in players]
+    winner_index = names.index(winner) if winner in names else NO_WINNER
+    _check_u16(start_score, "start score")
+    body = [_GAME.pack(RECORD_GAME, int(played_at if played_at is not None else time.time()),
+                       start_score, len(players), winner_index, OUT_RULES.index(out_rule))]
+    for p in players:
+        _check_u16(p['score'], f"score of {p['name']}")
+        name = _name_bytes(p['name'])
+        turns = p['history']
+        throws = [t for turn in turns for t in turn]
+        body.append(bytes((len(name),)) + name)
+        body.append(_PLAYER.pack(p['score'], len(turns), len(throws)))
+        body.append(bytes(len(turn) for turn in turns))
+        body.append(b"".join(_throw_bytes(t) for t in throws))
+    payload = b"".join(body)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def upgrade_header(filename):
+    # Version 1 log about to get version 2 records: bump the version in its header
+    try:
+        with open(filename, "r+b") as f:
+            header = f.read(_HEADER.size)
+            if len(header) == _HEADER.size:
+                magic, version, reserved = _HEADER.unpack(header)
+                if magic == MAGIC and version < VERSION:
+                    f.seek(0)
+                    f.write(_HEADER.pack(MAGIC, VERSION, reserved))
+    except FileNotFoundError:
+        pass
+
+
+def append_game(players, winner, filename=RESULTS_LOG, start_score=301, played_at=None, out_rule=STRAIGHT_OUT):
+    record = encode_game(players, winner, start_score, played_at, out_rule)
+    upgrade_header(filename)
+    with open(filename, "ab") as f:
+        if f.tell() == 0:
+            record = _HEADER.pack(MAGIC, VERSION, 0) + record
+        f.write(record)  # One write per game, appends from several boards don't interleave
+
+
+# === Write-behind writer ===
+# Games recorded in bulk (simulations, tournaments, the game server) would each pay an open, a write
+# and a close of the log, plus the index update. LogWriter keeps the encoded records in memory and
+# writes them with one append when FLUSH_BYTES are waiting, FLUSH_INTERVAL seconds after the first
+# one, on flush() and when the program exits, so no game is lost on a clean exit (a crash loses at
+# most the last FLUSH_INTERVAL). With fsync the batch is also forced to disk, one fsync per batch.
+# on_flush(games, previous_signature) runs after each batch, with the games as (players, winner,
+# start_score, out_rule) and the log signature from before the write.
+
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0  # Seconds
+FSYNC = os.environ.get("DARTCOMPACT_FSYNC") == "1"
+
+
+def file_signature(filename):
+    st = os.stat(filename)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class LogWriter:
+    def __init__(self, filename=RESULTS_LOG, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL, fsync=FSYNC,
+                 on_flush=None):
+        self.filename = filename
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.on_flush = on_flush
+        self._records = []
+        self._games = []
+        self._size = 0
+        self._timer = None
+        self._upgraded = False  # Header of an existing log checked (upgrade_header)
+        self._lock = threading.RLock()  # on_flush may read the log, which flushes again (nothing left then)
+        atexit.register(self.flush)
+
+    @property
+    def pending(self):
+        return len(self._records)
+
+    def state(self):
+        # (signature of the log, games buffered) read together, not in the middle of a flush
+        with self._lock:
+            signature = file_signature(self.filename) if os.path.exists(self.filename) else None
+            return signature, len(self._records)
+
+    def append(self, players, winner, start_score=301, played_at=None, out_rule=STRAIGHT_OUT):
+        record = encode_game(players, winner, start_score, played_at, out_rule)
+        with self._lock:
+            self._records.append(record)
+            self._games.append((players, winner, start_score, out_rule))
+            self._size += len(record)
+            if self._size >= self.flush_bytes or self.flush_interval <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._records:
+                return 0
+            records, games = self._records, self._games
+            if not self._upgraded:
+                upgrade_header(self.filename)
+                self._upgraded = True
+            previous_signature = file_signature(self.filename) if os.path.exists(self.filename) else None
+            data = b"".join(records)
+            with open(self.filename, "ab") as f:
+                if f.tell() == 0:
+                    data = _HEADER.pack(MAGIC, VERSION, 0) + data
+                f.write(data)  # One write per batch, appends from several boards don't interleave
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._records, self._games, self._size = [], [], 0
+            if self.on_flush is not None:
+                self.on_flush(games, previous_signature)
+            return len(records)
+
+
+# === Reading ===
+def _open_map(filename):
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            return None
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _ = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        data.close()
+        raise GameLogError(f"{filename} is not a DartCompact game log")
+    if version > VERSION:
+        data.close()
+        raise GameLogError(f"{filename} uses log version {version}, this reader knows {VERSION}")
+    return data
+
+
+def _iter_payloads(filename):
+    # Yields (mmap, offset of payload, payload end) for every complete game record
+    if not os.path.exists(filename):
+        return
+    data = _open_map(filename)
+    if data is None:
+        return
+    try:
+        pos, end = _HEADER.size, len(data)
+        while pos + _LENGTH.size <= end:
+            (length,) = _LENGTH.unpack_from(data, pos)
+            start = pos + _LENGTH.size
+            if start + length > end:
+                break  # Truncated tail (crash during a write), ignore it
+            if data[start] in (RECORD_GAME, RECORD_GAME_V1):
+                yield data, start, start + length
+            pos = start + length
+    finally:
+        data.close()
+
+
+def _decode(data, pos, full, darts=False):
+    if data[pos] == RECORD_GAME_V1:
+        _, played_at, start_score, count, winner_index = _GAME_V1.unpack_from(data, pos)
+        out_rule = STRAIGHT_OUT
+        pos += _GAME_V1.size
+    else:
+        _, played_at, start_score, count, winner_index, rule_index = _GAME.unpack_from(data, pos)
+        out_rule = OUT_RULES[rule_index]
+        pos += _GAME.size
+    players = []
+    for _ in range(count):
+        name_len = data[pos]
+        name = data[pos + 1:pos + 1 + name_len].decode("utf-8")
+        pos += 1 + name_len
+        score, turn_count, throw_count = _PLAYER.unpack_from(data, pos)
+        pos += _PLAYER.size
+        if full:
+            sizes = data[pos:pos + turn_count]
+            points = data[pos + turn_count + 2:pos + turn_count + 3 * throw_count:3]
+            multipliers = data[pos + turn_count + 1:pos + turn_count + 3 * throw_count:3]
+            history, doubles, i = [], [], 0
+            if darts:
+                segments = data[pos + turn_count:pos + turn_count + 3 * throw_count:3]
+            for size in sizes:
+                if darts:  # Same throws as saved: (segment, multiplier, points), or the points only
+                    history.append([(s, m, p) if m else p for s, m, p in
+                                    zip(segments[i:i + size], multipliers[i:i + size], points[i:i + size])])
+                else:
+                    history.append(list(points[i:i + size]))
+                doubles.append(size > 0 and multipliers[i + size - 1] == 2)
+                i += size
+            players.append(PlayerRecord(name, score, history, doubles))
+        else:
+            players.append(name)
+        pos += turn_count + 3 * throw_count  # Skipping throws costs nothing
+    winner = players[winner_index] if winner_index != NO_WINNER else None
+    if full:
+        return GameRecord(played_at, start_score, winner.name if winner else None, players, out_rule)
+    return GameSummary(players, winner)
+
+
+def iter_games(filename=RESULTS_LOG, darts=False):
+    # Histories hold the points of every throw; with darts, the throws as they were saved
+    # ((segment, multiplier, points), or the points only), to save the games somewhere else
+    for data, start, _ in _iter_payloads(filename):
+        yield _decode(data, start, full=True, darts=darts)
+
+
+def iter_game_summaries(filename=RESULTS_LOG):
+    # Player names and winner only, without decoding a single throw
+    for data, start, _ in _iter_payloads(filename):
+        yield _decode(data, start, full=False)
+
+
+# === Converting the old text format ===
+def iter_text_games(filename=LEGACY_RESULTS):
+    players, player = [], None
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("Darts results") or line.startswith("Résultats du jeu"):
+                players, player = [], None
+            elif line.startswith("Historic:") and player is not None:
+                player['history'] = ast.literal_eval(line.split(":", 1)[1].strip())
+            elif line.endswith("points") or line.endswith("pts"):
+                name, score = line.rsplit(":", 1)
+                player = {"name": name, "score": int(score.split()[0]), "history": []}
+                players.append(player)
+            elif line.startswith("Winner:"):
+                yield players, line.split(":", 1)[1].strip()
+                players, player = [], None
+
+
+def convert_text_log(src=LEGACY_RESULTS, dst=RESULTS_LOG):
+    played_at = int(os.path.getmtime(src))
+    count = 0
+    with open(dst, "ab") as f:
+        if f.tell() == 0:
+            f.write(_HEADER.pack(MAGIC, VERSION, 0))
+        for players, winner in iter_text_games(src):
+            f.write(encode_game(players, winner, played_at=played_at))
+            count += 1
+    return count
+
+
+def migrate_legacy(dst=RESULTS_LOG):
+    # One-time import of the old text results (resultat.dclog <- resultat.txt)
+    # the first time the binary log is needed
+    src = os.path.splitext(dst)[0] + ".txt"
+    if os.path.exists(dst) or not os.path.exists(src) or os.path.getsize(src) == 0:
+        return 0
+    tmp = dst + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    count = convert_text_log(src, tmp)
+    os.replace(tmp, dst)
+    return count
+
+
+if __name__ == "__main__":
+    # python game_log.py [resultat.txt] [resultat.dclog]
+    src = sys.argv[1] if len(sys.argv) > 1 else LEGACY_RESULTS
+    dst = sys.argv[2] if len(sys.argv) > 2 else RESULTS_LOG
+    print(f"{convert_text_log(src, dst)} games converted from {src} to {dst}")
@@ -1,32 +1,56 @@
 # game_logic.py
 
+from engine import GameState, STRAIGHT_OUT, BUST, WIN
 from utils import save_results
+import throws
+import leaderboard
+import ratings
+import journal as journals
+from results import flush_results, results_version
 
 # === Logic of the game ===
-def create_players(players_names):
-    return [{"name": name, "score": 301, "history": [], "victories": 0} for name in players_names]
-
-def process_turn(player, throws):
-    total_score = sum(throws)
-    new_score = player['score'] - total_score
-
-    # ✅ Add throws in historic 
-    player['history'].append(throws)
-
-    if new_score < 0:
+# The rules live in engine.GameState, shared with the Streamlit apps
+def create_players(players_names, start_score=301, out_rule=STRAIGHT_OUT):
+    return GameState(players_names, start_score, out_rule)
+
+def process_turn(game, visit, journal=None):
+    # Plays the current player's visit (throws array, see throws.py) and passes the board on unless they won.
+    # With a journal (journal.py) the visit is also written there, to resume the game after a crash
+    player = game.current_player
+    throws.validate(visit)  # The whole visit is checked before any dart counts
+    darts = throws.decode(visit)
+    result = journal.play_visit(darts) if journal is not None else game.play_visit(darts)
+
+    if result == BUST:
         message = "Bust! You overpassed your score."
-        new_score = player['score']  #Score stays the same if Bust
-        game_over = False
     else:
-        message = f"Score restant : {new_score} points"
-        game_over = new_score == 0  #Player wins if score == 0
-
-    player['score'] = new_score
-    return game_over, new_score, message
-
-
-def handle_win(players, winner_name):
-    save_results(players, winner_name)
-
-def start_game(players_names):
-    return create_players(players_names)
+        message = f"Score restant : {player.score} points"
+    return result == WIN, player.score, message
+
+
+def handle_win(game, journal=None):
+    players = game.as_dicts()
+    before = results_version()
+    save_results(players, game.winner.name, start_score=game.start_score, out_rule=game.out_rule)
+    new_ratings = ratings.record_game([p['name'] for p in players], game.winner.name, before)  # Elo, O(players)
+    leaderboard.record_game(players, game.winner.name, new_ratings)  # O(log n) per player, only once it's loaded
+    if journal is not None:
+        flush_results()  # The game is in the results log before its journal goes
+        journal.discard()
+
+def recover_games(app):
+    # Journals of the app nobody is playing (journal.py): a won game whose save was cut off by a crash
+    # is saved now, once; the unfinished games are returned as (path, game) to offer to resume
+    # (journal.claim(path)), most recent first
+    unfinished = []
+    for path, game in journals.journaled_games(app):
+        if game.winner is None:
+            unfinished.append((path, game))
+            continue
+        journal = journals.claim(path)
+        if journal is not None:  # Otherwise another session is saving it
+            handle_win(journal.game, journal)
+    return unfinished
+
+def start_game(players_names, start_score=301, out_rule=STRAIGHT_OUT):
+    return create_players(players_names, start_score, out_rule)
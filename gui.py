@@ -1,71 +1,188 @@
-from utils import get_player_stats
+from results import get_all_player_stats
+from leaderboard import get_leaderboard
+from ratings import get_ratings, DEFAULT_RATING
+from io_worker import IOWorker
 from tkinter import messagebox
 import tkinter as tk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from game_logic import start_game, process_turn, handle_win
+import threading
+import base64
+import uuid
+from avatars import get_avatar, prerender
+from checkout import suggest, format_route, dart_name
+from game_logic import start_game, process_turn, handle_win, recover_games
+from engine import STRAIGHT_OUT, MULTIPLIERS
+from throws import encode, from_board
+from journal import journal_path, open_journal, claim
 from tkinter import simpledialog
 from utils import save_results
 
-current_player_index = 0  # To follow the order of laps
 root = None  # Main screen
-
-def start_turns_gui(players):
-    global current_player_index
-    current_player_index = 0
-    ask_for_throws(players)
-
-def ask_for_throws(players):
-    global current_player_index
-
-    player = players[current_player_index]
-    window = tk.Toplevel()
-    window.title(f"{player['name']} - Throw your darts")
-    window.attributes('-fullscreen', True)
-    window.bind("<Escape>", lambda e: pause_menu(window))
-
-    bg_color = "#1e1e2f"
-    fg_color = "#ecf0f1"
-    accent_color = "#f1c40f"
-    window.configure(bg=bg_color)
-
-    content = tk.Frame(window, bg=bg_color)
-    content.pack(expand=True)
-
-    tk.Label(content, text=f"🎯 {player['name']}, enter your 3 throws", font=("Segoe UI", 24, "bold"), bg=bg_color, fg=accent_color).pack(pady=20)
-
-    entries = []
-    for i in range(3):
-        entry = tk.Entry(content, font=("Segoe UI", 16), width=5, bg="#2c3e50", fg=fg_color, insertbackground=fg_color)
-        entry.pack(pady=5)
-        entries.append(entry)
-
-    score_label = tk.Label(content, text=f"Remaining score : {player['score']}", font=("Segoe UI", 16), bg=bg_color, fg=accent_color)
-    score_label.pack(pady=10)
-
-    def submit_throws():
+avatar_images = {}  # PhotoImage of each player, created once and reused by every screen
+AVATAR_SIZE = 64
+strategy = None  # Aiming policy (strategy.py), solved or loaded in the background on the first game
+game_window = None  # GameWindow of the running game
+io_worker = IOWorker()  # Saves and stats queries run here, off the Tk main loop
+JOURNAL_APP = "gui"  # Journals of this app's games: journals/gui-<game id>.journal, to resume them after a crash
+
+def load_stats(names):
+    # Runs on the I/O worker: stats of the saved history and Elo rating of each player
+    stats = get_all_player_stats(names)
+    ratings = get_ratings()
+    for name in names:
+        stats[name]['elo'] = round(ratings.get(name, DEFAULT_RATING))
+    return stats
+
+def save_game(game, journal):
+    # Runs on the I/O worker: saves the finished game (and drops its journal), then reads what the results screen shows
+    handle_win(game, journal)
+    return load_stats([p.name for p in game.players]), get_leaderboard()
+
+def load_strategy():
+    global strategy
+    from simulator import SKILL_LEVELS
+    from strategy import load_or_solve
+    strategy = load_or_solve(SKILL_LEVELS["club"], STRAIGHT_OUT)
+
+def avatar_image(name):
+    # Avatars come from the local avatar cache only, the Tk thread never waits on the network: an
+    # identicon placeholder until prerender has fetched the real one (refresh_avatars). Tk keeps only a reference
+    if name not in avatar_images:
+        avatar_images[name] = tk.PhotoImage(data=base64.b64encode(get_avatar(name, AVATAR_SIZE, remote=False)))
+    return avatar_images[name]
+
+def refresh_avatars(widget, names, thread):
+    # Swaps the real avatars in once the prerender thread is done; the labels showing them update by themselves
+    if thread.is_alive():
+        widget.after(100, refresh_avatars, widget, names, thread)
+        return
+    for name in names:
+        if name in avatar_images:
+            avatar_images[name].configure(data=base64.b64encode(get_avatar(name, AVATAR_SIZE, remote=False)))
+
+def start_turns_gui(game, journal=None):
+    # journal: the claimed journal of a resumed game; a new game gets its own
+    names = [p.name for p in game.players]
+    thread = prerender(names, AVATAR_SIZE)  # Fetch the avatars while the first turn is shown
+    if strategy is None:
+        threading.Thread(target=load_strategy, daemon=True).start()  # The hint shows up once it's ready
+    if journal is None:
+        journal = open_journal(game, journal_path(JOURNAL_APP, uuid.uuid4().hex))
+    ask_for_throws(game, journal)  # Every visit is journaled
+    if thread is not None:
+        refresh_avatars(game_window.window, names, thread)
+
+def ask_for_throws(game, journal=None):
+    # Shows the current player's turn in the game window, created on the first turn only
+    global game_window
+    if game_window is None or game_window.game is not game:
+        game_window = GameWindow(game, journal)
+    game_window.show_turn()
+
+class GameWindow:
+    # One fullscreen window for the whole game: the widgets are built once and every turn only
+    # updates their texts and clears the entries, so a turn costs the same on turn 1 and turn 1000
+    def __init__(self, game, journal=None):
+        self.game = game
+        self.journal = journal
+        self.window = tk.Toplevel()
+        self.window.attributes('-fullscreen', True)
+        self.window.bind("<Escape>", lambda e: pause_menu(self.window))
+        self.window.bind("<Return>", lambda e: self.submit_throws())
+
+        bg_color = "#1e1e2f"
+        fg_color = "#ecf0f1"
+        accent_color = "#f1c40f"
+        self.window.configure(bg=bg_color)
+
+        content = tk.Frame(self.window, bg=bg_color)
+        content.pack(expand=True)
+
+        self.avatar_label = tk.Label(content, bg=bg_color)
+        self.avatar_label.pack(pady=(20, 0))
+        self.title_label = tk.Label(content, font=("Segoe UI", 24, "bold"), bg=bg_color, fg=accent_color)
+        self.title_label.pack(pady=20)
+        tk.Label(content, text="Segment (0-20, 25 or 50) and multiplier of each dart", font=("Segoe UI", 12), bg=bg_color, fg=fg_color).pack()
+
+        self.entries = []  # (segment entry, multiplier variable) of each dart
+        for i in range(3):
+            row = tk.Frame(content, bg=bg_color)
+            row.pack(pady=5)
+            entry = tk.Entry(row, font=("Segoe UI", 16), width=5, bg="#2c3e50", fg=fg_color, insertbackground=fg_color)
+            entry.pack(side="left", padx=5)
+            multiplier = tk.StringVar(value="Single")
+            for name in MULTIPLIERS:
+                tk.Radiobutton(row, text=name, value=name, variable=multiplier, font=("Segoe UI", 12), bg=bg_color, fg=fg_color, selectcolor="#2c3e50").pack(side="left")
+            self.entries.append((entry, multiplier))
+
+        self.score_label = tk.Label(content, font=("Segoe UI", 16), bg=bg_color, fg=accent_color)
+        self.score_label.pack(pady=10)
+        self.checkout_label = tk.Label(content, font=("Segoe UI", 14, "italic"), bg=bg_color, fg=fg_color)
+        self.checkout_label.pack(pady=5)
+        self.target_label = tk.Label(content, font=("Segoe UI", 14, "italic"), bg=bg_color, fg=fg_color)
+        self.target_label.pack(pady=5)
+        self.error_label = tk.Label(content, font=("Segoe UI", 12), fg="#e74c3c", bg=bg_color)  # Reused for every error
+        self.error_label.pack(pady=5)
+
+        self.confirm_button = tk.Button(content, text="Confirm", font=("Segoe UI", 16), bg=accent_color, fg=bg_color, command=self.submit_throws)
+        self.confirm_button.pack(pady=20)
+        self.saving = False
+
+    def show_turn(self):
+        player = self.game.current_player  # The engine keeps track of whose turn it is
+        self.window.title(f"{player.name} - Throw your darts")
+        self.avatar_label.config(image=avatar_image(player.name))
+        self.title_label.config(text=f"🎯 {player.name}, enter your 3 throws")
+        for entry, multiplier in self.entries:
+            entry.delete(0, "end")
+            multiplier.set("Single")
+        self.entries[0][0].focus_set()
+        self.score_label.config(text=f"Remaining score : {player.score}")
+
+        route = suggest(player.score, 3, self.game.out_rule)  # Precomputed best finish, None above 170
+        self.checkout_label.config(text=f"Checkout : {format_route(route)}" if route else "")
+        aim = strategy is not None and player.score < len(strategy.expected)  # The policy is solved up to 501
+        self.target_label.config(text=f"Best target : {dart_name(strategy.aim(player.score))}" if aim else "")
+        self.error_label.config(text="")
+
+    def submit_throws(self):
+        if self.saving:
+            return
+        player = self.game.current_player
         try:
-            throws = [int(e.get()) for e in entries]
-            if any(v < 0 or v > 180 for v in throws):
+            bases = [int(e.get()) for e, _ in self.entries]
+            if any(b not in range(21) and b not in (25, 50) for b in bases):
                 raise ValueError
-            game_over, score, message = process_turn(player, throws)
-            print(f"{player['name']} -> {throws} | {message} | Remaining score : {score}")
-            score_label.config(text=f"Score restant : {score}")  # Updating the remaining score 
-
-            if game_over:
-                winner = player["name"]
-                handle_win(players, winner)
-                show_results_gui(players, winner)
-            else:
-                # Next turn
-                global current_player_index
-                current_player_index = (current_player_index + 1) % len(players)
-                ask_for_throws(players)
-
+            # Two bytes per dart; process_turn validates the whole visit (no treble bull) before scoring it
+            visit = encode(from_board(b, m.get()) for b, (_, m) in zip(bases, self.entries))
+            game_over, _, _ = process_turn(self.game, visit, self.journal)
         except ValueError:
-            tk.Label(content, text="Enter valid numbers.", font=("Segoe UI", 12), fg="#e74c3c", bg=bg_color).pack(pady=5)
+            self.error_label.config(text="Enter valid numbers.")
+            return
 
-    tk.Button(content, text="Confirm", font=("Segoe UI", 16), bg=accent_color, fg=bg_color, command=submit_throws).pack(pady=20)
+        if game_over:
+            # Loading state while the game is saved on the I/O worker; the window stays responsive
+            self.saving = True
+            self.confirm_button.config(state="disabled")
+            self.score_label.config(text=f"🏆 {player.name} wins! Saving the game...")
+            self.checkout_label.config(text="")
+            self.target_label.config(text="")
+            io_worker.submit(self.window, save_game, self.game, self.journal, on_done=lambda result: self.show_results(player.name, *result),
+                             on_error=lambda e: self.show_results(player.name, None, None, e))
+        else:
+            # Next turn, process_turn already passed the board on
+            self.show_turn()
+
+    def show_results(self, winner, stats, board, error=None):
+        if error is not None:
+            print(f"The game couldn't be saved: {error}")
+        self.close()
+        show_results_gui(self.game.as_dicts(), winner, stats, board)
+
+    def close(self):
+        global game_window
+        self.window.destroy()
+        if game_window is self:
+            game_window = None
 
 def start_game_with_gui():
     global root
@@ -101,6 +218,22 @@ def start_game_with_gui():
 
     tk.Button(content_frame, text="Begin", font=("Segoe UI", 14), bg=accent_color, fg=bg_color, activebackground="#f39c12", command=submit_num_players).pack(pady=20)
 
+    def offer_resume():
+        # Games cut off by a crash or a closed window are still in their journals: go on with one of them.
+        # A won game whose save was cut off is saved first (once, at startup, before anything is clicked)
+        for path, game in recover_games(JOURNAL_APP):
+            scores = ", ".join(f"{p.name} {p.score}" for p in game.players)
+            if not messagebox.askyesno("Unfinished game", f"Resume the unfinished game ({scores}) ?"):
+                continue
+            journal = claim(path)
+            if journal is None:
+                messagebox.showinfo("Unfinished game", "This game has been resumed somewhere else.")
+                continue
+            root.destroy()
+            start_turns_gui(journal.game, journal)
+            return
+
+    root.after(0, offer_resume)
     root.mainloop()
 
 
@@ -135,8 +268,8 @@ def ask_for_names(num_players):
         names = [entry.get() for entry in name_entries]
         if all(names):  # Check that all names are filled in
             window.destroy()  # Closes the name entry window
-            players = start_game(names)  # Create players with names
-            start_turns_gui(players)  # Start the game rounds
+            game = start_game(names)  # Create the game state with the players
+            start_turns_gui(game)  # Start the game rounds
         else:
             tk.Label(content_frame, text="Veuillez remplir tous les noms.", font=("Segoe UI", 12), fg="#e74c3c", bg=bg_color).pack(pady=5)
 
@@ -150,7 +283,8 @@ def ask_for_names(num_players):
     tk.Button(content_frame, text="Start the game", font=("Segoe UI", 14), bg=accent_color, fg=bg_color, activebackground="#f39c12", command=submit_names).pack(pady=20)
 
 
-def show_results_gui(players, winner):
+def show_results_gui(players, winner, stats=None, board=None):
+    # stats / board: per-player stats and leaderboard read on the I/O worker with the save
     window = tk.Toplevel()
     window.title("Results of the Game")
     window.attributes('-fullscreen', True)
@@ -166,30 +300,49 @@ def show_results_gui(players, winner):
 
     tk.Label(content_frame, text="🎯 Results of the Game 🎯", font=("Segoe UI", 26, "bold"), bg=bg_color, fg=accent_color).pack(pady=20)
 
+    # Stats of every player, read with the save or else loaded in one read on the I/O worker
+    precomputed_stats = dict(stats or {})
+    if stats is None:
+        io_worker.submit(window, load_stats, [p['name'] for p in players], on_done=precomputed_stats.update)
+
     sorted_players = sorted(players, key=lambda x: x['score'])
     for player in sorted_players:
-        tk.Label(content_frame, text=f"{player['name']} : {player['score']} points", font=("Segoe UI", 16), bg=bg_color, fg=fg_color).pack()
+        tk.Label(content_frame, image=avatar_image(player['name']), text=f" {player['name']} : {player['score']} points", compound="left", font=("Segoe UI", 16), bg=bg_color, fg=fg_color).pack()
+        if board is not None and player['name'] in board:  # All-time ranking, updated with this game by handle_win
+            tk.Label(content_frame, text=f"All-time rank : #{board.rank(player['name'])} of {len(board)} · Elo {board.row(player['name'])['elo']}", font=("Segoe UI", 12), bg=bg_color, fg=fg_color).pack()
         tk.Label(content_frame, text=f"Historic : {player['history']}", font=("Segoe UI", 12, "italic"), bg=bg_color, fg=fg_color).pack()
-        tk.Button(content_frame, text="Show my statistics", font=("Segoe UI", 14), bg="#3498db", fg=bg_color, activebackground="#2980b9", command=lambda p=player: show_player_stats(p)).pack(pady=10)
+        tk.Button(content_frame, text="Show my statistics", font=("Segoe UI", 14), bg="#3498db", fg=bg_color, activebackground="#2980b9", command=lambda p=player: show_player_stats(p, precomputed_stats.get(p['name']))).pack(pady=10)
 
     tk.Label(content_frame, text=f"\nWinner : {winner}", font=("Segoe UI", 20, "bold"), bg=bg_color, fg=accent_color).pack(pady=20)
 
     tk.Button(content_frame, text="Play again", font=("Segoe UI", 14), bg="#3498db", fg=bg_color, activebackground="#2980b9", command=lambda: [window.destroy(), start_game_with_gui()]).pack(pady=10)
 
-def show_player_stats(player):
-    stats = get_player_stats(player['name'])
-
+def show_player_stats(player, stats=None):
     stats_window = tk.Toplevel()
     stats_window.title(f"Statistics of {player['name']}")
     stats_window.geometry("600x400")
     stats_window.configure(bg="#1e1e2f")
 
     tk.Label(stats_window, text=f"📊 Statistics of {player['name']}", font=("Segoe UI", 20, "bold"), fg="#f1c40f", bg="#1e1e2f").pack(pady=20)
+    body = tk.Frame(stats_window, bg="#1e1e2f")
+    body.pack()
+
+    def fill(stats):
+        if not stats_window.winfo_exists():  # Closed while loading
+            return
+        for widget in body.winfo_children():
+            widget.destroy()
+        if stats:
+            for key, value in stats.items():
+                tk.Label(body, text=f"{key} : {value}", font=("Segoe UI", 14), fg="#ecf0f1", bg="#1e1e2f").pack(pady=5)
+        else:
+            tk.Label(body, text="No available statistics.", font=("Segoe UI", 14), fg="#e74c3c", bg="#1e1e2f").pack(pady=10)
 
-    if stats:
-        for key, value in stats.items():
-            tk.Label(stats_window, text=f"{key} : {value}", font=("Segoe UI", 14), fg="#ecf0f1", bg="#1e1e2f").pack(pady=5)
+    if stats is None:  # Not precomputed yet: loading state until the I/O worker has read them
+        tk.Label(body, text="Loading statistics...", font=("Segoe UI", 14, "italic"), fg="#ecf0f1", bg="#1e1e2f").pack(pady=10)
+        io_worker.submit(stats_window, load_stats, [player['name']], on_done=lambda result: fill(result[player['name']]),
+                         on_error=lambda e: fill(None))
     else:
-        tk.Label(stats_window, text="No available statistics.", font=("Segoe UI", 14), fg="#e74c3c", bg="#1e1e2f").pack(pady=10)
+        fill(stats)
 
     tk.Button(stats_window, text="Close", font=("Segoe UI", 12), bg="#e74c3c", fg="#ecf0f1", command=stats_window.destroy).pack(pady=20)
@@ -0,0 +1,69 @@
+import atexit
+import queue
+import threading
+import traceback
+
+# === Background I/O for the Tkinter screens ===
+# Tk widgets may only be used from the main thread, and file I/O (saving a game, reading the results
+# index or the ratings) must not freeze it. Jobs run on one worker thread, in the order they were
+# submitted, so two saves never overlap. Their results come back through a queue that the Tk event
+# loop polls with after(); the completion callbacks run there and can update the widgets.
+# Jobs still queued when the program exits are finished first (atexit), so no game is lost.
+
+POLL_MS = 30
+
+
+class IOWorker:
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        self._pending = 0  # Jobs whose callback hasn't run yet (Tk thread only)
+        self._polling = False
+        self._thread = None
+        atexit.register(self.join)
+
+    def submit(self, widget, func, *args, on_done=None, on_error=None):
+        # Runs func(*args) on the worker; on_done(result) or on_error(exception) then runs in the Tk loop
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="io-worker", daemon=True)
+            self._thread.start()
+        self._pending += 1
+        self._jobs.put((func, args, on_done, on_error))
+        if not self._polling:
+            self._polling = True
+            root = widget.nametowidget(".")  # Polled on the root: the widget may be gone before the job ends
+            root.after(POLL_MS, self._poll, root)
+
+    def _run(self):
+        while True:
+            func, args, on_done, on_error = self._jobs.get()
+            try:
+                self._done.put((on_done, func(*args), None))
+            except Exception as e:
+                self._done.put((on_error, None, e))
+            finally:
+                self._jobs.task_done()
+
+    def _poll(self, root):
+        while True:
+            try:
+                callback, result, error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if error is None:
+                if callback is not None:
+                    callback(result)
+            elif callback is not None:
+                callback(error)
+            else:
+                traceback.print_exception(type(error), error, error.__traceback__)
+        if self._pending:
+            root.after(POLL_MS, self._poll, root)
+        else:
+            self._polling = False
+
+    def join(self):
+        # Waits for the queued jobs (saves) to be done
+        if self._thread is not None:
+            self._jobs.join()
@@ -0,0 +1,259 @@
+import glob
+import json
+import os
+
+from engine import GameState
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# === Journal of the game in progress ===
+# A game only reaches the results when someone wins (handle_win). Until then every move is appended
+# to a journal file, one short text line per move, so a game cut off by a crash, a closed window or a
+# Streamlit restart can be resumed where it stopped:
+#   S {...}          snapshot: GameState.serialize() of the game at that point
+#   V 20 3 20 1 5 1  a whole visit of (segment, multiplier) darts, played with play_visit (Tkinter)
+#   T 20 3 / P 45    one dart, with its segment and multiplier or its points only
+#   E / U            end_visit / undo
+# A move costs one small write (no fsync: a crashed process loses nothing, a crashed machine at most
+# what the OS hadn't written yet). Every COMPACT_EVERY moves the file is rewritten as one snapshot,
+# so resuming reads one snapshot and replays fewer than COMPACT_EVERY moves, whatever the length of
+# the game. A torn last line (crash during a write) is ignored. The undo stack isn't in snapshots:
+# an undo back past the last snapshot writes a new one instead of a "U".
+#
+# One journal per game, journals/<app>-<game id>.journal, so every board, tab or window has its own.
+# The session playing a game holds an exclusive lock on <journal>.lock: the other sessions leave that
+# journal alone, and the OS drops the lock when the process dies (or the session's Journal is
+# collected), which is what makes the game resumable. handle_win removes the journal once the game is
+# saved.
+
+JOURNAL_DIR = "journals"
+COMPACT_EVERY = 500
+
+
+def journal_path(app, game_id):
+    return os.path.join(JOURNAL_DIR, f"{app}-{game_id}.journal")
+
+
+def journal_game_id(app, path):
+    # Game id back from a journal_path()
+    return os.path.basename(path)[len(app) + 1:-len(".journal")]
+
+
+def _lock(path):
+    # Open .lock file of the journal, locked for this session, or None if another session has it
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path + ".lock", "a")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Journal:
+    def __init__(self, path, game, lock=None):
+        self.path = path
+        self.game = game
+        self._file = None
+        self._lock = lock  # Locked .lock file (_lock): this session plays the game
+        self._moves = 0  # Lines since the snapshot
+        self._base = 0  # game.undo_depth at the snapshot
+        self.discarded = False
+
+    # === Moves: played on the game, then written ===
+    def apply_throw(self, segment, multiplier=1):
+        result = self.game.apply_throw(segment, multiplier)
+        self._write(f"T {segment} {multiplier}\n")
+        return result
+
+    def apply_points(self, points):
+        result = self.game.apply_points(points)
+        self._write(f"P {points}\n")
+        return result
+
+    def end_visit(self):
+        self.game.end_visit()
+        self._write("E\n")
+
+    def play_visit(self, darts):
+        darts = list(darts)
+        result = self.game.play_visit(darts)
+        self._write("V" + "".join(f" {segment} {multiplier}" for segment, multiplier in darts) + "\n")
+        return result
+
+    def undo(self):
+        if not self.game.undo():
+            return False
+        if self.game.undo_depth < self._base:
+            self.compact()  # The move taken back is only in the snapshot
+        else:
+            self._write("U\n")
+        return True
+
+    # === File ===
+    def _write(self, line):
+        self._file.write(line)
+        self._file.flush()
+        self._moves += 1
+        if self._moves >= COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        # Rewrites the journal as a snapshot of the game; the old file is replaced in one step
+        self._close_file()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("S " + json.dumps(self.game.serialize(), ensure_ascii=False) + "\n")
+        os.replace(self.path + ".tmp", self.path)
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._moves = 0
+        self._base = self.game.undo_depth
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        # Stops journaling here; the game stays in its journal for another session to resume
+        self._close_file()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def discard(self):
+        # The game is over (saved) or abandoned: nothing to resume any more
+        if self.discarded:
+            return
+        self.discarded = True
+        self._close_file()
+        _remove(self.path)
+        self.close()  # Unlocked before the lock file goes (Windows can't remove an open file)
+        _remove(self.path + ".lock")
+
+
+def open_journal(game, path):
+    # Journal of a new game (journal_path with a new game id), a snapshot of it to begin with
+    lock = _lock(path)
+    if lock is None:
+        raise ValueError(f"{path} is the journal of a game being played")
+    journal = Journal(path, game, lock)
+    journal.compact()
+    return journal
+
+
+def claim(path):
+    # Journal of a game nobody is playing, with the game as journaled, to go on with it (or to save it
+    # if it was won); the undo stack doesn't survive the restart. None if another session was quicker
+    # or the journal is gone
+    lock = _lock(path)
+    if lock is None:
+        return None
+    game = _read(path)
+    if game is None:
+        lock.close()
+        return None
+    journal = Journal(path, game, lock)
+    journal.compact()
+    return journal
+
+
+def _replay(game, line):
+    kind, *args = line.split()
+    values = [int(a) for a in args]
+    if kind == "T":
+        game.apply_throw(*values)
+    elif kind == "P":
+        game.apply_points(*values)
+    elif kind == "V":
+        game.play_visit(zip(values[::2], values[1::2]))
+    elif kind == "E":
+        game.end_visit()
+    elif kind == "U":
+        game.undo()
+    else:
+        raise ValueError(f"unknown journal line: {line!r}")
+
+
+def load(path):
+    # The game as journaled, or None without a journal
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return None
+    # The last piece is "" after a complete last line, or a torn line to drop
+    lines = lines[:-1]
+    if not lines or not lines[0].startswith("S "):
+        return None
+    game = GameState.deserialize(json.loads(lines[0][2:]))
+    for line in lines[1:]:
+        _replay(game, line)
+    return game
+
+
+def _read(path):
+    try:
+        return load(path)
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        print(f"Unreadable game journal {path}: {e}")
+        return None
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def journaled_games(app):
+    # (path, game) of every journal of the app that no session is playing, most recent first: games
+    # cut off by a crash, a server restart or a closed tab. Won games are in there too when the crash
+    # came before handle_win (game_logic.recover_games saves them).
+    paths = glob.glob(os.path.join(glob.escape(JOURNAL_DIR), glob.escape(app) + "-*.journal"))
+    for path in sorted(paths, key=_mtime, reverse=True):
+        lock = _lock(path)
+        if lock is None:
+            continue  # Being played
+        game = _read(path)
+        lock.close()
+        if game is not None:
+            yield path, game
+        elif not os.path.exists(path):
+            _remove(path + ".lock")  # Saved or abandoned in the meantime
+
+
+def darts_played(game):
+    # (player name, points, result) of every dart of the game, in the order they were thrown, to
+    # rebuild per-throw screen state (charts, running stats) after a resume
+    replay = GameState([p.name for p in game.players], game.start_score, game.out_rule)
+    visits = [iter(p.history) for p in game.players]
+    for k in range(game.visits + 1):
+        player = replay.current_player
+        for dart in next(visits[replay.current]):
+            if isinstance(dart, tuple):
+                result, points = replay.apply_throw(dart[0], dart[1]), dart[2]
+            else:
+                result, points = replay.apply_points(dart), dart
+            yield player.name, points, result
+        if k < game.visits:
+            replay.end_visit()
@@ -0,0 +1,137 @@
+import bisect
+import threading
+
+from results import get_player_totals
+from ratings import DEFAULT_RATING, get_ratings
+
+try:
+    from sortedcontainers import SortedList  # Optional: O(log n) inserts and removes
+except ImportError:
+    SortedList = None
+
+# === Live leaderboard ===
+# All-time ranking of every player, kept sorted by wins, by turn average and by Elo rating. It is loaded once from
+# the results (index counts, no pass over the history) and then updated by game_logic.handle_win
+# with each finished game: a player's old entry is removed and the new one inserted in every order,
+# so a game costs O(players in game x log n) and top-k / rank-of-player queries are instant.
+# Keys are tuples negated for "higher is better" and end with the name, so every entry is unique.
+
+WINS = "wins"
+AVERAGE = "average"
+RATING = "rating"
+ORDERS = (WINS, AVERAGE, RATING)
+
+
+class _BisectList:
+    # Fallback when sortedcontainers isn't installed: a plain sorted list (inserts move memory, O(n),
+    # which is still fast for a few thousand players)
+    def __init__(self, items=()):
+        self._items = sorted(items)
+
+    def add(self, item):
+        bisect.insort(self._items, item)
+
+    def remove(self, item):
+        del self._items[bisect.bisect_left(self._items, item)]
+
+    def bisect_left(self, item):
+        return bisect.bisect_left(self._items, item)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _sorted_list(items=()):
+    return SortedList(items) if SortedList is not None else _BisectList(items)
+
+
+def _average(entry):
+    return entry[2] / entry[3] if entry[3] else 0
+
+
+def _key(order, name, entry):
+    games, victories = entry[0], entry[1]
+    if order == WINS:
+        return (-victories, -(victories / games if games else 0), name)
+    if order == RATING:
+        return (-entry[4], -games, name)
+    return (-_average(entry), -games, name)
+
+
+class Leaderboard:
+    def __init__(self, totals=None, ratings=None):
+        self._lock = threading.Lock()  # Updated from the game thread, read by the screens
+        ratings = ratings or {}
+        # name -> [games, victories, points, turns, rating]
+        self._entries = {name: list(entry) + [ratings.get(name, DEFAULT_RATING)] for name, entry in (totals or {}).items()}
+        # Built in one sort per order, not one insert per player
+        self._orders = {order: _sorted_list(_key(order, name, entry) for name, entry in self._entries.items())
+                        for order in ORDERS}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def record_game(self, players, winner, ratings=None):
+        # players as saved by save_results: dicts with name and history (darts as points or engine triples);
+        # ratings: the new rating of each of them (ratings.record_game)
+        ratings = ratings or {}
+        with self._lock:
+            for player in players:
+                name = player['name']
+                entry = self._entries.get(name)
+                if entry is not None:
+                    for order, ranking in self._orders.items():
+                        ranking.remove(_key(order, name, entry))
+                else:
+                    entry = self._entries[name] = [0, 0, 0, 0, DEFAULT_RATING]
+                entry[0] += 1
+                entry[1] += name == winner
+                entry[2] += sum(t if isinstance(t, int) else t[2] for turn in player['history'] for t in turn)
+                entry[3] += len(player['history'])
+                entry[4] = ratings.get(name, entry[4])
+                for order, ranking in self._orders.items():
+                    ranking.add(_key(order, name, entry))
+
+    def rank(self, name, order=WINS):
+        # 1-based all-time rank, None for a player without saved games
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            return self._orders[order].bisect_left(_key(order, name, entry)) + 1
+
+    def row(self, name):
+        games, victories, points, turns, rating = self._entries[name]
+        return {'player': name, 'total': games, 'victories': victories,
+                'win_percentage': round(victories / games * 100, 2) if games else 0,
+                'turn_average': round(_average(self._entries[name]), 2), 'elo': round(rating)}
+
+    def top(self, k=10, order=WINS):
+        with self._lock:
+            return [self.row(key[-1]) for key in self._orders[order][:k]]
+
+
+_leaderboard = None
+_load_lock = threading.Lock()
+
+
+def get_leaderboard():
+    # Process-wide leaderboard, loaded from the results on first use
+    global _leaderboard
+    with _load_lock:
+        if _leaderboard is None:
+            _leaderboard = Leaderboard(get_player_totals(), get_ratings())
+        return _leaderboard
+
+
+def record_game(players, winner, ratings=None):
+    # Called by handle_win after the game was saved; a leaderboard loaded later reads it from the results
+    with _load_lock:
+        if _leaderboard is not None:
+            _leaderboard.record_game(players, winner, ratings)
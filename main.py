@@ -3,8 +3,8 @@ from game_logic import start_game
 
 def start_app():
     def on_names_collected(names):
-        players = start_game(names)  # Call to start_game with collected names
-        print(f"Jeu démarré avec les joueurs : {players}")  # For debug
+        game = start_game(names)  # Call to start_game with collected names
+        print(f"Jeu démarré avec les joueurs : {[p.name for p in game.players]}")  # For debug
         # Start the game or perform other actions
 
     ask_for_names(num_players=2, on_start=on_names_collected)  # adapt as needed
@@ -0,0 +1,125 @@
+import threading
+from array import array
+
+# === Running throw statistics and ML sample buffer for the Streamlit apps ===
+# ThrowStats is updated once per confirmed throw, so averages/max never rescan the throw list.
+# SampleBuffer keeps the ML rows column by column in compact arrays and only builds a
+# pandas DataFrame when a model is actually trained. Rows are recorded once per throw event
+# under a stable (game id, turn, throw index) key, so a replayed event adds nothing. Only the keys of
+# the last RECENT_EVENTS events are remembered (replays are reruns of the page, never old events), and
+# neither they nor the latest row of each player are part of a saved buffer.
+
+# Bump when FEATURES change, saved models of another version are then ignored
+FEATURE_SCHEMA_VERSION = 1
+FEATURES = ['avg_throw', 'total_throws', 'current_score', 'max_throw']
+COLUMNS = ['player'] + FEATURES + ['won']
+RECENT_EVENTS = 10_000
+
+
+def _remember(recent, key, value=None):
+    # Insertion-ordered dict of the latest RECENT_EVENTS entries, the oldest one goes first
+    recent.pop(key, None)
+    recent[key] = value
+    if len(recent) > RECENT_EVENTS:
+        del recent[next(iter(recent))]
+
+
+class ThrowStats:
+    __slots__ = ("count", "total", "max", "sum_sq")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.sum_sq = 0
+
+    def add(self, points):
+        self.count += 1
+        self.total += points
+        self.sum_sq += points * points
+        if points > self.max:
+            self.max = points
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def variance(self):
+        if not self.count:
+            return 0
+        mean = self.total / self.count
+        return self.sum_sq / self.count - mean * mean
+
+
+class SampleBuffer:
+    def __init__(self):
+        self.players = []
+        self.avg_throw = array('d')
+        self.total_throws = array('l')
+        self.current_score = array('l')
+        self.max_throw = array('l')
+        self.won = array('b')
+        self._last_row = {}  # (game id, player) -> index of their latest row
+        self._keys = {}  # Keys of the latest events recorded (a dict keeps them in order)
+        self._lock = threading.Lock()  # The buffer can be shared by several Streamlit sessions
+
+    def __getstate__(self):
+        # Copies of the columns taken under the lock: other sessions may record while this is pickled
+        with self._lock:
+            return {name: value.copy() if isinstance(value, list) else array(value.typecode, value)
+                    for name, value in self.__dict__.items() if name not in ('_lock', '_keys', '_last_row')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._last_row = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.players)
+
+    def append(self, player, stats, current_score, won=0):
+        self.players.append(player)
+        self.avg_throw.append(stats.average)
+        self.total_throws.append(stats.count)
+        self.current_score.append(current_score)
+        self.max_throw.append(stats.max)
+        self.won.append(won)
+
+    def record(self, key, player, stats, current_score, won=0):
+        # One snapshot per confirmed throw; returns False when the event was already recorded
+        with self._lock:
+            if key in self._keys:
+                return False
+            _remember(self._keys, key)
+            _remember(self._last_row, (key[0], player), len(self.players))
+            self.append(player, stats, current_score, won)
+        return True
+
+    def mark_won(self, game_id, player):
+        # Sets won on the latest row of the player in that game (names repeat across sessions)
+        with self._lock:
+            row = self._last_row.get((game_id, player))
+            if row is not None:
+                self.won[row] = 1
+
+    def rows_since(self, start):
+        # (stop, feature columns, won) of rows start..stop, copied together under the lock so the
+        # columns have the same length while other sessions record
+        with self._lock:
+            stop = len(self.players)
+            columns = [self.avg_throw[start:stop], self.total_throws[start:stop],
+                       self.current_score[start:stop], self.max_throw[start:stop]]
+            return stop, columns, self.won[start:stop]
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            'player': self.players,
+            'avg_throw': self.avg_throw,
+            'total_throws': self.total_throws,
+            'current_score': self.current_score,
+            'max_throw': self.max_throw,
+            'won': self.won,
+        }, columns=COLUMNS)
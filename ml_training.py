@@ -0,0 +1,89 @@
+import copy
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ml_features import FEATURES
+
+# === Background, incremental win-probability training ===
+# The Streamlit apps hand the new rows of their SampleBuffer to a TrainingService.
+# A single worker thread updates a copy of the current model with partial_fit on those rows
+# only, then swaps it in with one attribute assignment; readers always see a complete model
+# and the page never waits for a fit.
+
+
+class IncrementalModel:
+    # Feature scaling + SGD logistic regression, both trainable with partial_fit
+    def __init__(self):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
+        self.classifier = SGDClassifier(loss="log_loss", random_state=0)
+        self.samples_seen = 0
+
+    def partial_fit(self, X, y):
+        self.scaler.partial_fit(X)
+        self.classifier.partial_fit(self.scaler.transform(X), y, classes=[0, 1])
+        self.samples_seen += len(y)
+        return self
+
+    def predict_proba(self, X):
+        return self.classifier.predict_proba(self.scaler.transform(X))
+
+
+class TrainingService:
+    def __init__(self, min_samples=10, min_wins=1, model=None, on_fit=None):
+        self.model = model  # Replaced atomically by the worker, None until the first fit
+        self.min_samples = min_samples
+        self.min_wins = min_wins
+        self.on_fit = on_fit  # Called in the worker with the service after every fit (e.g. to save it)
+        self.trained_rows = 0  # Rows of the sample buffer already given to the model
+        self.data_hash = hashlib.sha256().hexdigest()  # Chained hash of every row trained so far
+        self._wins = 0
+        self._losses = 0
+        self._fitted = (0, 0, 0)  # (rows, wins, losses) actually inside self.model
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ml-training")
+
+    def state(self):
+        rows, wins, losses = self._fitted
+        return {"trained_rows": rows, "data_hash": self.data_hash, "wins": wins, "losses": losses}
+
+    def restore(self, model, state):
+        self.model = model
+        self.trained_rows = state["trained_rows"]
+        self.data_hash = state["data_hash"]
+        self._wins, self._losses = state["wins"], state["losses"]
+        self._fitted = (self.trained_rows, self._wins, self._losses)
+
+    def submit(self, samples):
+        # Called from the UI thread; copies the new rows and returns immediately.
+        # Rows are held back until there are enough samples and both outcomes to learn from.
+        with self._lock:
+            start = self.trained_rows
+            stop, columns, won = samples.rows_since(start)  # One consistent copy, other sessions may record
+            wins = self._wins + sum(won)
+            losses = self._losses + len(won) - sum(won)
+            if stop <= start or stop < self.min_samples or wins < self.min_wins or not losses:
+                return None
+            self.trained_rows, self._wins, self._losses = stop, wins, losses
+
+        return self._executor.submit(self._fit, samples, columns, won, (stop, wins, losses))
+
+    def _fit(self, samples, columns, won, fitted):
+        import numpy as np
+        import pandas as pd
+        X = pd.DataFrame(np.column_stack([np.asarray(c, dtype=float) for c in columns]), columns=FEATURES)
+        y = np.asarray(won, dtype=int)
+        model = copy.deepcopy(self.model) if self.model is not None else IncrementalModel()
+        model.partial_fit(X, y)
+        self.model = model  # Atomic swap, predictions never see a half trained model
+
+        digest = hashlib.sha256(self.data_hash.encode())
+        for column in columns + [won]:
+            digest.update(column.tobytes())
+        self.data_hash = digest.hexdigest()
+        self._fitted = fitted
+        if self.on_fit is not None:
+            self.on_fit(self, samples)
+        return model
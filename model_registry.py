@@ -0,0 +1,58 @@
+import glob
+import os
+import pickle
+
+from ml_features import FEATURE_SCHEMA_VERSION
+
+# === On-disk registry of the win-probability model ===
+# Every artifact is keyed by the feature schema version and the hash of the data it was trained
+# on (models/win_model_v1_<hash>.pkl). A small pointer file names the latest artifact of each
+# schema version, so loading never has to scan the directory.
+
+MODEL_DIR = "models"
+KEEP_ARTIFACTS = 3  # Older artifacts of the same schema version are removed
+
+
+def _prefix(schema_version):
+    return f"win_model_v{schema_version}"
+
+
+def artifact_path(data_hash, schema_version=FEATURE_SCHEMA_VERSION, directory=MODEL_DIR):
+    return os.path.join(directory, f"{_prefix(schema_version)}_{data_hash[:16]}.pkl")
+
+
+def _latest_path(schema_version, directory):
+    return os.path.join(directory, f"{_prefix(schema_version)}.latest")
+
+
+def save_artifact(data_hash, payload, schema_version=FEATURE_SCHEMA_VERSION, directory=MODEL_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = artifact_path(data_hash, schema_version, directory)
+    artifact = dict(payload, schema_version=schema_version, data_hash=data_hash)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+    latest = _latest_path(schema_version, directory)
+    with open(latest + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path))
+    os.replace(latest + ".tmp", latest)  # Readers see the old or the new artifact, never half of one
+
+    old = sorted(glob.glob(os.path.join(directory, _prefix(schema_version) + "_*.pkl")), key=os.path.getmtime)
+    for stale in old[:-KEEP_ARTIFACTS]:
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def load_latest(schema_version=FEATURE_SCHEMA_VERSION, directory=MODEL_DIR):
+    try:
+        with open(_latest_path(schema_version, directory), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+        with open(os.path.join(directory, name), "rb") as f:
+            artifact = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None  # Nothing saved yet, or an artifact this code can't read
+    if artifact.get("schema_version") != schema_version:
+        return None
+    return artifact
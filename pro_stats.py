@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+
+# === Professional player stats, cached ===
+# The game-over screens compare players to a pro. ProStatsCache answers from memory (backed by a
+# JSON file on disk) without ever waiting for the network: a missing or expired entry is
+# refreshed in a background thread and the stale value, if any, is served meanwhile
+# (stale-while-revalidate). Where the data comes from is up to the provider.
+
+CACHE_FILE = ".pro_stats_cache.json"
+FIXTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pro_players.json")
+DEFAULT_TTL = 24 * 3600  # Profile stats hardly change during a day
+
+SPORTRADAR_URL = "https://api.sportradar.com/darts/trial/v2/en/competitors/{competitor_id}/profile.json?api_key={api_key}"
+SPORTRADAR_KEY = "0j9Nj7DIbdznIAKdz6LPFnHWmYChwGUQgboXO76n"
+
+
+# === Providers: fetch(competitor_id) returns the statistics dict or raises ===
+class SportradarProvider:
+    def __init__(self, api_key=None, timeout=5):
+        self.api_key = api_key or os.environ.get("SPORTRADAR_API_KEY", SPORTRADAR_KEY)
+        self.timeout = timeout
+
+    def fetch(self, competitor_id):
+        import requests  # Only needed when pro data is actually fetched
+        response = requests.get(SPORTRADAR_URL.format(competitor_id=competitor_id, api_key=self.api_key), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("statistics", {})
+
+
+class FixtureProvider:
+    # Local JSON file: {"<competitor id>": {"name": ..., "statistics": {...}}}
+    def __init__(self, path=FIXTURE_FILE):
+        self.path = path
+
+    def fetch(self, competitor_id):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)[competitor_id]["statistics"]
+
+
+class FallbackProvider:
+    # Tries each provider in turn, e.g. the live API and then the local fixture
+    def __init__(self, *providers):
+        self.providers = providers
+
+    def fetch(self, competitor_id):
+        error = None
+        for provider in self.providers:
+            try:
+                return provider.fetch(competitor_id)
+            except Exception as e:
+                error = e
+        raise error
+
+
+def default_provider():
+    # DARTCOMPACT_PRO_PROVIDER=fixture keeps everything offline
+    if os.environ.get("DARTCOMPACT_PRO_PROVIDER") == "fixture":
+        return FixtureProvider()
+    return FallbackProvider(SportradarProvider(), FixtureProvider())
+
+
+# === Cache ===
+class ProStatsCache:
+    def __init__(self, provider=None, path=CACHE_FILE, ttl=DEFAULT_TTL):
+        self.provider = provider or default_provider()
+        self.path = path
+        self.ttl = ttl
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)  # competitor id -> {"stats": ..., "fetched_at": ...}
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, competitor_id):
+        # Never blocks: returns the cached stats (possibly stale) or None, and refreshes in the background
+        entry = self._entries.get(competitor_id)
+        if entry is None or time.time() - entry["fetched_at"] > self.ttl:
+            self.refresh(competitor_id)
+        return entry["stats"] if entry else None
+
+    def refresh(self, competitor_id):
+        with self._lock:
+            if competitor_id in self._refreshing:
+                return  # Already on its way
+            self._refreshing.add(competitor_id)
+        threading.Thread(target=self._refresh, args=(competitor_id,), daemon=True).start()
+
+    def _refresh(self, competitor_id):
+        try:
+            stats = self.provider.fetch(competitor_id)
+        except Exception as e:
+            self.last_error = e  # Keep serving the stale entry
+        else:
+            with self._lock:
+                self._entries = dict(self._entries, **{competitor_id: {"stats": stats, "fetched_at": time.time()}})
+                self._save()
+        finally:
+            with self._lock:
+                self._refreshing.discard(competitor_id)
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
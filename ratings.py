@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+
+from results import add_flush_listener, flush_results, iter_game_results, results_version
+
+# === Elo ratings ===
+# Multi-player Elo: the winner of a game beat every other player in it. Each (winner, loser) pair
+# is one Elo result with K split between the pairs, so a two-player game is plain Elo and a game
+# costs O(players in game). handle_win updates the ratings after every saved game; they are kept in
+# RATINGS_FILE with the version of the results they match (results.results_version), and when that
+# doesn't match - results edited, copied in, or saved by an older version - they are recomputed
+# from the whole history in one streaming pass over names and winners only (no throws decoded).
+
+RATINGS_FILE = "ratings.json"
+RATINGS_VERSION = 1
+DEFAULT_RATING = 1500
+K_FACTOR = 32
+
+_state = None  # {"version", "results", "ratings": {name: rating}, "games": {name: count}}
+_lock = threading.Lock()
+
+
+def expected_score(rating, opponent):
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def apply_game(ratings, games, names, winner):
+    # Updates ratings / games (dicts) in place for one game
+    for name in names:
+        ratings.setdefault(name, DEFAULT_RATING)
+        games[name] = games.get(name, 0) + 1
+    if winner not in names or len(names) < 2:
+        return
+    k = K_FACTOR / (len(names) - 1)
+    for name in names:
+        if name != winner:
+            delta = k * (1 - expected_score(ratings[winner], ratings[name]))
+            ratings[winner] += delta
+            ratings[name] -= delta
+
+
+def recompute(path=RATINGS_FILE):
+    # Ratings of the whole history, replayed game by game in the order they were saved
+    global _state
+    with _lock:
+        flush_results()  # Buffered games first, so the version below matches what the pass reads
+        version = results_version()
+        ratings, games = {}, {}
+        for summary in iter_game_results():
+            apply_game(ratings, games, summary.players, summary.winner)
+        _state = {"version": RATINGS_VERSION, "results": version, "ratings": ratings, "games": games}
+        _save(path)
+        return _state
+
+
+def _save(path):
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(_state, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # Read-only directory: the ratings stay in memory
+
+
+def _load(path):
+    global _state
+    if _state is None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == RATINGS_VERSION:
+                state["results"] = _version_value(state["results"])
+                _state = state
+        except (OSError, ValueError, KeyError):
+            pass
+    return _state
+
+
+def _version_value(version):
+    return tuple(version) if isinstance(version, list) else version  # JSON turns the signature into a list
+
+
+def _results_flushed(previous_version, version):
+    # Buffered games were written to the results log: ratings that already counted them still match.
+    # Never waits for the lock (a recompute may be flushing); if it's busy the next check recomputes.
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        if _state is not None and _state["results"] == _version_value(previous_version):
+            _state["results"] = _version_value(version)
+            _save(RATINGS_FILE)
+    finally:
+        _lock.release()
+
+
+add_flush_listener(_results_flushed)
+
+
+def get_ratings(path=RATINGS_FILE):
+    # {name: rating} of every player, recomputed first if the results changed behind our back
+    with _lock:
+        state = _load(path)
+        current = _version_value(results_version())
+        stale = state is None or state["results"] != current
+    return (recompute(path) if stale else state)["ratings"]
+
+
+def get_rating(name, path=RATINGS_FILE):
+    return round(get_ratings(path).get(name, DEFAULT_RATING))
+
+
+def record_game(names, winner, previous_version, path=RATINGS_FILE):
+    # Called by handle_win right after the game was saved; previous_version is results_version()
+    # from before the save, so a game is only added to ratings that matched the results up to it
+    with _lock:
+        state = _load(path)
+        stale = state is None or state["results"] != _version_value(previous_version)
+        if not stale:
+            apply_game(state["ratings"], state["games"], names, winner)
+            state["results"] = _version_value(results_version())
+            if not (isinstance(state["results"], tuple) and state["results"][-1]):
+                _save(path)  # Games still buffered: saved with them (_results_flushed), the file always matches the log
+    if stale:
+        state = recompute(path)
+    return {name: state["ratings"][name] for name in names}
+
+
+def seed(players, path=RATINGS_FILE):
+    # Players best rated first (tournament seeding); unrated players keep their order at the end
+    ratings = get_ratings(path)
+    return sorted(players, key=lambda p: -ratings.get(p, DEFAULT_RATING) if p in ratings else float("inf"))
@@ -1 +1,301 @@
+import atexit
+import json
+import os
+import threading
 
+import results_db
+from engine import STRAIGHT_OUT, is_bust
+from game_log import (RESULTS_LOG, GameRecord, LogWriter, PlayerRecord, file_signature, iter_game_summaries, iter_games,
+                      migrate_legacy)
+
+# Where finished games are stored: "log" (binary resultat.dclog) or "sqlite" (resultat.sqlite)
+RESULTS_BACKEND = os.environ.get("DARTCOMPACT_BACKEND", "log")
+
+# === Aggregators ===
+# One streaming pass over the results log feeds every aggregator, game by game.
+# Each aggregator only keeps a few counters per player (in that player's state dict),
+# so memory depends on the number of players, never on the size of the history.
+# Aggregators that look at the throws set `throws = True`; when none of them does,
+# the pass reads game summaries only and skips the throw bytes.
+
+class GamesPlayed:
+    throws = False
+
+    def add(self, state, player, game):
+        state['total'] = state.get('total', 0) + 1
+
+    def results(self, state):
+        return {'total': state.get('total', 0)}
+
+
+class Wins:
+    throws = False
+
+    def add(self, state, player, game):
+        if player.name == game.winner:
+            state['victories'] = state.get('victories', 0) + 1
+
+    def results(self, state):
+        victories, total = state.get('victories', 0), state.get('total', 0)
+        win_pct = round((victories / total) * 100, 2) if total else 0
+        return {'victories': victories, 'win_percentage': win_pct}
+
+
+class TurnAverage:
+    # Average points scored per turn (3 darts)
+    throws = True
+
+    def add(self, state, player, game):
+        state['points'] = state.get('points', 0) + sum(sum(turn) for turn in player.history)
+        state['turns'] = state.get('turns', 0) + len(player.history)
+
+    def results(self, state):
+        turns = state.get('turns', 0)
+        return {'turn_average': round(state.get('points', 0) / turns, 2) if turns else 0}
+
+
+class CheckoutRate:
+    # Share of the turns started at 170 or less (a finish was possible) that won the game
+    throws = True
+
+    def add(self, state, player, game):
+        score, attempts, checkouts = game.start_score, 0, 0
+        doubles = player.doubles or [False] * len(player.history)  # Points-only darts: straight-out games
+        for turn, last_double in zip(player.history, doubles):
+            if score <= 170:
+                attempts += 1
+            remaining = score - sum(turn)
+            if not is_bust(remaining, last_double, game.out_rule):  # The engine's bust and finish rules
+                score = remaining
+                if score == 0:
+                    checkouts += 1
+        state['checkout_attempts'] = state.get('checkout_attempts', 0) + attempts
+        state['checkouts'] = state.get('checkouts', 0) + checkouts
+
+    def results(self, state):
+        attempts = state.get('checkout_attempts', 0)
+        return {'checkout_rate': round(state.get('checkouts', 0) / attempts * 100, 2) if attempts else 0}
+
+
+DEFAULT_AGGREGATORS = (GamesPlayed(), Wins(), TurnAverage(), CheckoutRate())
+
+
+def iter_game_records(filename=RESULTS_LOG, throws=True):
+    # Lazily parsed games; without throws only names and winner are decoded
+    if throws:
+        yield from iter_games(filename)
+        return
+    for summary in iter_game_summaries(filename):
+        yield GameRecord(None, None, summary.winner, [PlayerRecord(name, None, None) for name in summary.players])
+
+
+def aggregate(games, aggregators=DEFAULT_AGGREGATORS, states=None):
+    states = {} if states is None else states
+    for game in games:
+        for player in game.players:
+            state = states.setdefault(player.name, {})
+            for aggregator in aggregators:
+                aggregator.add(state, player, game)
+    return states
+
+
+def format_stats(state, aggregators=DEFAULT_AGGREGATORS):
+    stats = {}
+    for aggregator in aggregators:
+        stats.update(aggregator.results(state))
+    return stats
+
+
+def compute_stats(filename=RESULTS_LOG, aggregators=DEFAULT_AGGREGATORS):
+    # Every player's stats in a single pass over the log
+    throws = any(aggregator.throws for aggregator in aggregators)
+    states = aggregate(iter_game_records(filename, throws), aggregators)
+    return {name: format_stats(state, aggregators) for name, state in states.items()}
+
+
+# === Per-player index of the results log ===
+# The index lives next to the results log (resultat.dclog -> resultat.dclog.idx.json) and keeps
+# the aggregator states of every player. It remembers the size and mtime of the results log it
+# was built from, so any edit made outside the app is detected and triggers a rebuild.
+
+INDEX_VERSION = 3  # 3: checkouts replayed with the out rule of each game
+_index_cache = {}  # filename -> index already loaded in this process
+
+
+def _index_path(filename):
+    return filename + ".idx.json"
+
+
+def _write_index(filename, index):
+    path = _index_path(filename)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path)  # Readers never see a half written index
+    _index_cache[filename] = index
+
+
+def _read_index(filename):
+    try:
+        with open(_index_path(filename), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+def rebuild_index(filename=RESULTS_LOG):
+    states = aggregate(iter_game_records(filename))
+    index = {"version": INDEX_VERSION, "signature": file_signature(filename), "players": states}
+    _write_index(filename, index)
+    return index
+
+
+def _load_index(filename):
+    signature = file_signature(filename)
+
+    index = _index_cache.get(filename)
+    if index is not None and index["signature"] == signature:
+        return index
+
+    index = _read_index(filename)
+    if index is None or index["signature"] != signature:
+        return rebuild_index(filename)  # Missing, corrupt or stale index
+
+    _index_cache[filename] = index
+    return index
+
+
+def record_games(games, filename=RESULTS_LOG, previous_signature=None):
+    # Called right after games [(players, winner, start_score, out_rule)] were appended to the results log.
+    # If the index matched the file before the append we only add these games (one index write
+    # for the whole batch), otherwise the file was changed behind our back and the index is rebuilt.
+    index = _index_cache.get(filename) or _read_index(filename)
+    if index is None or index["signature"] != previous_signature:
+        rebuild_index(filename)
+        return
+
+    # Same shape as a decoded record: points only, also for (segment, multiplier, points) throws
+    aggregate((GameRecord(None, start_score, winner, [
+        PlayerRecord(p['name'], p['score'], [[t if isinstance(t, int) else t[2] for t in turn] for turn in p['history']],
+                     [bool(turn) and not isinstance(turn[-1], int) and turn[-1][1] == 2 for turn in p['history']])
+        for p in players], out_rule) for players, winner, start_score, out_rule in games), states=index["players"])
+    index["signature"] = file_signature(filename)
+    _write_index(filename, index)
+
+
+def record_game(players, winner, filename=RESULTS_LOG, previous_signature=None, start_score=301, out_rule=STRAIGHT_OUT):
+    record_games([(players, winner, start_score, out_rule)], filename, previous_signature)
+
+
+# === Buffered saving ===
+# save_results hands the games to one LogWriter per results log (game_log.py), which appends them
+# in batches. Each batch updates the index once and then tells the flush listeners (ratings.py)
+# how results_version() moved, so data derived from the buffered games doesn't look stale.
+# Every read below flushes first, so a saved game is always in the stats; the writers are flushed
+# at exit (registered on import, so after the other exit handlers that may still save games).
+
+_writers = {}  # filename -> LogWriter
+_writers_lock = threading.Lock()
+_flush_listeners = []
+
+
+def add_flush_listener(listener):
+    # listener(previous_version, version), called after each batch written to the results log
+    _flush_listeners.append(listener)
+
+
+def get_writer(filename=RESULTS_LOG):
+    with _writers_lock:
+        writer = _writers.get(filename)
+        if writer is None:
+            writer = _writers[filename] = LogWriter(
+                filename, on_flush=lambda games, previous: _flushed(filename, games, previous))
+        return writer
+
+
+def _flushed(filename, games, previous_signature):
+    record_games(games, filename, previous_signature)
+    previous = _log_version(previous_signature, len(games))
+    version = results_version(filename)
+    for listener in _flush_listeners:
+        listener(previous, version)
+
+
+def flush_results(filename=None):
+    # Writes the buffered games of one results log (all of them when filename is None)
+    writers = list(_writers.values()) if filename is None else [_writers.get(filename)]
+    for writer in writers:
+        if writer is not None:
+            writer.flush()
+
+
+atexit.register(flush_results)
+
+
+def get_player_stats(player_name, filename=RESULTS_LOG):
+    if RESULTS_BACKEND == "sqlite":
+        return results_db.get_player_stats(player_name)
+
+    flush_results(filename)
+    migrate_legacy(filename)
+    if not os.path.exists(filename):
+        return format_stats({})
+
+    index = _load_index(filename)
+    return format_stats(index["players"].get(player_name, {}))
+
+
+def get_player_totals(filename=RESULTS_LOG):
+    # {name: (games, victories, points, turns)} of every player, for structures kept up to date
+    # game by game (leaderboard.py)
+    if RESULTS_BACKEND == "sqlite":
+        return results_db.get_player_totals()
+
+    flush_results(filename)
+    migrate_legacy(filename)
+    if not os.path.exists(filename):
+        return {}
+    return {name: (s.get('total', 0), s.get('victories', 0), s.get('points', 0), s.get('turns', 0))
+            for name, s in _load_index(filename)["players"].items()}
+
+
+def iter_game_results(filename=RESULTS_LOG):
+    # Player names and winner of every saved game, oldest first, from either backend
+    if RESULTS_BACKEND == "sqlite":
+        yield from results_db.iter_game_summaries()
+        return
+    flush_results(filename)
+    migrate_legacy(filename)
+    yield from iter_game_summaries(filename)
+
+
+def _log_version(signature, pending):
+    return (*(signature or (0, 0)), pending)
+
+
+def results_version(filename=RESULTS_LOG):
+    # Changes with every saved game (and any edit of the log), to tell when derived data is stale.
+    # Log backend: (size, mtime) of the log and the games still buffered, without flushing them
+    if RESULTS_BACKEND == "sqlite":
+        return results_db.game_count()
+    writer = _writers.get(filename)
+    if writer is not None:
+        return _log_version(*writer.state())
+    return _log_version(file_signature(filename) if os.path.exists(filename) else None, 0)
+
+
+def get_all_player_stats(names=None, filename=RESULTS_LOG):
+    # Stats of several players (all of them when names is None) from a single index read
+    if RESULTS_BACKEND == "sqlite":
+        return results_db.get_all_player_stats(names)
+
+    flush_results(filename)
+    migrate_legacy(filename)
+    if not os.path.exists(filename):
+        return {name: format_stats({}) for name in names or ()}
+
+    states = _load_index(filename)["players"]
+    if names is None:
+        names = states.keys()
+    return {name: format_stats(states.get(name, {})) for name in names}
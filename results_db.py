@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import sys
+import time
+
+import itertools
+
+from engine import STRAIGHT_OUT, is_bust
+from game_log import MAGIC, GameSummary, iter_games, iter_text_games
+
+# === SQLite results backend ===
+# Optional replacement for the binary log when several boards save games at the same time:
+# SQLite serialises the writers, WAL mode lets the stats screens read while a board writes.
+# Enable it with DARTCOMPACT_BACKEND=sqlite (see results.RESULTS_BACKEND).
+
+RESULTS_DB = "resultat.sqlite"
+SCHEMA_VERSION = 2  # PRAGMA user_version; 1: games.out_rule, 2: turns.checkout
+_ready = set()  # Databases whose schema this process has set up (absolute paths)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    played_at INTEGER NOT NULL,
+    start_score INTEGER NOT NULL,
+    winner_id INTEGER REFERENCES players(id),
+    out_rule TEXT NOT NULL DEFAULT 'straight'
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    position INTEGER NOT NULL,
+    final_score INTEGER NOT NULL,
+    PRIMARY KEY (game_id, player_id)
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    turn_no INTEGER NOT NULL,
+    score_before INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    checkout INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS throws (
+    turn_id INTEGER NOT NULL REFERENCES turns(id),
+    throw_no INTEGER NOT NULL,
+    base INTEGER,
+    multiplier INTEGER,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (turn_id, throw_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_game_players_player ON game_players(player_id);
+CREATE INDEX IF NOT EXISTS idx_games_played_at ON games(played_at);
+CREATE INDEX IF NOT EXISTS idx_games_winner ON games(winner_id);
+CREATE INDEX IF NOT EXISTS idx_turns_player ON turns(player_id, score_before);
+"""
+
+
+def connect(path=RESULTS_DB):
+    key = os.path.abspath(path)
+    if not os.path.exists(path):
+        _ready.discard(key)  # Removed since: set up again
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)  # Transactions are explicit
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, one fsync per checkpoint
+    conn.execute("PRAGMA foreign_keys=ON")
+    if key not in _ready:
+        # Once per database: WAL mode is stored in the file, the tables and the migrations too
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            _migrate(conn)
+        _ready.add(key)
+    return conn
+
+
+def _migrate(conn):
+    # Databases created before the out rule was saved: their games count as straight-out, so a turn
+    # that scored exactly what was left was a checkout
+    if "out_rule" not in {row[1] for row in conn.execute("PRAGMA table_info(games)")}:
+        conn.execute("ALTER TABLE games ADD COLUMN out_rule TEXT NOT NULL DEFAULT 'straight'")
+    if "checkout" not in {row[1] for row in conn.execute("PRAGMA table_info(turns)")}:
+        conn.execute("ALTER TABLE turns ADD COLUMN checkout INTEGER NOT NULL DEFAULT 0")
+        conn.execute("UPDATE turns SET checkout = (score_before = points)")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _throw_row(throw):
+    # Same throw shapes as game_log: points only, or (segment, multiplier, points)
+    if isinstance(throw, int):
+        return None, None, throw
+    segment, multiplier, points = throw
+    return (segment or None), (multiplier or None), points
+
+
+def _throw_points(throw):
+    return throw if isinstance(throw, int) else throw[2]
+
+
+def _player_ids(conn, names):
+    conn.executemany("INSERT OR IGNORE INTO players(name) VALUES (?)", [(n,) for n in names])
+    ids = {}
+    for name in names:
+        ids[name] = conn.execute("SELECT id FROM players WHERE name = ?", (name,)).fetchone()[0]
+    return ids
+
+
+def _insert_game(conn, players, winner, start_score, played_at, out_rule):
+    ids = _player_ids(conn, [p['name'] for p in players])
+    cur = conn.execute("INSERT INTO games(played_at, start_score, winner_id, out_rule) VALUES (?, ?, ?, ?)",
+                       (played_at, start_score, ids.get(winner), out_rule))
+    game_id = cur.lastrowid
+    conn.executemany("INSERT OR IGNORE INTO game_players VALUES (?, ?, ?, ?)",
+                     [(game_id, ids[p['name']], i, p['score']) for i, p in enumerate(players)])
+
+    # Turn ids are handed out here so turns and throws go in with two executemany calls
+    # (safe because save_games holds the write lock for the whole transaction)
+    turn_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM turns").fetchone()[0]
+    turn_rows, throw_rows = [], []
+    for p in players:
+        score = start_score
+        for turn_no, turn in enumerate(p['history']):
+            turn_id += 1
+            points = sum(_throw_points(t) for t in turn)
+            last_double = bool(turn) and not isinstance(turn[-1], int) and turn[-1][1] == 2
+            bust = is_bust(score - points, last_double, out_rule)  # The engine's bust and finish rules
+            turn_rows.append((turn_id, game_id, ids[p['name']], turn_no, score, points, int(not bust and points == score)))
+            throw_rows.extend((turn_id, i) + _throw_row(t) for i, t in enumerate(turn))
+            if not bust:
+                score -= points
+    conn.executemany("INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?, ?)", turn_rows)
+    conn.executemany("INSERT INTO throws VALUES (?, ?, ?, ?, ?)", throw_rows)
+
+
+def save_games(games, path=RESULTS_DB):
+    # games: iterable of (players, winner, start_score, played_at, out_rule), all written in one transaction
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")  # Take the write lock now, other boards wait on busy_timeout
+        try:
+            for players, winner, start_score, played_at, out_rule in games:
+                _insert_game(conn, players, winner, start_score, int(played_at or time.time()), out_rule)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def save_game(players, winner, path=RESULTS_DB, start_score=301, out_rule=STRAIGHT_OUT):
+    save_games([(players, winner, start_score, None, out_rule)], path)
+
+
+# === Stats with SQL aggregates ===
+STATS_QUERY = """
+SELECT p.name,
+       (SELECT COUNT(*) FROM game_players gp WHERE gp.player_id = p.id),
+       (SELECT COUNT(*) FROM games g WHERE g.winner_id = p.id),
+       (SELECT AVG(t.points) FROM turns t WHERE t.player_id = p.id),
+       (SELECT COUNT(*) FROM turns t WHERE t.player_id = p.id AND t.score_before <= 170),
+       (SELECT COUNT(*) FROM turns t WHERE t.player_id = p.id AND t.checkout)
+FROM players p
+"""
+
+
+def _format_row(total, victories, average, attempts, checkouts):
+    return {
+        'total': total,
+        'victories': victories,
+        'win_percentage': round((victories / total) * 100, 2) if total else 0,
+        'turn_average': round(average, 2) if average else 0,
+        'checkout_rate': round(checkouts / attempts * 100, 2) if attempts else 0,
+    }
+
+
+def get_all_player_stats(names=None, path=RESULTS_DB):
+    if not os.path.exists(path):
+        return {name: _format_row(0, 0, 0, 0, 0) for name in names or ()}
+    conn = connect(path)
+    try:
+        if names is None:
+            rows = conn.execute(STATS_QUERY).fetchall()
+        else:
+            names = list(names)
+            marks = ",".join("?" * len(names))
+            rows = conn.execute(STATS_QUERY + f" WHERE p.name IN ({marks})", names).fetchall() if names else []
+    finally:
+        conn.close()
+    stats = {row[0]: _format_row(*row[1:]) for row in rows}
+    for name in names or ():
+        stats.setdefault(name, _format_row(0, 0, 0, 0, 0))
+    return stats
+
+
+def get_player_stats(player_name, path=RESULTS_DB):
+    return get_all_player_stats([player_name], path)[player_name]
+
+
+TOTALS_QUERY = """
+SELECT p.name,
+       (SELECT COUNT(*) FROM game_players gp WHERE gp.player_id = p.id),
+       (SELECT COUNT(*) FROM games g WHERE g.winner_id = p.id),
+       (SELECT COALESCE(SUM(t.points), 0) FROM turns t WHERE t.player_id = p.id),
+       (SELECT COUNT(*) FROM turns t WHERE t.player_id = p.id)
+FROM players p
+"""
+
+
+def get_player_totals(path=RESULTS_DB):
+    # {name: (games, victories, points, turns)} of every player, the raw counts behind the stats
+    if not os.path.exists(path):
+        return {}
+    conn = connect(path)
+    try:
+        return {row[0]: tuple(row[1:]) for row in conn.execute(TOTALS_QUERY)}
+    finally:
+        conn.close()
+
+
+def iter_game_summaries(path=RESULTS_DB):
+    # Player names and winner of every game, oldest first (same records as game_log.iter_game_summaries)
+    if not os.path.exists(path):
+        return
+    conn = connect(path)
+    try:
+        rows = conn.execute("""
+            SELECT gp.game_id, p.name, w.name FROM game_players gp
+            JOIN players p ON p.id = gp.player_id
+            JOIN games g ON g.id = gp.game_id
+            LEFT JOIN players w ON w.id = g.winner_id
+            ORDER BY gp.game_id, gp.position""")
+        for _, game in itertools.groupby(rows, key=lambda row: row[0]):
+            game = list(game)
+            yield GameSummary([row[1] for row in game], game[0][2])
+    finally:
+        conn.close()
+
+
+def game_count(path=RESULTS_DB):
+    if not os.path.exists(path):
+        return 0
+    conn = connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# === Migration of the existing results ===
+def import_results(src, path=RESULTS_DB, batch_size=500):
+    # Imports the old resultat.txt or a binary resultat.dclog, in batches of games
+    with open(src, "rb") as f:
+        is_log = f.read(len(MAGIC)) == MAGIC
+    played_at = int(os.path.getmtime(src))
+    if is_log:
+        # Every dart with its segment and multiplier, through the same path as save_game
+        games = (([{"name": p.name, "score": p.score, "history": p.history} for p in g.players],
+                  g.winner, g.start_score, g.played_at, g.out_rule) for g in iter_games(src, darts=True))
+    else:
+        games = ((players, winner, 301, played_at, STRAIGHT_OUT) for players, winner in iter_text_games(src))
+
+    count, batch = 0, []
+    for game in games:
+        batch.append(game)
+        if len(batch) >= batch_size:
+            save_games(batch, path)
+            count, batch = count + len(batch), []
+    if batch:
+        save_games(batch, path)
+        count += len(batch)
+    return count
+
+
+if __name__ == "__main__":
+    # python results_db.py resultat.txt [resultat.sqlite]
+    src = sys.argv[1] if len(sys.argv) > 1 else "resultat.txt"
+    dst = sys.argv[2] if len(sys.argv) > 2 else RESULTS_DB
+    print(f"{import_results(src, dst)} games imported from {src} into {dst}")
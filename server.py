@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from engine import GameState, OUT_RULES, START_SCORES, STRAIGHT_OUT
+from game_logic import handle_win
+
+# === Game server ===
+# One asyncio process hosts the games of every board. Each game is an engine.GameState; clients
+# (Streamlit page, Tkinter screen, scoreboards) talk JSON over HTTP/1.1 with keep-alive:
+#
+#   POST /games                  {"names": [...], "start_score": 501, "out_rule": "double"} -> game
+#   GET  /games                  summary of every game
+#   GET  /games/<id>             game
+#   POST /games/<id>/throw       {"segment": 20, "multiplier": 3}                          -> game
+#   POST /games/<id>/next        next player to the board, or confirms the win              -> game
+#   POST /games/<id>/undo        last dart or visit change                                   -> game
+#   GET  /games/<id>/events      server-sent events, one "state" event per change
+#
+# A game is {"id", "version", "result", "saved", "state"} where state is GameState.serialize() and
+# version goes up with every change. Moves run on the event loop (they are O(1)). The winning dart can
+# still be undone (a mis-entered dart) until "next" confirms the win: the game is then saved through
+# handle_win on one worker thread, so the results files see one write at a time, and can't change
+# any more. "next" answers once the save is done; "saved" is only true once handle_win succeeded. A
+# failed save is logged and the game kept: "next" again, or the server closing, saves it again. Games
+# won but not confirmed are saved when the server closes.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def game_options(body):
+    # (names, start_score, out_rule) of a POST /games body, or HTTPError 400
+    if not isinstance(body, dict):
+        raise HTTPError(400, "a game needs a JSON object")
+    names = body.get("names")
+    if not isinstance(names, list) or not names or not all(isinstance(n, str) and n.strip() for n in names):
+        raise HTTPError(400, "names must be a non-empty list of player names")
+    if len(set(names)) != len(names):
+        raise HTTPError(400, "every player needs a different name")
+    start_score = body.get("start_score", 301)
+    if type(start_score) is not int or start_score not in START_SCORES:
+        raise HTTPError(400, f"start_score must be one of {list(START_SCORES)}")
+    out_rule = body.get("out_rule", STRAIGHT_OUT)
+    if out_rule not in OUT_RULES:
+        raise HTTPError(400, f"out_rule must be one of {list(OUT_RULES)}")
+    return names, start_score, out_rule
+
+
+class Board:
+    __slots__ = ("id", "game", "version", "result", "subscribers", "saved", "saving")
+
+    def __init__(self, game_id, game):
+        self.id = game_id
+        self.game = game
+        self.version = 0
+        self.result = None  # Result of the last dart (engine SCORED / BUST / WIN)
+        self.subscribers = set()  # asyncio.Queue of every open event stream
+        self.saved = False  # Win confirmed and the game in the results
+        self.saving = None  # Future of the save on the worker thread, while it runs
+
+    def as_dict(self):
+        return {"id": self.id, "version": self.version, "result": self.result, "saved": self.saved,
+                "state": self.game.serialize()}
+
+
+class GameServer:
+    def __init__(self, save=True):
+        self.boards = {}
+        self.save = save  # False for load tests: finished games are not written to the results
+        self._ids = itertools.count(1)
+        self._saver = ThreadPoolExecutor(max_workers=1)
+        self._server = None
+        self._streams = set()  # Tasks serving an event stream, ended on close
+
+    # === Games ===
+    def create_game(self, names, start_score=301, out_rule=STRAIGHT_OUT):
+        board = Board(str(next(self._ids)), GameState(names, start_score, out_rule))
+        self.boards[board.id] = board
+        return board
+
+    def board(self, game_id):
+        try:
+            return self.boards[game_id]
+        except KeyError:
+            raise HTTPError(404, f"no game {game_id}")
+
+    def changed(self, board):
+        board.version += 1
+        if board.subscribers:
+            event = board.as_dict()
+            for queue in board.subscribers:
+                queue.put_nowait(event)
+
+    def save_game(self, board):
+        # Starts saving a won game (once at a time); the game can't change from here on
+        if not self.save:
+            board.saved = True
+            return
+        if board.saving is None:
+            board.saving = asyncio.get_running_loop().run_in_executor(self._saver, handle_win, board.game)
+            board.saving.add_done_callback(lambda future: self._saved(board, future))
+
+    def _saved(self, board, future):
+        board.saving = None
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            print(f"Game {board.id} couldn't be saved: {error or 'cancelled'!r}")
+            return
+        board.saved = True
+        self.changed(board)
+
+    def throw(self, board, segment, multiplier):
+        board.result = board.game.apply_throw(segment, multiplier)
+        self.changed(board)
+
+    def next_visit(self, board):
+        if board.game.winner is None:
+            board.game.end_visit()
+            board.result = None
+        elif board.saved:
+            return  # Confirmed already (a client retrying)
+        else:
+            self.save_game(board)
+        self.changed(board)
+
+    def undo(self, board):
+        if board.saved or board.saving is not None:
+            raise ValueError("the game is over and saved")
+        if board.game.undo():
+            board.result = None
+            self.changed(board)
+
+    async def _saves_done(self):
+        saving = [board.saving for board in self.boards.values() if board.saving is not None]
+        if saving:
+            await asyncio.wait(saving)
+
+    # === HTTP ===
+    async def route(self, method, path, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["games"]:
+            if method == "GET":
+                return 200, {"games": [{"id": b.id, "version": b.version, "players": [p.name for p in b.game.players],
+                                        "winner": b.game.winner.name if b.game.winner else None}
+                                       for b in self.boards.values()]}
+            if method == "POST":
+                board = self.create_game(*game_options(body))  # Checked here: nothing that can't be saved
+                return 201, board.as_dict()
+        elif len(parts) == 2 and parts[0] == "games" and method == "GET":
+            return 200, self.board(parts[1]).as_dict()
+        elif len(parts) == 3 and parts[0] == "games" and method == "POST":
+            board = self.board(parts[1])
+            if parts[2] == "throw":
+                data = body or {}
+                self.throw(board, data.get("segment"), data.get("multiplier", 1))
+            elif parts[2] == "next":
+                self.next_visit(board)
+                if board.saving is not None:
+                    await asyncio.wait([board.saving])  # Answer with the game saved, or not if the save failed
+            elif parts[2] == "undo":
+                self.undo(board)
+            else:
+                raise HTTPError(404, f"unknown action {parts[2]}")
+            return 200, board.as_dict()
+        elif len(parts) == 3 and parts[0] == "games" and parts[2] == "events":
+            raise HTTPError(405, "events are GET only")
+        raise HTTPError(404 if method in ("GET", "POST") else 405, f"{method} {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                path = urlsplit(target).path
+
+                if method == "GET" and path.endswith("/events"):
+                    await self.stream_events(path, writer)
+                    break
+                try:
+                    if length > MAX_BODY:
+                        raise HTTPError(413, "request body too large")
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else None
+                    except ValueError:
+                        raise HTTPError(400, "body is not JSON")
+                    status, payload = await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (ValueError, TypeError) as e:  # Rejected by the engine (invalid dart, game over...)
+                    status, payload = 400, {"error": str(e)}
+                self.respond(writer, status, payload, headers.get("connection", "").lower() != "close")
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close" or status == 413:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent garbage: drop the connection
+        finally:
+            writer.close()
+
+    def respond(self, writer, status, payload, keep_alive=True):
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                     .encode() + data)
+
+    async def stream_events(self, path, writer):
+        parts = [p for p in path.split("/") if p]
+        board = self.boards.get(parts[1]) if len(parts) == 3 and parts[0] == "games" else None
+        if board is None:
+            self.respond(writer, 404, {"error": f"no game at {path}"}, keep_alive=False)
+            await writer.drain()
+            return
+        queue = asyncio.Queue()
+        board.subscribers.add(queue)
+        self._streams.add(asyncio.current_task())
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                         b"Connection: keep-alive\r\n\r\n")
+            queue.put_nowait(board.as_dict())  # Current state first, then every change
+            while True:
+                event = await queue.get()
+                if event is None:  # Server shutting down
+                    break
+                writer.write(b"event: state\ndata: " + json.dumps(event, separators=(",", ":")).encode() + b"\n\n")
+                await writer.drain()
+        finally:
+            board.subscribers.discard(queue)
+            self._streams.discard(asyncio.current_task())
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self._server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        port = await self.start(host, port)
+        print(f"DartCompact game server on http://{host}:{port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for board in self.boards.values():
+                for queue in board.subscribers:
+                    queue.put_nowait(None)
+            await asyncio.gather(*self._streams, return_exceptions=True)
+            await self._server.wait_closed()
+        # Saves still running, then the won games not saved yet: never confirmed, or whose save failed
+        await self._saves_done()
+        for board in self.boards.values():
+            if board.game.winner is not None and not board.saved:
+                self.save_game(board)
+        await self._saves_done()
+        self._saver.shutdown(wait=True)  # Games that just finished are still saved
+
+
+# === Client ===
+class GameClient:
+    # Blocking client for the thin front ends (Tkinter, Streamlit, scoreboards); one kept-alive connection
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5):
+        self.host, self.port, self.timeout = host, port, timeout
+        self._conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        self._conn.request(method, path, body=data, headers=headers)
+        response = self._conn.getresponse()
+        payload = json.loads(response.read())
+        if response.status >= 400:
+            raise ValueError(payload.get("error", f"HTTP {response.status}"))
+        return payload
+
+    def create_game(self, names, start_score=301, out_rule=STRAIGHT_OUT):
+        return self.request("POST", "/games", {"names": names, "start_score": start_score, "out_rule": out_rule})
+
+    def games(self):
+        return self.request("GET", "/games")["games"]
+
+    def get(self, game_id):
+        return self.request("GET", f"/games/{game_id}")
+
+    def throw(self, game_id, segment, multiplier=1):
+        return self.request("POST", f"/games/{game_id}/throw", {"segment": segment, "multiplier": multiplier})
+
+    def next_visit(self, game_id):
+        return self.request("POST", f"/games/{game_id}/next")
+
+    def undo(self, game_id):
+        return self.request("POST", f"/games/{game_id}/undo")
+
+    def events(self, game_id):
+        # Yields the game after every change; blocks between events (own connection, no timeout)
+        conn = http.client.HTTPConnection(self.host, self.port)
+        conn.request("GET", f"/games/{game_id}/events")
+        response = conn.getresponse()
+        if response.status != 200:
+            raise ValueError(json.loads(response.read()).get("error"))
+        try:
+            for line in response:
+                if line.startswith(b"data: "):
+                    yield json.loads(line[len(b"data: "):])
+        finally:
+            conn.close()
+
+    @staticmethod
+    def state(game):
+        # GameState rebuilt from a server answer, for the screens that already draw one
+        return GameState.deserialize(game["state"])
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    # python server.py [--host 0.0.0.0] [--port 8765]
+    parser = argparse.ArgumentParser(description="DartCompact game server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(GameServer().serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
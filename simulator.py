@@ -0,0 +1,296 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import (BOARD_ORDER, BULL, DARTS_PER_VISIT, DOUBLE_OUT, MISS, SEGMENTS, STRAIGHT_OUT, WIN,
+                    GameState)
+
+# === Monte Carlo match simulator ===
+# Simulates x01 legs with the engine's rules (bust back to the visit start, optional double-out) for
+# players described by a SkillModel: for every target a player can aim at, the probability of each
+# possible outcome. Legs are simulated in NumPy batches, one dart of every unfinished leg per step;
+# with processes > 1 the batches are spread over several cores. Every batch has its own seed spawned
+# from one SeedSequence, so the results only depend on the seed, not on the number of processes.
+#
+# Legs are independent, so a match is decided from the visits each player needs: in turn order, the
+# first player with the fewest visits wins. That gives win probabilities for any line-up from one
+# batch of legs per player.
+
+# Every dart outcome, index = outcome id; aims use the same ids (aiming at a miss is not a thing)
+OUTCOMES = [(MISS, 0)] + [(s, m) for m in (1, 2, 3) for s in SEGMENTS] + [(BULL, 1), (BULL, 2)]
+OUTCOME_ID = {o: i for i, o in enumerate(OUTCOMES)}
+POINTS = np.array([s * m for s, m in OUTCOMES], dtype=np.int16)
+IS_DOUBLE = np.array([m == 2 for s, m in OUTCOMES])
+MAX_DARTS = 600  # Legs not finished after this many darts count as unfinished
+BATCH_SIZE = 50_000
+
+
+def _neighbours(segment):
+    i = BOARD_ORDER.index(segment)
+    return BOARD_ORDER[i - 1], BOARD_ORDER[(i + 1) % len(BOARD_ORDER)]
+
+
+class SkillModel:
+    # matrix[aim, outcome] = probability; rows of unused aims stay zero
+    def __init__(self, matrix, name=None):
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape != (len(OUTCOMES), len(OUTCOMES)):
+            raise ValueError("skill matrix must be outcomes x outcomes")
+        self.matrix = matrix
+        self.name = name
+        self.cumulative = np.cumsum(matrix, axis=1)
+        self.cumulative[:, -1] = 1.0  # Rounding must not leave a gap at the end
+
+    @classmethod
+    def from_accuracy(cls, single=0.85, double=0.35, treble=0.3, bull=0.25, name=None):
+        # Hit rates for each kind of target; the misses go to the same segment or the neighbours
+        m = np.zeros((len(OUTCOMES), len(OUTCOMES)))
+        singles = [OUTCOME_ID[(s, 1)] for s in SEGMENTS]
+        for segment in SEGMENTS:
+            left, right = _neighbours(segment)
+            aim = OUTCOME_ID[(segment, 3)]
+            m[aim, aim] += treble
+            m[aim, OUTCOME_ID[(segment, 1)]] += (1 - treble) * 0.6
+            m[aim, OUTCOME_ID[(left, 1)]] += (1 - treble) * 0.2
+            m[aim, OUTCOME_ID[(right, 1)]] += (1 - treble) * 0.2
+
+            aim = OUTCOME_ID[(segment, 2)]
+            m[aim, aim] += double
+            m[aim, OUTCOME_ID[(segment, 1)]] += (1 - double) * 0.4
+            m[aim, OUTCOME_ID[(MISS, 0)]] += (1 - double) * 0.4  # Outside the board
+            m[aim, OUTCOME_ID[(left, 2)]] += (1 - double) * 0.1
+            m[aim, OUTCOME_ID[(right, 2)]] += (1 - double) * 0.1
+
+            aim = OUTCOME_ID[(segment, 1)]
+            m[aim, aim] += single
+            m[aim, OUTCOME_ID[(left, 1)]] += (1 - single) * 0.35
+            m[aim, OUTCOME_ID[(right, 1)]] += (1 - single) * 0.35
+            m[aim, OUTCOME_ID[(segment, 3)]] += (1 - single) * 0.15
+            m[aim, OUTCOME_ID[(segment, 2)]] += (1 - single) * 0.15
+
+        for aim, other, share in ((OUTCOME_ID[(BULL, 2)], OUTCOME_ID[(BULL, 1)], 0.35),
+                                  (OUTCOME_ID[(BULL, 1)], OUTCOME_ID[(BULL, 2)], 0.2)):
+            m[aim, aim] += bull
+            m[aim, other] += (1 - bull) * share
+            m[aim, singles] += (1 - bull) * (1 - share) / len(singles)
+        return cls(m, name)
+
+    def outcome_probabilities(self, segment, multiplier):
+        # {(segment, multiplier): probability} when aiming at this target
+        row = self.matrix[OUTCOME_ID[(segment, multiplier)]]
+        return {OUTCOMES[i]: float(p) for i, p in enumerate(row) if p}
+
+    def sample(self, aims, rng):
+        # One outcome id per aim id, inverse CDF on the rows of the aims
+        u = rng.random(len(aims))
+        return (u[:, None] > self.cumulative[aims]).sum(axis=1)
+
+
+SKILL_LEVELS = {
+    "beginner": SkillModel.from_accuracy(single=0.6, double=0.08, treble=0.05, bull=0.05, name="beginner"),
+    "club": SkillModel.from_accuracy(single=0.85, double=0.25, treble=0.2, bull=0.15, name="club"),
+    "pro": SkillModel.from_accuracy(single=0.95, double=0.45, treble=0.45, bull=0.35, name="pro"),
+}
+
+
+# === Where to aim ===
+def default_aim(score, double_out):
+    # Simple finishing routine: finish when one dart can, else set up an easy finish, else treble 20
+    if double_out:
+        if score == 50:
+            return (BULL, 2)
+        if score <= 40 and score % 2 == 0:
+            return (score // 2, 2)
+        if score <= 41:
+            return (1, 1) if score % 2 else (2, 1)  # Leave an even number
+        if score <= 60:
+            return (score - 40, 1)  # Leave double 20
+        return (20, 3)
+    if score <= 20:
+        return (score, 1)
+    if score <= 40 and score % 2 == 0:
+        return (score // 2, 2)
+    if score <= 60 and score % 3 == 0:
+        return (score // 3, 3)
+    if score == 25 or score == 50:
+        return (BULL, score // 25)
+    if score <= 60:
+        return (20, 1) if score > 20 else (score, 1)
+    return (20, 3)
+
+
+class TablePolicy:
+    # Aim by remaining score only; picklable so it can go to the worker processes
+    def __init__(self, max_score, double_out, aim=default_aim):
+        self.table = np.array([OUTCOME_ID[aim(s, double_out)] if s > 0 else OUTCOME_ID[(20, 3)]
+                               for s in range(max_score + 1)], dtype=np.int16)
+
+    def __call__(self, score, darts_left, visit_start):
+        return self.table[score]
+
+
+# === Legs ===
+def _simulate_batch(model, n, start_score, out_rule, policy, seed):
+    rng = np.random.default_rng(seed)
+    double_out = out_rule == DOUBLE_OUT
+    score = np.full(n, start_score, dtype=np.int16)
+    visit_start = score.copy()
+    dart_in_visit = np.zeros(n, dtype=np.int8)
+    darts = np.zeros(n, dtype=np.int16)
+    visits = np.zeros(n, dtype=np.int16)
+    attempts = np.zeros(n, dtype=np.int16)  # Visits started at 170 or less (as results.CheckoutRate)
+    finished = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+
+    for _ in range(MAX_DARTS):
+        if not len(active):
+            break
+        s = score[active]
+        first = dart_in_visit[active] == 0
+        attempts[active[first & (s <= 170)]] += 1
+
+        outcome = model.sample(policy(s, DARTS_PER_VISIT - dart_in_visit[active], visit_start[active]), rng)
+        remaining = s - POINTS[outcome]
+        bust = remaining < 0
+        if double_out:
+            bust |= (remaining == 1) | ((remaining == 0) & ~IS_DOUBLE[outcome])
+        won = (remaining == 0) & ~bust
+
+        darts[active] += 1
+        score[active] = np.where(bust, visit_start[active], remaining)
+        dart_in_visit[active] += 1
+        visit_over = bust | won | (dart_in_visit[active] >= DARTS_PER_VISIT)
+        ended = active[visit_over]
+        visits[ended] += 1
+        visit_start[ended] = score[ended]
+        dart_in_visit[ended] = 0
+        finished[active[won]] = True
+        active = active[~won]
+
+    return darts, visits, attempts, finished
+
+
+def simulate_legs(model, n, start_score=501, out_rule=DOUBLE_OUT, policy=None, seed=0, processes=1,
+                  batch_size=BATCH_SIZE):
+    # Returns a LegResults for n legs of one player (empty for n = 0)
+    if n < 0:
+        raise ValueError("number of legs must be 0 or more")
+    policy = policy or TablePolicy(start_score, out_rule == DOUBLE_OUT)
+    if n == 0:
+        return LegResults(*_simulate_batch(model, 0, start_score, out_rule, policy, seed))
+    sizes = [batch_size] * (n // batch_size) + ([n % batch_size] if n % batch_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(model, size, start_score, out_rule, policy, s) for size, s in zip(sizes, seeds)]
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            batches = list(pool.map(_run_batch, jobs))
+    else:
+        batches = [_run_batch(job) for job in jobs]
+    return LegResults(*(np.concatenate(column) for column in zip(*batches)))
+
+
+def _run_batch(job):
+    return _simulate_batch(*job)
+
+
+class LegResults:
+    def __init__(self, darts, visits, attempts, finished):
+        self.darts = darts
+        self.visits = visits
+        self.attempts = attempts
+        self.finished = finished
+
+    def __len__(self):
+        return len(self.darts)
+
+    @property
+    def checkout_rate(self):
+        # Finished legs per visit started at a finishable score, in %
+        attempts = int(self.attempts[self.finished].sum())
+        return round(100 * int(self.finished.sum()) / attempts, 2) if attempts else 0
+
+    def darts_per_leg(self):
+        d = self.darts[self.finished]
+        if not len(d):
+            return {"mean": 0, "p10": 0, "median": 0, "p90": 0, "unfinished": len(self)}
+        return {"mean": round(float(d.mean()), 2), "p10": int(np.percentile(d, 10)), "median": int(np.median(d)),
+                "p90": int(np.percentile(d, 90)), "unfinished": int((~self.finished).sum())}
+
+    def visits_for_match(self):
+        # Unfinished legs never win
+        return np.where(self.finished, self.visits, np.iinfo(np.int16).max)
+
+
+def win_probabilities(legs):
+    # legs: LegResults per player in throwing order (same number of legs each) -> P(win) per player.
+    # The first player with the fewest visits checks out first.
+    if not legs or not len(legs[0]):
+        return [0.0] * len(legs)
+    visits = np.stack([l.visits_for_match() for l in legs])
+    winners = np.argmin(visits, axis=0)  # argmin picks the earliest player on ties
+    return [float((winners == i).mean()) for i in range(len(legs))]
+
+
+def _policy(model, start_score, out_rule, optimal):
+    # AI players aim with the policy solved for their skill model (strategy.py), cached on disk
+    if not optimal:
+        return None
+    from strategy import load_or_solve
+    return load_or_solve(model, out_rule, start_score)
+
+
+def win_probability_table(models, n=100_000, start_score=501, out_rule=DOUBLE_OUT, seed=0, processes=1, optimal=False):
+    # {first thrower: {opponent: P(first thrower wins)}} for every pair of models
+    legs = {name: simulate_legs(model, n, start_score, out_rule, _policy(model, start_score, out_rule, optimal),
+                                seed=(seed, i), processes=processes)
+            for i, (name, model) in enumerate(models.items())}
+    table = {}
+    for a in models:
+        table[a] = {b: round(win_probabilities([legs[a], legs[b]])[0], 4) for b in models if b != a}
+    return table
+
+
+def summary_table(models, n=100_000, start_score=501, out_rule=DOUBLE_OUT, seed=0, processes=1, optimal=False):
+    # Checkout rate and darts per leg for each model
+    rows = {}
+    for i, (name, model) in enumerate(models.items()):
+        legs = simulate_legs(model, n, start_score, out_rule, _policy(model, start_score, out_rule, optimal),
+                             seed=(seed, i), processes=processes)
+        rows[name] = dict(legs.darts_per_leg(), checkout_rate=legs.checkout_rate)
+    return rows
+
+
+# === Reference: one leg through the engine ===
+def play_leg(model, start_score=501, out_rule=DOUBLE_OUT, rng=None, aim=default_aim):
+    # Slow, dart by dart on engine.GameState; used to check the batch simulation against the real rules
+    rng = rng or np.random.default_rng()
+    game = GameState(["sim"], start_score, out_rule)
+    darts = 0
+    while darts < MAX_DARTS:
+        target = OUTCOME_ID[aim(game.current_player.score, out_rule == DOUBLE_OUT)]
+        segment, multiplier = OUTCOMES[model.sample(np.array([target]), rng)[0]]
+        result = game.apply_throw(segment, max(multiplier, 1))
+        darts += 1
+        if result == WIN:
+            return darts, game.visits + 1
+        if game.visit_over:
+            game.end_visit()
+    return darts, None
+
+
+if __name__ == "__main__":
+    # python simulator.py [legs] [start score] [straight|double] [processes] [--optimal]
+    parser = argparse.ArgumentParser(description="Simulate x01 legs for the built-in skill levels")
+    parser.add_argument("legs", nargs="?", type=int, default=100_000)
+    parser.add_argument("start_score", nargs="?", type=int, default=501)
+    parser.add_argument("out_rule", nargs="?", choices=(STRAIGHT_OUT, DOUBLE_OUT), default=DOUBLE_OUT)
+    parser.add_argument("processes", nargs="?", type=int, default=1)
+    parser.add_argument("--optimal", action="store_true", help="aim with the solved strategy of each skill level")
+    args = parser.parse_args()
+
+    options = dict(processes=args.processes, optimal=args.optimal)
+    for name, row in summary_table(SKILL_LEVELS, args.legs, args.start_score, args.out_rule, **options).items():
+        print(f"{name:<9} {row}")
+    for name, row in win_probability_table(SKILL_LEVELS, args.legs, args.start_score, args.out_rule, **options).items():
+        print(f"{name:<9} throwing first wins {row}")
@@ -0,0 +1,126 @@
+import hashlib
+import os
+
+import numpy as np
+
+from engine import DARTS_PER_VISIT, DOUBLE_OUT, STRAIGHT_OUT
+from simulator import IS_DOUBLE, OUTCOME_ID, OUTCOMES, POINTS
+
+# === Optimal aiming by dynamic programming ===
+# For a SkillModel, finds the target that minimises the expected number of darts to finish, for
+# every state of a visit: visit-start score u, current score s and darts left d. A bust puts the
+# score back to u (engine rules, also the double-out rule), so the value of a visit depends on u
+# itself. Scores only go down, so u is solved in increasing order: every state of u needs E(u') for
+# u' < u, already known, and E(u) - the only unknown. For a fixed aiming policy the values are
+# affine in E(u), a + b * E(u), which gives E(u) = a / (1 - b) directly; the policy is then improved
+# with that value until it stops changing (policy iteration). All states of one u and all targets
+# are evaluated together with a matrix product against the skill matrix.
+#
+# The solved policy is cached in STRATEGY_DIR, keyed by the skill matrix, the out rule and the
+# maximum score, so it is computed once per skill model.
+
+MAX_SCORE = 501
+VISIT_RANGE = 60 * (DARTS_PER_VISIT - 1)  # s is at most 120 below u before the last dart
+STRATEGY_DIR = "strategies"
+AIMS = np.arange(1, len(OUTCOMES))  # Every outcome but the miss can be aimed at
+
+
+class Strategy:
+    def __init__(self, policy, expected, out_rule):
+        self.policy = policy  # [u, u - s, darts left - 1] -> outcome id to aim at
+        self.expected = expected  # [u] -> expected darts to finish from the start of a visit at u
+        self.out_rule = out_rule
+
+    def __call__(self, score, darts_left, visit_start):
+        # Vectorised, same signature as simulator.TablePolicy
+        return self.policy[visit_start, visit_start - score, darts_left - 1]
+
+    def aim(self, score, darts_left=DARTS_PER_VISIT, visit_start=None):
+        # (segment, multiplier) to aim at; visit_start defaults to the current score (first dart)
+        visit_start = score if visit_start is None else visit_start
+        return OUTCOMES[self.policy[visit_start, visit_start - score, darts_left - 1]]
+
+
+def _transitions(s, double_out):
+    # For current scores s (array) and every outcome: score after the dart, bust and win masks
+    new = s[:, None] - POINTS[None, :]
+    bust = new < 0
+    if double_out:
+        bust |= (new == 1) | ((new == 0) & ~IS_DOUBLE[None, :])
+    win = (new == 0) & ~bust
+    return new, bust, win
+
+
+def solve(model, out_rule=DOUBLE_OUT, max_score=MAX_SCORE):
+    double_out = out_rule == DOUBLE_OUT
+    probabilities = model.matrix[AIMS].T  # outcomes x aims
+    expected = np.zeros(max_score + 1)
+    policy = np.zeros((max_score + 1, VISIT_RANGE + 1, DARTS_PER_VISIT), dtype=np.int8)
+
+    for u in range(1, max_score + 1):
+        if double_out and u == 1:
+            continue  # A visit can't start at 1 with double-out
+        offsets = np.arange(min(VISIT_RANGE, u - 1) + 1)
+        s = u - offsets
+        new, bust, win = _transitions(s, double_out)
+        inside = np.clip(u - new, 0, len(offsets) - 1)  # Offset of the next state within this visit
+
+        x = expected[u - 1] + 3  # First guess for E(u)
+        previous = None
+        while True:
+            # Values a + b * E(u) of every state, built from the last dart of the visit backwards
+            va = vb = None
+            for d in range(1, DARTS_PER_VISIT + 1):
+                if d == 1:
+                    na = np.where(new < u, expected[np.clip(new, 0, max_score)], 0.0)
+                    nb = (new >= u).astype(float)  # No points scored at s = u: the visit starts over
+                else:
+                    na, nb = va[inside], vb[inside]
+                na = np.where(bust, 0.0, np.where(win, 0.0, na))
+                nb = np.where(bust, 1.0, np.where(win, 0.0, nb))
+                qa = 1 + na @ probabilities  # states x aims
+                qb = nb @ probabilities
+                choice = np.argmin(qa + qb * x, axis=1)
+                rows = np.arange(len(offsets))
+                va, vb = qa[rows, choice], qb[rows, choice]
+                policy[u, offsets, d - 1] = AIMS[choice]
+            x_new = va[0] / (1 - vb[0]) if vb[0] < 1 else np.inf
+            current = policy[u, offsets].copy()
+            if previous is not None and np.array_equal(current, previous) or abs(x_new - x) < 1e-9:
+                x = x_new
+                break
+            previous, x = current, x_new
+        expected[u] = x
+    return Strategy(policy, expected, out_rule)
+
+
+def _cache_path(model, out_rule, max_score, directory):
+    digest = hashlib.sha256(model.matrix.tobytes()).hexdigest()[:16]
+    return os.path.join(directory, f"policy_{out_rule}_{max_score}_{digest}.npz")
+
+
+def load_or_solve(model, out_rule=DOUBLE_OUT, max_score=MAX_SCORE, directory=STRATEGY_DIR):
+    path = _cache_path(model, out_rule, max_score, directory)
+    try:
+        with np.load(path) as data:
+            return Strategy(data["policy"], data["expected"], out_rule)
+    except (OSError, KeyError, ValueError):
+        pass
+    strategy = solve(model, out_rule, max_score)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path[:-len(".npz")] + ".tmp.npz"
+    np.savez_compressed(tmp_path, policy=strategy.policy, expected=strategy.expected)
+    os.replace(tmp_path, path)
+    return strategy
+
+
+if __name__ == "__main__":
+    # python strategy.py: where a club player should aim, and how many darts it takes
+    from checkout import dart_name
+    from simulator import SKILL_LEVELS
+
+    for rule in (DOUBLE_OUT, STRAIGHT_OUT):
+        strategy = load_or_solve(SKILL_LEVELS["club"], rule)
+        print(f"{rule}-out: {strategy.expected[501]:.2f} darts expected from 501")
+        for score in (501, 170, 100, 61, 50, 41, 40, 32, 17, 3):
+            print(f"  {score:>3}: aim {dart_name(strategy.aim(score))}, {strategy.expected[score]:.2f} darts to finish")
@@ -0,0 +1,205 @@
+import json
+
+import pytest
+
+from engine import BUST, DOUBLE_OUT, SCORED, STRAIGHT_OUT, WIN, GameState, is_bust, throw_points
+
+
+def game_at(score, names=("A", "B"), out_rule=STRAIGHT_OUT):
+    # A new game with every player on `score` (games start at 101, 301 or 501)
+    game = GameState(list(names), 101, out_rule)
+    for player in game.players:
+        player.score = score
+    game.visit_start = score
+    return game
+
+
+# === Darts ===
+def test_throw_points():
+    assert throw_points(20, 3) == 60
+    assert throw_points(25, 2) == 50
+    assert throw_points(0, 3) == 0  # A miss scores nothing whatever the multiplier
+
+
+@pytest.mark.parametrize("segment, multiplier", [(21, 1), (25, 3), (-1, 1), (20, 4), (20, 0)])
+def test_invalid_throws_are_refused(segment, multiplier):
+    with pytest.raises(ValueError):
+        throw_points(segment, multiplier)
+
+
+@pytest.mark.parametrize("points", [-1, 61])
+def test_apply_points_range(points):
+    game = GameState(["A"], 301)
+    with pytest.raises(ValueError):
+        game.apply_points(points)
+    assert game.darts_thrown == 0 and game.player("A").score == 301
+
+
+def test_apply_points_bounds():
+    game = GameState(["A"], 301)
+    assert game.apply_points(0) == SCORED
+    assert game.apply_points(60) == SCORED
+    assert game.player("A").score == 241
+
+
+def test_apply_points_refused_with_double_out():
+    game = GameState(["A"], 301, DOUBLE_OUT)
+    with pytest.raises(ValueError):
+        game.apply_points(20)
+
+
+# === Busts and finishes ===
+def test_bust_below_zero_reverts_the_whole_visit():
+    game = game_at(50)
+    assert game.apply_throw(20) == SCORED
+    assert game.apply_throw(20) == SCORED
+    assert game.player("A").score == 10
+    assert game.apply_throw(20) == BUST
+    assert game.player("A").score == 50  # Back to the start of the visit, not of the dart
+    assert game.visit_over
+    assert game.player("A").history == [[(20, 1, 20), (20, 1, 20), (20, 1, 20)]]  # The darts stay in the history
+
+
+def test_straight_out_finishes_on_any_dart():
+    game = game_at(20)
+    assert game.apply_throw(20) == WIN
+    assert game.winner is game.player("A")
+    assert game.visit_over
+
+
+@pytest.mark.parametrize("start, dart", [(20, (20, 1)), (1 + 20, (20, 1)), (60, (20, 3))])
+def test_double_out_busts(start, dart):
+    # A finish off a single or treble, or 1 left
+    game = game_at(start, ["A"], DOUBLE_OUT)
+    assert game.apply_throw(*dart) == BUST
+    assert game.player("A").score == start
+    assert game.winner is None
+
+
+def test_double_out_finishes_on_a_double_and_the_bullseye():
+    game = game_at(40, ["A"], DOUBLE_OUT)
+    assert game.apply_throw(20, 2) == WIN
+    game = game_at(50, ["A"], DOUBLE_OUT)
+    assert game.apply_throw(25, 2) == WIN
+
+
+def test_is_bust():
+    assert is_bust(-1, True)
+    assert not is_bust(0, False)
+    assert not is_bust(1, False)
+    assert is_bust(1, True, DOUBLE_OUT)
+    assert is_bust(0, False, DOUBLE_OUT)
+    assert not is_bust(0, True, DOUBLE_OUT)
+    assert not is_bust(2, False, DOUBLE_OUT)
+
+
+# === Visits ===
+def test_visit_of_three_darts_then_next_player():
+    game = GameState(["A", "B"], 301)
+    for _ in range(3):
+        game.apply_throw(1)
+    assert game.visit_over
+    with pytest.raises(ValueError):
+        game.apply_throw(1)
+    game.end_visit()
+    assert game.current_player.name == "B"
+    assert game.visit_start == 301
+    assert game.visits == 1
+    game.end_visit()  # Also before 3 darts
+    assert game.current_player.name == "A"
+    assert game.visit_start == 298
+
+
+def test_play_visit_stops_at_a_bust_and_passes_the_board():
+    game = game_at(30)
+    assert game.play_visit([(20, 1), (20, 1), (5, 1)]) == BUST
+    assert game.player("A").history == [[(20, 1, 20), (20, 1, 20)]]
+    assert game.player("A").score == 30
+    assert game.current_player.name == "B"
+
+
+def test_play_visit_win_keeps_the_board():
+    game = game_at(30)
+    assert game.play_visit([(10, 1), (20, 1), (5, 1)]) == WIN
+    assert game.current_player.name == "A"
+    with pytest.raises(ValueError):
+        game.end_visit()
+
+
+# === Undo ===
+def test_undo_darts_and_visits():
+    game = GameState(["A", "B"], 301)
+    game.apply_throw(20, 3)
+    game.end_visit()
+    game.apply_throw(19, 3)
+    assert game.undo()  # B's dart
+    assert game.player("B").score == 301 and game.darts_thrown == 0
+    assert game.undo()  # The end of A's visit
+    assert game.current_player.name == "A"
+    assert game.visits == 0
+    assert game.player("A").history == [[(20, 3, 60)]]
+    assert game.player("B").history == []
+    assert game.undo()  # A's dart
+    assert game.player("A").score == 301
+    assert not game.undo()
+    assert game.undo_depth == 0
+
+
+def test_undo_a_bust_and_a_win():
+    game = game_at(40, ["A"], DOUBLE_OUT)
+    game.apply_throw(20, 1)
+    assert game.apply_throw(20, 1) == BUST
+    game.undo()
+    assert not game.busted and game.player("A").score == 20
+    assert game.apply_throw(10, 2) == WIN
+    game.undo()
+    assert game.winner is None and game.player("A").score == 20
+    assert game.apply_throw(5, 2) == SCORED
+
+
+# === Serialization ===
+def test_serialize_round_trip_mid_visit():
+    game = GameState(["A", "B", "C"], 101, DOUBLE_OUT)
+    game.play_visit([(20, 3), (1, 1), (1, 1)])
+    game.apply_throw(19, 1)
+    game.apply_throw(25, 2)
+    data = json.loads(json.dumps(game.serialize()))  # Must survive JSON
+    restored = GameState.deserialize(data)
+    assert restored.serialize() == game.serialize()
+    assert restored.current_player.name == "B"
+    assert restored.darts_thrown == 2
+    assert restored.visit is restored.player("B").history[-1]  # The open visit is the player's last one
+    assert restored.apply_throw(1, 1) == SCORED
+    assert restored.player("B").history[-1] == [(19, 1, 19), (25, 2, 50), (1, 1, 1)]
+
+
+def test_serialize_round_trip_after_a_win():
+    game = game_at(20)
+    game.apply_points(20)
+    restored = GameState.deserialize(json.loads(json.dumps(game.serialize())))
+    assert restored.winner.name == "A"
+    assert restored.player("A").history == [[20]]
+    assert restored.visit_over
+
+
+def test_invalid_games():
+    with pytest.raises(ValueError):
+        GameState([], 301)
+    with pytest.raises(ValueError):
+        GameState(["A"], 301, "triple")
+
+
+def test_duplicate_names_are_refused():
+    with pytest.raises(ValueError):
+        GameState(["A", "B", "A"], 301)
+
+
+@pytest.mark.parametrize("start_score", [0, 100, 70_000, "301", 301.5])
+def test_start_score_must_be_a_standard_one(start_score):
+    with pytest.raises(ValueError):
+        GameState(["A"], start_score)
+
+
+@pytest.mark.parametrize("start_score", [101, 301, 501])
+def test_standard_start_scores(start_score):
+    assert GameState(["A"], start_score).player("A").score == start_score
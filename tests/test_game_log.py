@@ -0,0 +1,56 @@
+import pytest
+
+from engine import DOUBLE_OUT, STRAIGHT_OUT, GameState
+from game_log import GameLogError, LogWriter, append_game, encode_game, iter_game_summaries, iter_games
+
+LONG_NAME = "Zoë Ångström-" + "é" * 200  # More than 255 bytes of utf-8, cut inside an "é" at byte 255
+
+
+def play(names, out_rule, visits):
+    game = GameState(names, 101, out_rule)
+    for darts in visits:
+        game.play_visit(darts)
+    return game
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "games.dclog")
+    # Double-out: A busts finishing 41 off a single, B scores, A checks out on D20
+    double = play([LONG_NAME, "B"], DOUBLE_OUT, [[(20, 3)], [(1, 1)], [(20, 1), (1, 1), (20, 1)], [(5, 1)],
+                                                 [(1, 1), (20, 2)]])
+    straight = play(["C", "D"], STRAIGHT_OUT, [[(20, 3), (20, 2)], [(0, 1)], [(1, 1)]])
+    for game in (double, straight):
+        append_game(game.as_dicts(), game.winner.name, path, game.start_score, 1_700_000_000, game.out_rule)
+
+    first, second = iter_games(path)
+    name = first.players[0].name
+    assert LONG_NAME.startswith(name) and len(name.encode("utf-8")) <= 255 and name.endswith("é")
+    assert first.winner == name and first.out_rule == DOUBLE_OUT and first.start_score == 101
+    assert first.played_at == 1_700_000_000
+    a = first.players[0]
+    assert a.score == 0
+    assert a.history == [[60], [20, 1, 20], [1, 40]]  # The bust stays in the history
+    assert a.doubles == [False, False, True]
+    assert first.players[1].history == [[1], [5]] and first.players[1].score == 95
+    assert second.out_rule == STRAIGHT_OUT and second.winner == "C"
+    assert second.players[0].history == [[60, 40], [1]]
+    assert second.players[1].history == [[0]]
+    assert [s.winner for s in iter_game_summaries(path)] == [name, "C"]
+
+
+def test_writer_round_trip(tmp_path):
+    path = str(tmp_path / "games.dclog")
+    game = play(["A", "B"], DOUBLE_OUT, [[(20, 3), (20, 1), (1, 1)], [(0, 1)], [(10, 2)]])
+    writer = LogWriter(path, flush_interval=0)
+    writer.append(game.as_dicts(), "A", 101, out_rule=DOUBLE_OUT)
+    (record,) = iter_games(path)
+    assert record.out_rule == DOUBLE_OUT and record.players[0].history == [[60, 20, 1], [20]]
+
+
+@pytest.mark.parametrize("start_score, score", [(70_000, 0), (301, -1), (301, 70_000)])
+def test_scores_out_of_range_fail_when_encoded(start_score, score):
+    players = [{"name": "A", "score": score, "history": []}]
+    with pytest.raises(GameLogError):
+        encode_game(players, "A", start_score)
+    with pytest.raises(ValueError):  # GameLogError is a ValueError
+        LogWriter("unused.dclog", flush_interval=60).append(players, "A", start_score)
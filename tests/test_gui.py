@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+TURNS = 1000
+BLOCK = 100
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Journals and avatar cache of the test stay out of the repository
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_long_session_reuses_the_widgets(root):
+    # The game window is built once: 1000 turns later it has the same widgets and a turn costs the same
+    import gui
+    from game_logic import start_game
+
+    game = start_game(["A", "B"], start_score=501)
+    gui.ask_for_throws(game)
+    window = gui.game_window
+    widgets, times = [], []
+    try:
+        for _ in range(TURNS // BLOCK):
+            start = time.perf_counter()
+            for _ in range(BLOCK):
+                for entry, _ in window.entries:
+                    entry.insert(0, "0")  # Misses: nobody checks out
+                window.submit_throws()
+                root.update()
+            times.append((time.perf_counter() - start) / BLOCK)
+            widgets.append(count_widgets(root))
+    finally:
+        window.close()
+
+    assert game.visits == TURNS
+    assert len(set(widgets)) == 1
+    assert max(times) <= 3 * min(times) + 0.001  # No block slower than the fastest, give or take noise
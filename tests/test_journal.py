@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import game_logic
+import journal
+from engine import DOUBLE_OUT, GameState, WIN
+from journal import claim, journal_game_id, journal_path, journaled_games, load, open_journal
+
+
+@pytest.fixture(autouse=True)
+def journals_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journals"))
+
+
+def new_game(app, names=("A", "B")):
+    game = GameState(list(names), 301)
+    return open_journal(game, journal_path(app, "-".join(names)))
+
+
+def test_moves_resume_from_the_journal():
+    log = new_game("app")
+    log.apply_throw(20, 3)
+    log.apply_points(45)
+    log.end_visit()
+    log.play_visit([(19, 3), (19, 1), (25, 2)])
+    log.undo()
+    log.close()
+    assert load(log.path).serialize() == log.game.serialize()
+
+
+def test_torn_last_line_is_ignored():
+    log = new_game("app")
+    log.apply_throw(20, 3)
+    log.close()
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write("T 2")  # Crash in the middle of a write
+    assert load(log.path).serialize() == log.game.serialize()
+
+
+def test_compaction_keeps_the_game(monkeypatch):
+    monkeypatch.setattr(journal, "COMPACT_EVERY", 4)
+    log = new_game("app")
+    for _ in range(5):
+        log.apply_throw(1)
+        log.end_visit()
+    for _ in range(3):  # Back past the last snapshot
+        log.undo()
+    with open(log.path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) < 5
+    assert load(log.path).serialize() == log.game.serialize()
+
+
+def test_games_being_played_are_not_listed():
+    played = new_game("app", ("A", "B"))
+    left = new_game("app", ("C", "D"))
+    new_game("other", ("E", "F")).close()
+    left.apply_throw(20)
+    left.close()  # The session went away
+    assert [(path, game.serialize()) for path, game in journaled_games("app")] == [(left.path, left.game.serialize())]
+    played.discard()
+
+
+def test_sessions_only_remove_their_own_journal():
+    first, second = new_game("app", ("A", "B")), new_game("app", ("C", "D"))
+    assert first.path != second.path
+    first.discard()
+    second.apply_throw(20)  # Still journaled
+    assert not os.path.exists(first.path) and not os.path.exists(first.path + ".lock")
+    assert load(second.path).player("C").score == 281
+
+
+def test_only_one_session_claims_a_journal():
+    log = new_game("app")
+    log.close()
+    first = claim(log.path)
+    assert first is not None and first.game.serialize() == log.game.serialize()
+    assert claim(log.path) is None
+    with pytest.raises(ValueError):
+        open_journal(GameState(["X"], 301), log.path)
+    first.discard()
+    assert claim(log.path) is None  # Gone
+
+
+def test_game_id_of_a_journal():
+    assert journal_game_id("Try-File3", journal_path("Try-File3", "abc123")) == "abc123"
+
+
+def test_recover_saves_won_games_and_returns_the_others(monkeypatch):
+    saved = []
+
+    def handle_win(game, log):
+        saved.append(game.winner.name)
+        log.discard()
+
+    monkeypatch.setattr(game_logic, "handle_win", handle_win)
+    game = GameState(["A", "B"], 101, DOUBLE_OUT)
+    won = open_journal(game, journal_path("app", "won"))
+    won.play_visit([(20, 3), (1, 1), (0, 1)])  # A: 40 left
+    won.play_visit([(0, 1)] * 3)  # B misses
+    assert won.apply_throw(20, 2) == WIN
+    won.close()  # Crash before handle_win
+    unfinished = new_game("app", ("C", "D"))
+    unfinished.close()
+    playing = new_game("app", ("E", "F"))
+
+    assert [path for path, _ in game_logic.recover_games("app")] == [unfinished.path]
+    assert saved == ["A"]
+    assert not os.path.exists(won.path)
+    assert game_logic.recover_games("app") and saved == ["A"]  # Saved once
+    playing.discard()
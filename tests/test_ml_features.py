@@ -0,0 +1,73 @@
+import pickle
+import threading
+
+import ml_features
+from ml_features import SampleBuffer, ThrowStats
+
+
+def stats(*points):
+    s = ThrowStats()
+    for p in points:
+        s.add(p)
+    return s
+
+
+def test_events_recorded_once():
+    samples = SampleBuffer()
+    assert samples.record(("g1", 0, 1), "A", stats(20), 281)
+    assert not samples.record(("g1", 0, 1), "A", stats(20), 281)  # Rerun of the same event
+    assert len(samples) == 1
+
+
+def test_mark_won_only_in_its_own_game():
+    # Two sessions with the same default player name
+    samples = SampleBuffer()
+    samples.record(("g1", 0, 1), "Player 1", stats(60), 41)
+    samples.record(("g2", 0, 1), "Player 1", stats(20), 81)
+    samples.record(("g1", 1, 1), "Player 1", stats(60, 41), 0)
+    samples.mark_won("g1", "Player 1")
+    assert list(samples.won) == [0, 0, 1]
+    samples.mark_won("g3", "Player 1")  # No row in that game
+    assert list(samples.won) == [0, 0, 1]
+
+
+def test_recent_keys_are_bounded(monkeypatch):
+    monkeypatch.setattr(ml_features, "RECENT_EVENTS", 3)
+    samples = SampleBuffer()
+    for i in range(10):
+        samples.record(("g1", i, 1), "A", stats(1), 300 - i)
+    assert len(samples._keys) == 3 and len(samples) == 10
+    samples.record(("g1", 10, 1), "A", stats(1), 290)
+    samples.mark_won("g1", "A")  # The player's latest row is still known
+    assert samples.won[-1] == 1
+
+
+def test_saved_buffer_keeps_the_rows_only():
+    samples = SampleBuffer()
+    samples.record(("g1", 0, 1), "A", stats(20), 281)
+    restored = pickle.loads(pickle.dumps(samples))
+    assert restored.players == ["A"] and list(restored.current_score) == [281]
+    assert "_keys" not in samples.__getstate__() and "_last_row" not in samples.__getstate__()
+    assert restored.record(("g2", 0, 1), "B", stats(5), 296)
+    restored.mark_won("g2", "B")
+    assert list(restored.won) == [0, 1]
+
+
+def test_rows_since_is_consistent_while_recording():
+    samples = SampleBuffer()
+    done = threading.Event()
+
+    def record():
+        for i in range(20_000):
+            samples.record(("g", i, 1), "A", stats(i % 60), 501)
+        done.set()
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    start = 0
+    while not done.is_set() or start < len(samples):
+        stop, columns, won = samples.rows_since(start)
+        assert all(len(c) == stop - start for c in columns) and len(won) == stop - start
+        start = stop
+    thread.join()
+    assert start == 20_000
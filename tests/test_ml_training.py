@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from ml_features import SampleBuffer, ThrowStats
+from ml_training import TrainingService
+
+
+def test_submit_while_other_sessions_record():
+    samples = SampleBuffer()
+    service = TrainingService(min_samples=0, min_wins=1)
+    done = threading.Event()
+
+    def record():
+        stats = ThrowStats()
+        for i in range(5_000):
+            stats.add(i % 60)
+            samples.record(("g", i, 1), "A", stats, 501 - i % 500, won=int(i % 7 == 0))
+        done.set()
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    fits = []
+    while not done.is_set():
+        future = service.submit(samples)
+        if future is not None:
+            fits.append(future)
+    thread.join()
+    fits.append(service.submit(samples))
+    for future in filter(None, fits):
+        future.result()  # No fit failed on columns of different lengths
+    assert service.state()["trained_rows"] == len(samples) == 5_000
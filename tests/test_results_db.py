@@ -0,0 +1,55 @@
+import sqlite3
+
+import results_db
+from engine import DOUBLE_OUT, STRAIGHT_OUT, GameState
+from game_log import append_game
+
+
+def play(names, out_rule, visits):
+    game = GameState(names, 101, out_rule)
+    for darts in visits:
+        game.play_visit(darts)
+    return game
+
+
+GAMES = [
+    # 101 double-out finished on D20, with a bust of B on the way
+    play(["A", "B"], DOUBLE_OUT, [[(20, 3)], [(20, 3), (20, 2)], [(1, 1), (20, 2)]]),
+    play(["A", "C"], STRAIGHT_OUT, [[(20, 3), (25, 1)], [(0, 1)], [(16, 1)]]),
+]
+
+
+def table(path, query):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(query).fetchall()
+    finally:
+        conn.close()
+
+
+def test_import_matches_direct_save(tmp_path):
+    direct, imported, log = (str(tmp_path / name) for name in ("direct.sqlite", "imported.sqlite", "games.dclog"))
+    for game in GAMES:
+        players = game.as_dicts()
+        results_db.save_game(players, game.winner.name, direct, game.start_score, game.out_rule)
+        append_game(players, game.winner.name, log, game.start_score, out_rule=game.out_rule)
+    assert results_db.import_results(log, imported) == len(GAMES)
+
+    stats = results_db.get_all_player_stats(path=direct)
+    assert stats == results_db.get_all_player_stats(path=imported)
+    assert stats["A"]["checkout_rate"] == 50.0
+    throws = "SELECT turn_id, throw_no, base, multiplier, points FROM throws ORDER BY turn_id, throw_no"
+    assert table(direct, throws) == table(imported, throws)
+    assert (None, None) not in [row[2:4] for row in table(imported, throws)]
+    turns = "SELECT turn_no, score_before, points, checkout FROM turns ORDER BY id"
+    assert table(direct, turns) == table(imported, turns)
+    games = "SELECT start_score, winner_id, out_rule FROM games ORDER BY id"
+    assert table(direct, games) == table(imported, games)
+
+
+def test_schema_set_up_again_for_a_new_file(tmp_path):
+    path = tmp_path / "results.sqlite"
+    results_db.save_game([{"name": "A", "score": 0, "history": [[101]]}], "A", str(path), 101)
+    path.unlink()
+    results_db.save_game([{"name": "A", "score": 0, "history": [[101]]}], "A", str(path), 101)
+    assert results_db.game_count(str(path)) == 1
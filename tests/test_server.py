@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+import server
+from engine import WIN
+from server import GameServer
+
+
+class Saved(list):
+    # Scores of every game sent to the results; the first `failures` saves fail
+    failures = 0
+
+    def handle_win(self, game):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.append({p.name: p.score for p in game.players})
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    games = Saved()
+    monkeypatch.setattr(server, "handle_win", games.handle_win)
+    return games
+
+
+def new_board(game_server, names, score):
+    # Game with every player on `score` (games start at 101, 301 or 501)
+    board = game_server.create_game(names, 101)
+    for player in board.game.players:
+        player.score = score
+    board.game.visit_start = score
+    return board
+
+
+def run(play):
+    async def main():
+        game_server = GameServer()
+        try:
+            await play(game_server)
+        finally:
+            await game_server.close()
+    asyncio.run(main())
+
+
+async def confirm(game_server, board):
+    # POST /games/<id>/next
+    return await game_server.route("POST", f"/games/{board.id}/next", None)
+
+
+def test_win_saved_once_when_confirmed(saved):
+    async def play(game_server):
+        board = new_board(game_server, ["A", "B"], 20)
+        game_server.throw(board, 20, 1)
+        assert board.result == WIN and not board.saved
+        status, answer = await confirm(game_server, board)
+        assert status == 200 and answer["saved"]
+        await confirm(game_server, board)  # A client retrying
+        with pytest.raises(ValueError):
+            game_server.undo(board)
+    run(play)
+    assert saved == [{"A": 0, "B": 20}]
+
+
+def test_undone_winning_dart_is_not_saved(saved):
+    async def play(game_server):
+        board = new_board(game_server, ["A", "B"], 20)
+        game_server.throw(board, 20, 1)  # Mis-entered
+        game_server.undo(board)
+        game_server.throw(board, 5, 1)
+        game_server.next_visit(board)
+        game_server.throw(board, 10, 2)
+        await confirm(game_server, board)
+    run(play)
+    assert saved == [{"A": 15, "B": 0}]
+
+
+def test_unconfirmed_win_saved_on_close(saved):
+    async def play(game_server):
+        game_server.throw(new_board(game_server, ["A"], 20), 20, 1)
+        new_board(game_server, ["B"], 20)  # Not finished: not saved
+    run(play)
+    assert saved == [{"A": 0}]
+
+
+def test_failed_save_is_kept_and_saved_again(saved, capsys):
+    saved.failures = 2
+
+    async def play(game_server):
+        board = new_board(game_server, ["A"], 20)
+        game_server.throw(board, 20, 1)
+        status, answer = await confirm(game_server, board)
+        assert status == 200 and not answer["saved"]
+        assert "disk full" in capsys.readouterr().out
+        with pytest.raises(ValueError):
+            game_server.throw(board, 1, 1)  # Still over
+        status, answer = await confirm(game_server, board)  # Fails again, then the server closing saves it
+        assert not answer["saved"]
+    run(play)
+    assert saved == [{"A": 0}]
+
+
+@pytest.mark.parametrize("body", [
+    None, [], {}, {"names": []}, {"names": "A"}, {"names": ["A", ""]}, {"names": ["A", 1]}, {"names": ["A", "A"]},
+    {"names": ["A"], "start_score": 70_000}, {"names": ["A"], "start_score": "301"},
+    {"names": ["A"], "start_score": True}, {"names": ["A"], "out_rule": "triple"}, {"names": ["A"], "out_rule": ["double"]},
+])
+def test_invalid_games_are_refused(body):
+    async def play(game_server):
+        with pytest.raises(server.HTTPError) as error:
+            await game_server.route("POST", "/games", body)
+        assert error.value.status == 400
+        assert not game_server.boards
+    run(play)
+
+
+def test_new_game():
+    async def play(game_server):
+        status, game = await game_server.route("POST", "/games", {"names": ["A", "B"], "start_score": 501,
+                                                                 "out_rule": "double"})
+        assert status == 201 and game["state"]["start_score"] == 501 and game["state"]["out_rule"] == "double"
+    run(play)
@@ -0,0 +1,29 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simulator import SKILL_LEVELS, simulate_legs, summary_table, win_probabilities
+
+
+def test_no_legs():
+    legs = simulate_legs(SKILL_LEVELS["club"], 0)
+    assert len(legs) == 0
+    assert legs.checkout_rate == 0
+    assert legs.darts_per_leg()["unfinished"] == 0
+    assert win_probabilities([legs, legs]) == [0.0, 0.0]
+    assert set(summary_table(SKILL_LEVELS, 0)) == set(SKILL_LEVELS)
+
+
+def test_negative_number_of_legs():
+    with pytest.raises(ValueError):
+        simulate_legs(SKILL_LEVELS["club"], -1)
+
+
+def test_legs_split_in_batches():
+    model = SKILL_LEVELS["pro"]
+    whole = simulate_legs(model, 300, seed=3, batch_size=300)
+    assert len(whole) == 300
+    assert whole.finished.all()
+    split = simulate_legs(model, 300, seed=3, batch_size=100)
+    assert len(split) == 300
+    assert split.darts_per_leg()["unfinished"] == 0
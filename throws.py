@@ -0,0 +1,96 @@
+from array import array
+
+from engine import BULL, MISS, SEGMENTS
+
+# === Compact throws ===
+# A dart is two bytes, segment then multiplier, in an array('B'): a visit is 6 bytes, a whole leg a
+# few dozen. Scoring and validation work on whole visits or legs at once through a numpy view of the
+# same buffer (no copy, no parsing), which is what heatmaps and per-segment accuracy read.
+# A miss is segment 0 (any multiplier); the bullseye is the double bull (25, 2).
+
+TYPECODE = "B"
+BYTES_PER_DART = 2
+BOARD_SIZE = BULL + 1  # Segment values 0..25, the index of the heatmap rows
+
+
+def encode(darts):
+    # (segment, multiplier) or engine (segment, multiplier, points) darts -> array('B')
+    buf = array(TYPECODE)
+    for dart in darts:
+        buf.append(dart[0])
+        buf.append(dart[1])
+    return buf
+
+
+def decode(buf):
+    return list(zip(buf[0::2], buf[1::2]))
+
+
+def from_history(history):
+    # A player's engine history (one list per visit) as one array; darts saved as points only are skipped
+    return encode(d for visit in history for d in visit if isinstance(d, (tuple, list)))
+
+
+def from_board(base, multiplier="Single"):
+    # Input of the front ends: base 0-20, 25 or 50 and "Single" / "Double" / "Triple"
+    factor = {"Single": 1, "Double": 2, "Triple": 3}[multiplier]
+    if base == 50:
+        return BULL, 2
+    if base == MISS:
+        return MISS, 1
+    return base, factor
+
+
+def _view(buf):
+    import numpy as np  # Only loaded once darts are scored in bulk
+    return np.frombuffer(buf, dtype=np.uint8).reshape(-1, BYTES_PER_DART)
+
+
+def valid(buf):
+    # Boolean mask, one entry per dart
+    import numpy as np
+    darts = _view(buf)
+    segment, multiplier = darts[:, 0], darts[:, 1]
+    on_board = (segment <= SEGMENTS[-1]) | (segment == BULL)
+    return (segment == MISS) & (multiplier <= 3) | on_board & (segment != MISS) & (multiplier >= 1) & (
+        multiplier <= np.where(segment == BULL, 2, 3))
+
+
+def validate(buf):
+    if len(buf) % BYTES_PER_DART:
+        raise ValueError("incomplete dart in throw buffer")
+    mask = valid(buf)
+    if not mask.all():
+        index = int(mask.argmin())  # First invalid dart
+        segment, multiplier = buf[2 * index], buf[2 * index + 1]
+        raise ValueError(f"invalid throw {index + 1}: {segment} x {multiplier}")
+    return buf
+
+
+def points(buf):
+    # Points of every dart (int array); a miss scores 0 whatever its multiplier
+    darts = _view(buf).astype("int16")
+    return darts[:, 0] * darts[:, 1]
+
+
+def total(buf):
+    return int(points(buf).sum())
+
+
+def heatmap(buf):
+    # Hits per [segment, multiplier], shape (26, 4); row 0 are the misses
+    import numpy as np
+    darts = _view(buf)
+    counts = np.bincount(darts[:, 0].astype(np.intp) * 4 + darts[:, 1], minlength=BOARD_SIZE * 4)
+    return counts.reshape(BOARD_SIZE, 4)
+
+
+def segment_accuracy(buf):
+    # {segment: (darts, share of doubles, share of trebles)} for every segment that was hit
+    counts = heatmap(buf)
+    stats = {}
+    for segment in list(SEGMENTS) + [BULL]:
+        darts = int(counts[segment].sum())
+        if darts:
+            stats[segment] = (darts, float(counts[segment, 2] / darts), float(counts[segment, 3] / darts))
+    return stats
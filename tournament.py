@@ -0,0 +1,262 @@
+import heapq
+import itertools
+import math
+
+from engine import STRAIGHT_OUT
+from game_logic import start_game, handle_win
+from ratings import seed
+
+# === Tournaments ===
+# Knockout brackets, round-robins and Swiss rounds, played on a number of boards. A match is one
+# game of engine.GameState started with game_logic.start_game; its result is saved through
+# handle_win like any other game.
+#
+# The boards are given out by BoardScheduler: a heap of playable matches (earliest round first), a
+# heap of free boards and the set of players at a board. A match whose player is still busy waits on
+# that player and goes back to the heap when they are released, so every decision is a few heap
+# operations - O(log n) - whatever the size of the tournament. Boards are filled as soon as they open.
+
+KNOCKOUT = "knockout"
+ROUND_ROBIN = "round_robin"
+SWISS = "swiss"
+FORMATS = (KNOCKOUT, ROUND_ROBIN, SWISS)
+
+# Match states
+WAITING = "waiting"  # Players not known yet (later knockout round)
+READY = "ready"
+PLAYING = "playing"
+DONE = "done"
+
+
+class Match:
+    __slots__ = ("id", "round", "players", "state", "board", "game", "winner", "next", "slot")
+
+    def __init__(self, match_id, round_number, players=(None, None)):
+        self.id = match_id
+        self.round = round_number
+        self.players = list(players)
+        self.state = WAITING
+        self.board = None
+        self.game = None  # GameState while playing
+        self.winner = None
+        self.next = None  # Knockout: match the winner goes to, and in which slot
+        self.slot = 0
+
+    def __repr__(self):
+        return f"Match({self.id}, round {self.round}, {self.players[0]} v {self.players[1]}, {self.state})"
+
+
+class BoardScheduler:
+    def __init__(self, boards):
+        if boards < 1:
+            raise ValueError("a tournament needs at least one board")
+        self.boards = boards
+        self.free_boards = list(range(1, boards + 1))  # Already a heap: lowest board number first
+        self.ready = []  # (round, match id, match)
+        self.busy = set()  # Players at a board
+        self.waiting = {}  # Player -> matches that were next but had to wait for them
+
+    def push(self, match):
+        heapq.heappush(self.ready, (match.round, match.id, match))
+
+    def assign(self):
+        # Ready matches on free boards, as many as possible
+        started = []
+        while self.free_boards and self.ready:
+            _, _, match = heapq.heappop(self.ready)
+            blocked = next((p for p in match.players if p in self.busy), None)
+            if blocked is not None:
+                self.waiting.setdefault(blocked, []).append(match)
+                continue
+            match.board = heapq.heappop(self.free_boards)
+            self.busy.update(match.players)
+            started.append(match)
+        return started
+
+    def release(self, match):
+        heapq.heappush(self.free_boards, match.board)
+        for player in match.players:
+            self.busy.discard(player)
+            for waiting in self.waiting.pop(player, ()):
+                self.push(waiting)
+
+
+def _bracket_order(size):
+    # Seed positions of a bracket (0-based): 1 v 16, 8 v 9, ... so the top seeds meet last
+    order = [0]
+    while len(order) < size:
+        order = [x for seed in order for x in (seed, 2 * len(order) - 1 - seed)]
+    return order
+
+
+class Tournament:
+    def __init__(self, players, boards=4, format=KNOCKOUT, start_score=301, out_rule=STRAIGHT_OUT, rounds=None,
+                 persist=True, seed_by_rating=False):
+        if format not in FORMATS:
+            raise ValueError(f"unknown tournament format: {format}")
+        if len(players) < 2 or len(set(players)) != len(players):
+            raise ValueError("a tournament needs at least two players with different names")
+        # In seeding order, best first: as given, or by Elo rating (ratings.py)
+        self.players = seed(players) if seed_by_rating else list(players)
+        self.format = format
+        self.start_score = start_score
+        self.out_rule = out_rule
+        self.persist = persist  # False: results are not saved (simulations, benchmarks)
+        self.scheduler = BoardScheduler(boards)
+        self.matches = []
+        self.points = {p: 0 for p in self.players}  # Wins (and Swiss byes)
+        self.opponents = {p: set() for p in self.players}
+        self.round = 0  # Swiss: round being played
+        self.rounds = rounds or max(1, math.ceil(math.log2(len(self.players))))  # Swiss rounds
+        self.byes = set()  # Swiss players who already had a bye
+        self._open = 0  # Matches not done yet in the current Swiss round
+        self._pairing = None  # Swiss: generator of the rest of the round's matches
+        self._ids = itertools.count(1)
+        self.champion = None
+
+        if format == KNOCKOUT:
+            self._build_knockout()
+        elif format == ROUND_ROBIN:
+            self._build_round_robin()
+        else:
+            self._next_swiss_round()
+
+    # === Formats ===
+    def _new_match(self, round_number, players=(None, None)):
+        match = Match(next(self._ids), round_number, players)
+        self.matches.append(match)
+        return match
+
+    def _ready(self, match):
+        match.state = READY
+        self.scheduler.push(match)
+
+    def _build_knockout(self):
+        size = 1 << (len(self.players) - 1).bit_length()
+        seeds = [self.players[i] if i < len(self.players) else None for i in _bracket_order(size)]
+        level = []
+        for i in range(0, size, 2):
+            match = self._new_match(1, seeds[i:i + 2])
+            level.append(match)
+        round_number = 1
+        while len(level) > 1:
+            round_number += 1
+            parents = []
+            for i in range(0, len(level), 2):
+                parent = self._new_match(round_number)
+                for slot, child in enumerate(level[i:i + 2]):
+                    child.next, child.slot = parent, slot
+                parents.append(parent)
+            level = parents
+        for match in self.matches:
+            if match.round == 1:
+                if None in match.players:  # Bye: the seeded player goes straight through
+                    self._record(match, next(p for p in match.players if p is not None))
+                else:
+                    self._ready(match)
+
+    def _build_round_robin(self):
+        # Circle method: one player stays, the others rotate; None is the bye of an odd field
+        field = self.players + ([None] if len(self.players) % 2 else [])
+        n = len(field)
+        for round_number in range(1, n):
+            for i in range(n // 2):
+                pair = (field[i], field[n - 1 - i])
+                if None not in pair:
+                    self._ready(self._new_match(round_number, pair))
+            field = [field[0], field[-1]] + field[1:-1]
+
+    def _next_swiss_round(self):
+        self.round += 1
+        ranked = sorted(self.players, key=self.points.__getitem__, reverse=True)  # Stable: seeding breaks ties
+        if len(ranked) % 2:
+            bye = next((p for p in reversed(ranked) if p not in self.byes), ranked[-1])
+            self.byes.add(bye)
+            self.points[bye] += 1
+            ranked.remove(bye)
+        self._open = len(ranked) // 2
+        self._pairing = self._swiss_pairs(ranked)
+
+    def _swiss_pairs(self, ranked):
+        # Pairs are made as boards ask for them (greedy from the top of the standings), so starting a
+        # round costs a sort, not the pairing of the whole field
+        paired = set()
+        for i, player in enumerate(ranked):
+            if player in paired:
+                continue
+            # Closest player in the standings not met yet, or the next free one if everyone was met
+            free = (ranked[j] for j in range(i + 1, len(ranked)) if ranked[j] not in paired)
+            first = next(free)
+            opponent = first if first not in self.opponents[player] else next(
+                (q for q in free if q not in self.opponents[player]), first)
+            paired.update((player, opponent))
+            yield self._new_match(self.round, (player, opponent))
+
+    # === Playing ===
+    def assign(self):
+        # Starts the matches that can go on a board now; returns them (match.board, match.game)
+        if self._pairing is not None:
+            for _ in range(len(self.scheduler.free_boards) - len(self.scheduler.ready)):
+                match = next(self._pairing, None)
+                if match is None:
+                    self._pairing = None
+                    break
+                self._ready(match)
+        started = self.scheduler.assign()
+        for match in started:
+            match.state = PLAYING
+            match.game = start_game(list(match.players), self.start_score, self.out_rule)
+        return started
+
+    def report(self, match, winner=None):
+        # Result of a match on a board: its game has a winner, or the winner is given (walkover).
+        # Frees the board and returns the matches started on the boards that are free now.
+        if match.state != PLAYING:
+            raise ValueError(f"{match} is not being played")
+        game = match.game
+        if winner is None:
+            if game.winner is None:
+                raise ValueError(f"{match} has no winner yet")
+            winner = game.winner.name
+            if self.persist:
+                handle_win(game)
+        if winner not in match.players:
+            raise ValueError(f"{winner} is not playing {match}")
+        self.scheduler.release(match)
+        match.game = None
+        self._record(match, winner)
+        return self.assign()
+
+    def _record(self, match, winner):
+        match.state = DONE
+        match.winner = winner
+        a, b = match.players
+        if a is not None and b is not None:
+            self.points[winner] += 1
+            self.opponents[a].add(b)
+            self.opponents[b].add(a)
+        if self.format == KNOCKOUT:
+            if match.next is None:
+                self.champion = winner
+            else:
+                parent = match.next
+                parent.players[match.slot] = winner
+                if None not in parent.players:
+                    self._ready(parent)
+        elif self.format == SWISS:
+            self._open -= 1
+            if self._open == 0 and self.round < self.rounds:
+                self._next_swiss_round()
+
+    # === Results ===
+    @property
+    def finished(self):
+        return all(m.state == DONE for m in self.matches) and not (self.format == SWISS and (self._open or self.round < self.rounds))
+
+    def standings(self):
+        # [(player, points)], most points first, seeding on ties; knockout champion first
+        ranking = sorted(self.players, key=lambda p: -self.points[p])
+        if self.champion is not None:
+            ranking.remove(self.champion)
+            ranking.insert(0, self.champion)
+        return [(p, self.points[p]) for p in ranking]